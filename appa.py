@@ -21,8 +21,10 @@ import math
 import numpy as np
 
 import commands
+import decode_cache
 import hw_commands
 import sensor_conv
+from   controller  import sensor_conv_funcs
 
 ####################################################################################
 # Global Variables                                                                 #
@@ -302,81 +304,417 @@ def appa_parse_preset(serialObj, sensor_frame_int):
 
     return output_strings
 
-def appa_parse_telemetry_data(data: list[int], group: str) -> str:
-    out_str = ""
-    index = 0
-
-    # Get the sensor sizes and data types for the raw, conv, state_estim, gps, or canard group
-    sensor_sizes = appa_sensor_sizes[group]
-    sensor_types = appa_sensor_types[group]
-
-    # Parse the sizes and types to extract them from sensor_frame_int
-    for size, data_type, key in zip(sensor_sizes.values(), sensor_types.values(), sensor_sizes.keys()):
-        if data_type is int:
-            value = 0
-            value_index = index + (size - 1) 
-            for i in range(value_index, index, -1):
-                value = value | data[i] << (8 * (value_index - index))
-            value = value | data[index]
-            
-            # Apply conversions if applicable
-            if key == "accX" or key == "accY" or key == "accZ":
-                value = sensor_conv.imu_accel(value)
-            if key == "gyroX" or key == "gyroY" or key == "gyroZ":
-                value = sensor_conv.imu_gyro(value)
-
-            out_str += (str(value) + ",")
-
-            index += size # Increment current data index by the size we just extracted
-        elif data_type is float:
-            value = [data[index].to_bytes(1, "big"),
-                        data[index + 1].to_bytes(1, "big"),
-                        data[index + 2].to_bytes(1, "big"),
-                        data[index + 3].to_bytes(1, "big")]
-            value = hw_commands.byte_array_to_float(value)
-            out_str += (str(value) + ",")
-
-            index += size # Increment current data index by 4 (size of a float)
+# Packed little-endian field formats of the APPA telemetry groups. Accelerometer
+# and gyroscope readouts are signed 16-bit counts scaled to physical units on
+# decode, every other integer field is reported as-is
+appa_sensor_dtypes = {
+    "raw": {
+        "accX" :         "<i2",
+        "accY" :         "<i2",
+        "accZ" :         "<i2",
+        "gyroX":         "<i2",
+        "gyroY":         "<i2",
+        "gyroZ":         "<i2",
+        "magX" :         "<u2",
+        "magY" :         "<u2",
+        "magZ" :         "<u2",
+        "imut" :         "<u2",
+        "pres" :         "<f4",
+        "temp" :         "<f4"
+    },
+    "conv": {
+        "accXconv" :     "<f4",
+        "accYconv" :     "<f4",
+        "accZconv" :     "<f4",
+        "gyroXconv" :    "<f4",
+        "gyroYconv" :    "<f4",
+        "gyroZconv" :    "<f4"
+    },
+    "state_estim": {
+        "rollDeg"    :   "<f4",
+        "pitchDeg"    :  "<f4",
+        "rollRate"    :  "<f4",
+        "pitchRate"    : "<f4",
+        "velo"   :       "<f4",
+        "velo_x" :       "<f4",
+        "velo_y" :       "<f4",
+        "velo_z" :       "<f4",
+        "pos"   :        "<f4",
+        "alt" :          "<f4",
+        "bvelo" :        "<f4"
+    },
+    "gps": {
+        "altg" :         "<f4",
+        "speedg":        "<f4",
+        "utc_time":      "<f4",
+        "long":          "<f4",
+        "lat":           "<f4",
+        "ns":            "u1",
+        "ew":            "u1",
+        "gll_s":         "u1",
+        "rmc_s":         "u1"
+    },
+    "canard": {
+        "feedback":      "<f4"
+    }
+}
+
+# Linear scale factors applied to signed IMU counts
+appa_sensor_scales = {
+    "accX" :             sensor_conv.imu_accel( 1 ),
+    "accY" :             sensor_conv.imu_accel( 1 ),
+    "accZ" :             sensor_conv.imu_accel( 1 ),
+    "gyroX":             sensor_conv.imu_gyro( 1 ),
+    "gyroY":             sensor_conv.imu_gyro( 1 ),
+    "gyroZ":             sensor_conv.imu_gyro( 1 )
+}
+
+# Fields present at the start of every logged APPA frame
+appa_frame_header_dtypes = {
+    "save_bit":          "u1",
+    "fc_state":          "u1",
+    "time":              "<u4"
+}
+
+# Compiled decoders, keyed by data bitmask (flash frames) or by the controller
+# and the tuple of polled sensor names (live frames)
+appa_frame_decoders = {}
+appa_poll_decoders  = {}
+
+# Version of the frame decoder, bump when decoded output changes
+appa_decoder_version = 1
+
+# Flash extract outputs
+appa_sensor_data_filename = "output/appa_sensor_data.csv"
+appa_frames_filename      = "output/appa_sensor_data.npy"
+appa_index_filename       = "output/appa_sensor_data_index.npz"
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         appa_compile_decoder                                                     #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Builds a decoder for a packed frame made of the given (name, format)     #
+#         fields: the raw struct layout of the frame, the layout of the decoded    #
+#         columns, and the per-column conversion and csv format. conv_funcs maps   #
+#         field names to elementwise readout conversions from sensor_conv          #
+#                                                                                  #
+####################################################################################
+def appa_compile_decoder( fields, conv_funcs = {} ):
+    raw_fields     = []
+    decoded_fields = []
+    conversions    = []
+    csv_formats    = []
+    for name, field_dtype in fields:
+        raw_fields.append( ( name, field_dtype ) )
+        if ( name == "time" ):
+            decoded_fields.append( ( name, "<f8" ) )
+            conversions.append( ( name, "millis" ) )
+            csv_formats.append( "%.3f" )
+        elif ( name in appa_sensor_scales ):
+            decoded_fields.append( ( name, "<f8" ) )
+            conversions.append( ( name, "scale" ) )
+            csv_formats.append( "%.15g" )
+        elif ( conv_funcs.get( name ) is not None ):
+            decoded_fields.append( ( name, "<f8" ) )
+            conversions.append( ( name, conv_funcs[name] ) )
+            csv_formats.append( "%.15g" )
+        elif ( field_dtype == "<f4" ):
+            decoded_fields.append( ( name, "<f4" ) )
+            conversions.append( ( name, "float" ) )
+            csv_formats.append( "%.9g" )
         else:
-            raise ValueError("Unknown type")
-        
-    return out_str
-
-
-def appa_parse_frame(frame: list[int], dataBitmask: int):
-    # Exists in all
-    out_line = ""
-    out_line += str(frame[0]) + ","
-    out_line += str(frame[1]) + ","
-
-    # Time of frame measurement
-    time = ( ( frame[2]       ) + 
-             ( frame[3] << 8  ) + 
-             ( frame[4] << 16 ) +
-             ( frame[5] << 24 ) )
-    
-    # Conversion to seconds
-    out_line += str( time / 1000 ) + ","
+            decoded_fields.append( ( name, field_dtype ) )
+            conversions.append( ( name, None ) )
+            csv_formats.append( "%d" )
 
-    del frame[0:6]
+    return {
+           "raw_dtype"  : np.dtype( raw_fields     ),
+           "dtype"      : np.dtype( decoded_fields ),
+           "conversions": conversions               ,
+           "csv_formats": csv_formats
+           }
+## appa_compile_decoder ##
 
-    if ( dataBitmask & appa_data_bitmasks.get("raw") != 0 ):
-        out_line += appa_parse_telemetry_data(frame[0:28], "raw")
-        del frame[0:28]
-    if ( dataBitmask & appa_data_bitmasks.get("conv") != 0 ):
-        out_line += appa_parse_telemetry_data(frame[0:24], "conv")
-        del frame[0:24]
-    if ( dataBitmask & appa_data_bitmasks.get("state_estim") != 0 ):
-        out_line += appa_parse_telemetry_data(frame[0:44], "state_estim")
-        del frame[0:44]
-    if ( dataBitmask & appa_data_bitmasks.get("gps") != 0 ):
-        out_line += appa_parse_telemetry_data(frame[0:24], "gps")
-        del frame[0:24]
-    if ( dataBitmask & appa_data_bitmasks.get("canard") != 0 ):
-        out_line += appa_parse_telemetry_data(frame[0:4], "canard")
-        del frame[0:4]
 
-    return out_line
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         appa_frame_decoder                                                       #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the compiled decoder for a flash frame logged with the given     #
+#         data bitmask                                                             #
+#                                                                                  #
+####################################################################################
+def appa_frame_decoder( dataBitmask ):
+    if ( dataBitmask not in appa_frame_decoders ):
+        fields = list( appa_frame_header_dtypes.items() )
+        for group in appa_data_bitmasks:
+            if ( dataBitmask & appa_data_bitmasks[group] != 0 ):
+                fields += list( appa_sensor_dtypes[group].items() )
+        appa_frame_decoders[dataBitmask] = appa_compile_decoder( fields )
+    return appa_frame_decoders[dataBitmask]
+## appa_frame_decoder ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         appa_poll_decoder                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the compiled decoder for a sensor poll frame containing the      #
+#         given sensors, in poll order. Readouts are converted with the            #
+#         controller's sensor_conv_funcs, as get_sensor_readouts would             #
+#                                                                                  #
+####################################################################################
+def appa_poll_decoder( sensors, controller ):
+    key = ( controller, tuple( sensors ) )
+    if ( key not in appa_poll_decoders ):
+        sensor_dtypes = {}
+        for group in appa_sensor_dtypes:
+            sensor_dtypes.update( appa_sensor_dtypes[group] )
+        fields = [ ( sensor, sensor_dtypes[sensor] ) for sensor in sensors ]
+        appa_poll_decoders[key] = appa_compile_decoder( fields, 
+                                                        sensor_conv_funcs[controller] )
+    return appa_poll_decoders[key]
+## appa_poll_decoder ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         appa_decode_frames                                                       #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Decodes a block of packed frames into columnar form. Rows are written    #
+#         into out when supplied, otherwise a new array is allocated               #
+#                                                                                  #
+####################################################################################
+def appa_decode_frames( frame_bytes, decoder, out = None ):
+    raw_dtype  = decoder["raw_dtype"]
+    num_frames = len( frame_bytes ) // raw_dtype.itemsize
+    raw_frames = np.frombuffer( frame_bytes, dtype = raw_dtype, count = num_frames )
+    if ( out is None ):
+        out = np.empty( num_frames, dtype = decoder["dtype"] )
+
+    for name, conversion in decoder["conversions"]:
+        column = raw_frames[name]
+        if   ( conversion == "millis" ):
+            np.divide( column, 1000.0, out = out[name] )
+        elif ( conversion == "scale"  ):
+            np.multiply( column, appa_sensor_scales[name], out = out[name] )
+        elif ( conversion == "float"  ):
+            # Erased flash (0xFFFFFFFF) reads back as zero
+            out[name] = column
+            out[name][ column.view( "<u4" ) == 0xFFFFFFFF ] = 0.0
+        elif ( callable( conversion ) ):
+            out[name] = conversion( column.astype( np.float64 ) )
+        else:
+            out[name] = column
+    return out
+## appa_decode_frames ##
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         appa_frame_buffer                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Growable columnar buffer that decoded frames are written into directly   #
+#                                                                                  #
+####################################################################################
+class appa_frame_buffer:
+    def __init__( self, decoder, capacity = 1024 ):
+        self.decoder    = decoder
+        self.data       = np.empty( capacity, dtype = decoder["dtype"] )
+        self.num_frames = 0
+
+    # Decode a block of packed frames into the end of the buffer
+    def append( self, frame_bytes ):
+        num_new = len( frame_bytes ) // self.decoder["raw_dtype"].itemsize
+        needed  = self.num_frames + num_new
+        if ( needed > len( self.data ) ):
+            data = np.empty( max( needed, 2*len( self.data ) ), 
+                             dtype = self.decoder["dtype"] )
+            data[:self.num_frames] = self.data[:self.num_frames]
+            self.data = data
+        appa_decode_frames( frame_bytes, 
+                            self.decoder, 
+                            out = self.data[self.num_frames:needed] )
+        self.num_frames = needed
+        return self.data[needed - num_new:needed]
+
+    # Decoded frames received so far
+    def frames( self ):
+        return self.data[:self.num_frames]
+## class appa_frame_buffer ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         appa_write_csv                                                           #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Writes decoded frames to a csv file in one pass                          #
+#                                                                                  #
+####################################################################################
+def appa_write_csv( filename, frames, decoder ):
+    with open( filename, "w" ) as outfile:
+        outfile.write( ",".join( frames.dtype.names ) + "\n" )
+        if ( len( frames ) > 0 ):
+            np.savetxt( outfile, 
+                        frames, 
+                        fmt       = decoder["csv_formats"], 
+                        delimiter = "," )
+## appa_write_csv ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         appa_build_flight_index                                                  #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Builds the segmentation index of a decoded extract. A new flight starts  #
+#         wherever the frame time resets (board reboot), and a new state segment   #
+#         starts wherever fc_state changes or a flight starts, so every segment    #
+#         lies within one flight. Erased frames after the last written frame are   #
+#         excluded, and erased frames between written frames are left out of the   #
+#         time bounds and reset detection                                          #
+#                                                                                  #
+####################################################################################
+def appa_build_flight_index( frames ):
+    # Erased flash decodes to all-ones header fields
+    erased   = ( ( frames["save_bit"] == 0xFF ) & 
+                 ( frames["fc_state"] == 0xFF ) &
+                 ( frames["time"]     == 0xFFFFFFFF/1000.0 ) )
+    written  = np.flatnonzero( ~erased )
+    num_rows = int( written[-1] ) + 1 if ( len( written ) > 0 ) else 0
+    written  = written[written < num_rows]
+    time     = frames["time"][:num_rows].astype( np.float64 )
+    fc_state = frames["fc_state"][:num_rows]
+
+    # Row offsets of each flight and of each state segment, with an end sentinel.
+    # A reset is a written frame earlier than the previous written frame
+    resets        = written[1:][np.diff( time[written] ) < 0]
+    flight_starts = np.concatenate( ( [0], resets, [num_rows] ) )
+    state_changes = np.flatnonzero( np.diff( fc_state ) != 0 ) + 1
+    state_starts  = np.union1d( state_changes, resets )
+    state_starts  = np.concatenate( ( [0], state_starts, [num_rows] ) )
+    if ( num_rows == 0 ):
+        flight_starts = flight_starts[1:]
+        state_starts  = state_starts[1:]
+
+    # Time bounds of each flight and state segment, ignoring erased frames
+    valid_time = np.where( erased[:num_rows], np.nan, time )
+    def time_bounds( starts ):
+        if ( num_rows == 0 ):
+            return np.empty( 0 ), np.empty( 0 )
+        with np.errstate( invalid = 'ignore' ):
+            return ( np.fmin.reduceat( valid_time, starts[:-1] ),
+                     np.fmax.reduceat( valid_time, starts[:-1] ) )
+    flight_time_min, flight_time_max = time_bounds( flight_starts )
+    state_time_min , state_time_max  = time_bounds( state_starts  )
+
+    return {
+           "num_rows"       : np.int64( num_rows )                     ,
+           "flight_starts"  : flight_starts.astype( np.int64 )         ,
+           "flight_lengths" : np.diff( flight_starts ).astype( np.int64 ),
+           "flight_time_min": flight_time_min                          ,
+           "flight_time_max": flight_time_max                          ,
+           "state_starts"   : state_starts.astype( np.int64 )          ,
+           "state_values"   : fc_state[state_starts[:-1]]              ,
+           "state_time_min" : state_time_min                           ,
+           "state_time_max" : state_time_max
+           }
+## appa_build_flight_index ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         appa_load_flight_index                                                   #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Loads the segmentation index written alongside an extract                #
+#                                                                                  #
+####################################################################################
+def appa_load_flight_index( filename = appa_index_filename ):
+    with np.load( filename ) as index_file:
+        return { key: index_file[key] for key in index_file.files }
+## appa_load_flight_index ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         appa_flight_segments                                                     #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the state segments of one flight as (fc_state, start row, stop   #
+#         row, start time, stop time) tuples, rows relative to the start of the    #
+#         flight                                                                   #
+#                                                                                  #
+####################################################################################
+def appa_flight_segments( index, flight_num ):
+    flight_start = index["flight_starts"][flight_num]
+    flight_stop  = index["flight_starts"][flight_num + 1]
+    state_starts = index["state_starts"]
+
+    # Binary search for the state segments overlapping the flight
+    first = np.searchsorted( state_starts, flight_start, side = "right" ) - 1
+    last  = np.searchsorted( state_starts, flight_stop , side = "left"  )
+    segments = []
+    for i in range( first, last ):
+        start = max( state_starts[i]    , flight_start )
+        stop  = min( state_starts[i + 1], flight_stop  )
+        segments.append( ( int( index["state_values"][i]   ), 
+                           int( start - flight_start       ), 
+                           int( stop  - flight_start       ),
+                           float( index["state_time_min"][i] ),
+                           float( index["state_time_max"][i] ) ) )
+    return segments
+## appa_flight_segments ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         appa_find_flight                                                         #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the number of the flight containing an extract row               #
+#                                                                                  #
+####################################################################################
+def appa_find_flight( index, row ):
+    return int( np.searchsorted( index["flight_starts"], row, side = "right" ) ) - 1
+## appa_find_flight ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         appa_load_flight                                                         #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Loads the rows of a single flight from the binary extract. Only the      #
+#         requested rows are read from disk                                        #
+#                                                                                  #
+####################################################################################
+def appa_load_flight( flight_num, index = None, filename = appa_frames_filename ):
+    if ( index is None ):
+        index = appa_load_flight_index()
+    start  = index["flight_starts"][flight_num]
+    stop   = index["flight_starts"][flight_num + 1]
+    frames = np.load( filename, mmap_mode = "r" )
+    return np.array( frames[start:stop] )
+## appa_load_flight ##
 
 
 def calculate_sensor_frame_size(dataBitmask):
@@ -424,14 +762,12 @@ def flash_extract_keys(dataBitmask):
 def flash_extract_parse(serialObj, rx_byte_blocks):
     global preset_data_bitmask
 
-    # Parse contents into bytes
-    sensor_frame_int = []
-    for sensor_block in rx_byte_blocks:
-        for sensor_byte in sensor_block:
-            sensor_frame_int.append( ord( sensor_byte ) )
+    # Join the received blocks into one contiguous image
+    flash_bytes = hw_commands.join_frame_blocks( 
+                              rx_byte_blocks, 
+                              hw_commands.get_sensor_frame_size( serialObj ) )
 
-    preset_int = []
-    preset_strings = appa_parse_preset(serialObj, sensor_frame_int[2:preset_size + 2])
+    preset_strings = appa_parse_preset(serialObj, list( flash_bytes[2:preset_size + 2] ))
 
     print(str(preset_data_bitmask))
 
@@ -449,18 +785,28 @@ def flash_extract_parse(serialObj, rx_byte_blocks):
 
     print( str(sensor_frame_size) )
 
-    # This is where the fun begins
-    # start = math.ceil(preset_size, sensor_frame_size)
-    start = num_preset_frames * sensor_frame_size
-    stop = int( start + sensor_frame_size )
-    print( str( start ) + " | " + str( stop ) )
-    with open("output/appa_sensor_data.csv", "w") as outfile:
-        outfile.write(flash_extract_keys(preset_data_bitmask) + "\n")
-        # magic number should be moved
-        while stop < 524288:
-            outfile.write(appa_parse_frame(sensor_frame_int[start:stop], preset_data_bitmask) + "\n")
-            start += sensor_frame_size
-            stop += sensor_frame_size
+    # Decode every whole frame after the preset frames, re-decoding only the 
+    # chunks that changed since a previous extract with the same bitmask. Chunks
+    # are whole frames of the firmware's fixed frame layout
+    start   = num_preset_frames * sensor_frame_size
+    decoder = appa_frame_decoder( preset_data_bitmask )
+    frames  = decode_cache.cached_decode( 
+                               flash_bytes[start:]     ,
+                               serialObj.controller    ,
+                               serialObj.firmware      ,
+                               str( appa_decoder_version ) + "|" + str( preset_data_bitmask ),
+                               lambda raw_bytes: appa_decode_frames( raw_bytes, decoder ),
+                               decoder["raw_dtype"].itemsize
+                                        )
+    print( str( start ) + " | " + str( len( frames ) ) + " frames" )
+
+    appa_write_csv( appa_sensor_data_filename, frames, decoder )
+
+    # Keep a binary copy and a segmentation index for per-flight queries
+    index = appa_build_flight_index( frames )
+    np.save( appa_frames_filename, frames )
+    np.savez( appa_index_filename, **index )
+    print( str( len( index["flight_lengths"] ) ) + " flight(s) indexed" )
 
     return serialObj
 
@@ -32,6 +32,39 @@ if ( 'debug' in cmd_args ):
 else:
     sdr_debug = False
 
+# Decoded flash extract cache location and disk budget
+decode_cache_dir        = "output/.decode_cache"
+decode_cache_max_bytes  = 256*1024*1024 # 256 MB
+decode_cache_chunk_size = 16*1024       # 16 kB, rounded down to whole frames
+
+# Catalog of extracted dual deploy runs
+dual_deploy_output_dir   = "output/dual-deploy"
+dual_deploy_catalog_file = "output/dual-deploy/catalog.db"
+
+# Telemetry session recordings, segments rotate by size or age
+telemetry_record_dir          = "output/telemetry"
+telemetry_segment_max_bytes   = 64*1024*1024 # 64 MB
+telemetry_segment_max_seconds = 600          # 10 min
+telemetry_index_stride        = 256          # records per sparse index entry
+
+# Session the terminal starts with, commands without an @NAME prefix run on the
+# active session
+default_session_name = "default"
+
+# Board identify timeout of each port probed at startup or by session scan
+discovery_probe_timeout = 0.25 # s
+
+# Local telemetry publish server port, and the most records queued for one
+# subscriber before its oldest are dropped
+telemetry_server_port      = 5760
+telemetry_server_queue_max = 256
+
+# Timed command sequence logs
+sequence_log_dir = "output/sequences"
+
+# Keypress to acknowledge latency budget of abort and stop commands
+priority_latency_budget = 0.050 # 50 ms
+
 
 ###################################################################################
 # END OF FILE                                                                     # 
@@ -778,10 +778,24 @@ sensor_formats = {
                            "pt6": int,
                            "pt7": int,
                            "tc" : int,
-                           "lc" : int 
+                           "lc" : int ,
+                           "oxfr": float,
+                           "ffr" : float
                            }
                  }
 
+# Channels derived from sensor readouts: description, vectorized conversion 
+# function, and the upstream and downstream sensors of the differential pressure
+derived_sensors = {
+                # Engine Controller rev 5.0
+                controller_names[7]: {
+                           "oxfr": ( "LOX Mass Flow Rate" , 
+                                     sensor_conv.ox_pressures_to_flow  , "pt1", "pt2" ),
+                           "ffr" : ( "Fuel Mass Flow Rate", 
+                                     sensor_conv.fuel_pressures_to_flow, "pt6", "pt5" )
+                           }
+                  }
+
 # Filenames for flash extract outputs 
 sensor_data_filenames = {
                         # Flight Computer rev 1.0
@@ -0,0 +1,199 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# decode_cache.py -- Content-addressed cache of decoded flash extracts             #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import os
+import hashlib
+import numpy as np
+
+# Project imports
+from   config      import *
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         cache_key                                                                #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the cache key of a raw extract: a SHA-256 of the extract bytes   #
+#         and the identity of the controller, firmware, and decoder used           #
+#                                                                                  #
+####################################################################################
+def cache_key( raw_bytes, controller, firmware, decoder_version ):
+    key_hash = hashlib.sha256( raw_bytes )
+    identity = "|" + str( controller ) + "|" + str( firmware ) + "|" + str( decoder_version )
+    key_hash.update( identity.encode() )
+    return key_hash.hexdigest()
+## cache_key ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         cache_load                                                               #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the cached decode for a key, or None on a miss. A hit refreshes  #
+#         the entry's modification time, which orders LRU eviction                 #
+#                                                                                  #
+####################################################################################
+def cache_load( key ):
+    filename = os.path.join( decode_cache_dir, key + ".npy" )
+    try:
+        data = np.load( filename )
+    except ( OSError, ValueError ):
+        return None
+    os.utime( filename )
+    return data
+## cache_load ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         cache_store                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Stores a decoded array under a key, then unless evict is False, evicts   #
+#         least recently used entries until the cache fits in its disk budget      #
+#                                                                                  #
+####################################################################################
+def cache_store( key, data, evict = True ):
+    os.makedirs( decode_cache_dir, exist_ok = True )
+    filename = os.path.join( decode_cache_dir, key + ".npy" )
+
+    # Write to a temporary file first so a partial entry is never loaded
+    tmp_filename = filename + ".tmp"
+    with open( tmp_filename, "wb" ) as file:
+        np.save( file, data )
+    os.replace( tmp_filename, filename )
+
+    if ( evict ):
+        cache_evict( decode_cache_max_bytes )
+## cache_store ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         cache_evict                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Deletes the least recently used entries until the cache holds at most    #
+#         max_bytes                                                                #
+#                                                                                  #
+####################################################################################
+def cache_evict( max_bytes ):
+    entries = []
+    for entry in os.scandir( decode_cache_dir ):
+        if ( entry.is_file() and entry.name.endswith( ".npy" ) ):
+            stat = entry.stat()
+            entries.append( ( stat.st_mtime, stat.st_size, entry.path ) )
+
+    total_bytes = sum( size for _, size, _ in entries )
+    for _, size, path in sorted( entries ):
+        if ( total_bytes <= max_bytes ):
+            break
+        os.remove( path )
+        total_bytes -= size
+## cache_evict ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         chunked_decode                                                           #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Decodes a raw extract in fixed-size chunks aligned to whole frames.      #
+#         Each chunk is cached by its own hash, so only chunks that differ from    #
+#         previously decoded images are passed to decode_func, and the result is   #
+#         spliced from the cached and freshly decoded chunks. The cache is evicted #
+#         once after all chunks are stored                                         #
+#                                                                                  #
+####################################################################################
+def chunked_decode( raw_bytes, controller, firmware, decoder_version, decode_func, 
+                    frame_size ):
+    chunk_size  = max( 1, decode_cache_chunk_size // frame_size )*frame_size
+    num_bytes   = len( raw_bytes ) - ( len( raw_bytes ) % frame_size )
+    chunks      = []
+    num_decoded = 0
+    for start in range( 0, num_bytes, chunk_size ):
+        chunk_bytes = raw_bytes[start:min( start + chunk_size, num_bytes )]
+        chunk_key   = cache_key( chunk_bytes, 
+                                 controller , 
+                                 firmware   , 
+                                 str( decoder_version ) + "|chunk" )
+        chunk       = cache_load( chunk_key )
+        if ( chunk is None ):
+            chunk = decode_func( chunk_bytes )
+            cache_store( chunk_key, chunk, evict = False )
+            num_decoded += 1
+        chunks.append( chunk )
+    if ( num_decoded > 0 ):
+        cache_evict( decode_cache_max_bytes )
+
+    print( "Decoded " + str( num_decoded ) + " of " + str( len( chunks ) ) + 
+           " chunks" )
+    if ( len( chunks ) == 0 ):
+        return decode_func( raw_bytes[:0] )
+    return np.concatenate( chunks )
+## chunked_decode ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         cached_decode                                                            #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the decode of a raw extract, calling decode_func( raw_bytes )    #
+#         and caching its array result only on a cache miss. When frame_size is    #
+#         given, only the image's chunks are cached, not the whole image, and a    #
+#         miss re-decodes only the chunks of the image that changed                #
+#                                                                                  #
+####################################################################################
+def cached_decode( raw_bytes, controller, firmware, decoder_version, decode_func,
+                   frame_size = None ):
+    if ( frame_size is not None ):
+        return chunked_decode( raw_bytes      , 
+                               controller     , 
+                               firmware       , 
+                               decoder_version, 
+                               decode_func    , 
+                               frame_size )
+
+    key  = cache_key( raw_bytes, controller, firmware, decoder_version )
+    data = cache_load( key )
+    if ( data is not None ):
+        print( "Decoded data loaded from cache" )
+        return data
+    data = decode_func( raw_bytes )
+    cache_store( key, data )
+    return data
+## cached_decode ##
+
+
+###################################################################################
+# END OF FILE                                                                     # 
+###################################################################################
@@ -0,0 +1,148 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# discovery.py -- Concurrent probing of serial ports for SDR boards                #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+####################################################################################
+# Every candidate port is opened and sent the connect opcode at the same time on   #
+# the transport loop, and each probe waits a short time for the board identifier   #
+# and firmware id. Startup waits for the slowest probe rather than the sum of the  #
+# connect timeouts. Ports which answer stay open, connected to their board         #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import asyncio
+import serial
+import serial.tools.list_ports
+
+# Project imports
+import transport
+from   config      import *
+from   controller  import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Board connect opcode and baudrate
+probe_opcode   = b'\x02'
+probe_baudrate = 921600
+
+# USB to UART bridge of SDR boards
+probe_port_description = "CP2102"
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         candidate_ports                                                          #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the names of the serial ports with an SDR board's USB bridge     #
+#                                                                                  #
+####################################################################################
+def candidate_ports():
+    return [ port.device for port in serial.tools.list_ports.comports()
+             if ( probe_port_description in ( port.description or "" ) ) ]
+## candidate_ports ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         probe                                                                    #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Coroutine which opens a port as a new session_class (terminalData) and   #
+#         identifies its board. Returns the connected terminalData with its port   #
+#         timeout set to port_timeout, or None with the port closed if no board    #
+#         answered within timeout                                                  #
+#                                                                                  #
+####################################################################################
+async def probe( port_name, session_class, timeout, port_timeout ):
+    serialObj = session_class()
+    serialObj.initComport( probe_baudrate, port_name, timeout )
+    try:
+        await asyncio.get_running_loop().run_in_executor( None, serialObj.openComport )
+    except ( serial.SerialException, OSError ):
+        return None
+
+    connected = False
+    try:
+        serialObj.serialObj.reset_input_buffer()
+        response = await serialObj.transport.exchange( probe_opcode, 1, timeout )
+        if ( response not in controller_codes ):
+            return None
+        controller = controller_descriptions[response]
+        firmware   = None
+        if ( controller in firmware_id_supported_boards ):
+            firmware = firmware_ids.get( await serialObj.transport.read_exactly( 1, timeout ) )
+            if ( firmware is None ):
+                return None
+        serialObj.set_SDR_controller( controller, firmware )
+        serialObj.timeout = port_timeout
+        serialObj.configComport()
+        connected = True
+        return serialObj
+    except ( serial.SerialException, OSError ):
+        return None
+    finally:
+        if ( not connected ):
+            serialObj.serialObj.close()
+## probe ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         discover                                                                 #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Probes ports concurrently, returning a dictionary of port name to the    #
+#         terminalData connected to the board found on that port, in port order    #
+#                                                                                  #
+####################################################################################
+def discover( port_names, session_class, port_timeout, timeout = discovery_probe_timeout ):
+    results = transport.run_all( [ probe( port_name, session_class, timeout, port_timeout )
+                                   for port_name in port_names ] )
+    return { port_name: serialObj for port_name, serialObj in zip( port_names, results )
+             if ( ( serialObj is not None ) and ( not isinstance( serialObj, BaseException ) ) ) }
+## discover ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         describe_board                                                           #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns a line describing the board found on a port                      #
+#                                                                                  #
+####################################################################################
+def describe_board( port_name, serialObj ):
+    return ( port_name + ": " + serialObj.controller +
+             ( ", firmware: " + serialObj.firmware if serialObj.firmware else "" ) )
+## describe_board ##
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
@@ -18,6 +18,8 @@
 ####################################################################################
 import serial.tools.list_ports
 import time
+import sys
+import os
 
 
 ####################################################################################
@@ -26,6 +28,12 @@ import time
 import commands
 import hw_commands
 import controller
+import jobs
+import recorder
+import limits
+import publisher
+import telemetry
+import transactions
 from   config   import *
 
 
@@ -36,67 +44,6 @@ supported_boards = ["Liquid Engine Controller (L0002 Rev 4.0)",
                     "Liquid Engine Controller (L0002 Rev 5.0)",
 				    "Flight Computer (A0002 Rev 1.0)" ]
 
-# Numbers assigned to each valve 
-valve_nums = {
-			"oxPress"  : 1,
-			"fuelPress": 2,
-			"oxPurge"  : 5,
-			"fuelPurge": 6,
-			"oxVent"   : 3,
-			"fuelVent" : 4,
-			"oxMain"   : 7,
-			"fuelMain" : 8
-             }
-
-# Valve on/off states
-valve_on_states = {
-				"oxPress"  : "OPEN",
-				"fuelPress": "OPEN",
-				"oxPurge"  : "CLOSED",
-				"fuelPurge": "CLOSED",
-				"oxVent"   : "CLOSED",
-				"fuelVent" : "CLOSED",
-				"oxMain"   : "OPEN"  ,
-				"fuelMain" : "OPEN"
-                  }
-
-valve_off_states = {
-				"oxPress"  : "CLOSED",
-				"fuelPress": "CLOSED",
-				"oxPurge"  : "OPEN"  ,
-				"fuelPurge": "OPEN"  ,
-				"oxVent"   : "OPEN"  ,
-				"fuelVent" : "OPEN"  ,
-				"oxMain"   : "CLOSED",
-				"fuelMain" : "CLOSED"
-                   }
-
-
-####################################################################################
-# Shared Procedures                                                                #
-####################################################################################
-
-
-####################################################################################
-#                                                                                  #
-# PROCEDURE:                                                                       #
-#         extract_valve_state                                                      #
-#                                                                                  #
-# DESCRIPTION:                                                                     #
-#         extracts extracts the state of each valve from telemetry byte            #
-#                                                                                  #
-####################################################################################
-def extract_valve_state( valve_state_byte ):
-	valve_state_int = ord( valve_state_byte )
-	valve_states    = {}
-	for valve in valve_nums:
-		if ( valve_state_int & ( 1 << ( valve_nums[valve] - 1 ) ) ):
-			valve_states[valve] = valve_on_states[valve]
-		else:
-			valve_states[valve] = valve_off_states[valve]
-	return valve_states
-## extract_valve_state ## 
-
 
 ####################################################################################
 # Procedures                                                                       #
@@ -210,18 +157,16 @@ def power(Args, serialObj):
 
 ####################################################################################
 #                                                                                  #
-# COMMAND:                                                                         #
-# 		hotfire_abort                                                              #
+# PROCEDURE:                                                                       #
+# 		send_abort                                                                 #
 #                                                                                  #
 # DESCRIPTION:                                                                     #
-# 		Sends the hotfire abort commands to the engine controller                  #
+# 		Sends the hotfire abort opcode on the priority path and reports the        #
+#       response. Used by the abort command, limit aborts and sequences.           #
+#       Returns True if the engine controller acknowledged the abort               #
 #                                                                                  #
 ####################################################################################
-def hotfire_abort( Args, serialObj ):
-	################################################################################
-    # Local Variables                                                              #
-	################################################################################
-
+def send_abort( serialObj, name = "abort", keypress_time = None ):
 	# Command opcode
 	opcode = b'\x90' 
 
@@ -229,6 +174,34 @@ def hotfire_abort( Args, serialObj ):
 	ack_byte    = b'\x95'
 	no_ack_byte = b'\x98'
 
+	print( "Aborting Hotfire ... " )
+
+	# Send opcode ahead of other traffic and wait for the response
+	response = transactions.transact_priority( serialObj, opcode, response_size = 1,
+	                                            name          = name,
+	                                            keypress_time = keypress_time )
+	if ( response == ack_byte ):
+		print( "Hotfire sucessfully aborted" )
+		serialObj.set_engine_state( "Abort State" )
+		return True
+	elif ( response == no_ack_byte ):
+		print( "Abort unsuccessful. No response from engine controller" )
+	else:
+		print( "Abort unsuccessful. Timeout or unrecognized response" )
+	return False
+## send_abort ##
+
+
+####################################################################################
+#                                                                                  #
+# COMMAND:                                                                         #
+# 		hotfire_abort                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+# 		Sends the hotfire abort commands to the engine controller                  #
+#                                                                                  #
+####################################################################################
+def hotfire_abort( Args, serialObj ):
 	################################################################################
 	# Command-Specific Checks                                                      #
 	################################################################################
@@ -244,20 +217,7 @@ def hotfire_abort( Args, serialObj ):
 	################################################################################
 	# Command Implementation                                                       #
 	################################################################################
-	print( "Aborting Hotfire ... " )
-
-	# Send opcode
-	serialObj.sendByte( opcode )
-
-	# Wait for and parse acknowledge signal
-	response = serialObj.readByte()
-	if ( response == ack_byte ):
-		print( "Hotfire sucessfully aborted" )
-		serialObj.set_engine_state( "Abort State" )
-	elif ( response == no_ack_byte ):
-		print( "Abort unsuccessful. No response from engine controller" )
-	else:
-		print( "Abort unsuccessful. Timeout or unrecognized response" )
+	send_abort( serialObj, "abort", serialObj.command_time )
 	return serialObj
 ## hotfire_abort ##
 
@@ -286,9 +246,6 @@ def telreq( Args, serialObj, show_output = True ):
 	# Size of sensor dump
 	sensor_dump_size = 40
 
-	 # Complete list of sensor names/numbers 
-	sensor_numbers = list( controller.controller_sensors[serialObj.controller].keys() )
-
 	################################################################################
 	# Command-Specific Checks                                                      #
 	################################################################################
@@ -301,9 +258,45 @@ def telreq( Args, serialObj, show_output = True ):
               "establish a valid connection.")
 		return serialObj
 
+	# Streaming options
+	stream       = False
+	rate         = None
+	log_filename = None
+	limits_file  = None
+	arg_num      = 0
+	while ( arg_num < len( Args ) ):
+		if   ( Args[arg_num] == "--stream" ):
+			stream = True
+		elif ( ( Args[arg_num] == "--rate" ) and ( arg_num + 1 < len( Args ) ) ):
+			arg_num += 1
+			try:
+				rate = float( Args[arg_num] )
+			except ValueError:
+				rate = 0
+			if ( rate <= 0 ):
+				print( "Error: --rate requires a positive rate in Hz" )
+				return serialObj
+		elif ( ( Args[arg_num] == "--log" ) and ( arg_num + 1 < len( Args ) ) ):
+			arg_num += 1
+			log_filename = Args[arg_num]
+		elif ( ( Args[arg_num] == "--limits" ) and ( arg_num + 1 < len( Args ) ) ):
+			arg_num += 1
+			limits_file = Args[arg_num]
+		else:
+			print( "Error: Unrecognized telreq input: " + Args[arg_num] + 
+			       ". Usage: telreq [--stream [--rate Hz] [--log file] [--limits file]]" )
+			return serialObj
+		arg_num += 1
+	if ( ( not stream ) and 
+	     ( ( rate is not None ) or ( log_filename is not None ) or ( limits_file is not None ) ) ):
+		print( "Error: --rate, --log and --limits require --stream" )
+		return serialObj
+
 	################################################################################
 	# Command Implementation                                                       #
 	################################################################################
+	if ( stream ):
+		return telreq_stream( serialObj, rate, log_filename, limits_file )
 
 	# Send opcode 
 	serialObj.sendByte( opcode )
@@ -314,21 +307,19 @@ def telreq( Args, serialObj, show_output = True ):
 		print( "Telemetry request unsucessful. Cannot reach engine controller" )
 		return serialObj
 
-	# Get sensor data
-	sensor_data_bytes = serialObj.readBytes( sensor_dump_size )
-
-	# Get the valve state
-	valve_state_byte = serialObj.readByte() 
+	# Get the sensor data and valve state
+	dump_bytes = serialObj.readBlock( sensor_dump_size + 1 )
+	if ( len( dump_bytes ) < sensor_dump_size + 1 ):
+		print( "Telemetry request unsucessful. Timeout" )
+		return serialObj
 
-	# Process sensor data
-	serialObj.sensor_readouts = hw_commands.get_sensor_readouts(
-												serialObj.controller,
-												sensor_numbers       ,
-												sensor_data_bytes
-	                                                           )
-	
-	# Process the valve data
-	serialObj.valve_states = extract_valve_state( valve_state_byte )
+	# Decode the sensor data and valve state
+	layout                    = telemetry.telemetry_layout( serialObj.controller )
+	serialObj.sensor_readouts = dict( zip( layout["sensors"], 
+	                                       telemetry.telemetry_decode( layout, dump_bytes ) ) )
+	serialObj.valve_states    = telemetry.extract_valve_state( dump_bytes[sensor_dump_size:] )
+	serialObj.sensor_readouts.update( telemetry.derived_channels( serialObj.controller, 
+	                                                              serialObj.sensor_readouts ) )
 
 	# Display Sensor readouts
 	if ( show_output ):
@@ -345,6 +336,125 @@ def telreq( Args, serialObj, show_output = True ):
 ## telreq ##
 
 
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+# 		telreq_stream                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+# 		Issues telemetry requests back-to-back, or at a fixed rate in Hz, until    #
+#       Ctrl+C. Frames are decoded with a precompiled layout, stamped with the     #
+#       host time, optionally recorded to a telemetry session and optionally       #
+#       checked against a limits file, while the console shows the latest          #
+#       readouts a few times a second                                              #
+#                                                                                  #
+####################################################################################
+def telreq_stream( serialObj, rate = None, log_filename = None, limits_file = None ):
+	opcode           = b'\x96'
+	ack_byte         = b'\x95'
+	sensor_dump_size = 40
+	display_period   = 0.25 # s
+
+	layout   = telemetry.telemetry_layout( serialObj.controller )
+	engine   = None
+	if ( limits_file is not None ):
+		engine = limits.load_limit_engine( limits_file, serialObj.controller )
+		if ( engine is None ):
+			return serialObj
+	metadata = { "controller": serialObj.controller, 
+	             "source"    : "telreq"            ,
+	             "session"   : serialObj.name      }
+	log_file = None
+	if ( log_filename is not None ):
+		log_file = recorder.telemetry_recorder( 
+		                    os.path.join( telemetry_record_dir, log_filename ),
+		                    layout["record_dtype"],
+		                    metadata )
+	stream   = publisher.publish_open( layout["record_dtype"], metadata )
+
+	period       = ( 1.0/rate ) if ( rate is not None ) else 0.0
+	next_time    = time.perf_counter()
+	start_time   = next_time
+	display_time = next_time
+	num_frames   = 0
+	num_missed   = 0
+	readouts     = None
+	valve_byte   = b'\x00'
+	print( "Streaming telemetry, Ctrl+C to exit" )
+	try:
+		while ( not jobs.stop_requested( serialObj ) ):
+			# Hold the request rate, after a stall the schedule restarts from now
+			# rather than sending the missed requests back to back. The wait ends
+			# early when the stream is stopped, no request follows a stop
+			if ( period > 0 ):
+				if ( jobs.job_sleep( serialObj, next_time - time.perf_counter() ) ):
+					break
+				next_time = max( next_time + period, time.perf_counter() )
+
+			# A missed ack or short frame leaves the rest of that response in the
+			# input buffer, drop it so the next request starts in sync
+			serialObj.sendByte( opcode )
+			if ( serialObj.readByte() != ack_byte ):
+				if ( not serialObj.is_active() ):
+					break
+				num_missed += 1
+				serialObj.serialObj.reset_input_buffer()
+				continue
+			dump_bytes = serialObj.readBlock( sensor_dump_size + 1 )
+			host_time  = time.time()
+			if ( len( dump_bytes ) < sensor_dump_size + 1 ):
+				num_missed += 1
+				serialObj.serialObj.reset_input_buffer()
+				continue
+
+			readouts    = telemetry.telemetry_decode( layout, dump_bytes )
+			valve_byte  = dump_bytes[sensor_dump_size:]
+			num_frames += 1
+			if ( ( log_file is not None ) or ( publisher.server is not None ) ):
+				record = telemetry.telemetry_pack_record( layout, host_time, 
+				                                          readouts, valve_byte[0] )
+				if ( log_file is not None ):
+					log_file.write( record, host_time )
+				publisher.publish_records( stream, record )
+			if ( engine is not None ):
+				limits.limit_check_frame( engine, serialObj, host_time, layout, readouts )
+
+			# Throttled console view of the latest frame
+			now = time.perf_counter()
+			if ( now - display_time >= display_period ):
+				display_time     = now
+				display_readouts = dict( zip( layout["sensors"], readouts ) )
+				display_readouts.update( telemetry.derived_channels( serialObj.controller, 
+				                                                     display_readouts ) )
+				readouts_formatted = [ hw_commands.format_sensor_readout( 
+				                                       serialObj.controller, 
+				                                       sensor, 
+				                                       readout )
+				                       for sensor, readout in display_readouts.items() ]
+				sys.stdout.write( "\r" + "  ".join( readouts_formatted ) + 
+				                  "  ({:.1f} Hz)".format( num_frames/( now - start_time ) ) )
+				sys.stdout.flush()
+	except KeyboardInterrupt:
+		print()
+	finally:
+		if ( log_file is not None ):
+			log_file.close()
+		publisher.publish_close( stream )
+
+	elapsed = time.perf_counter() - start_time
+	print( "Telemetry stream stopped: " + str( num_frames ) + " frames in " + 
+	       "{:.1f} s, ".format( elapsed ) + str( num_missed ) + " missed" )
+
+	# Keep the latest frame as the current readouts
+	if ( readouts is not None ):
+		serialObj.sensor_readouts = dict( zip( layout["sensors"], readouts ) )
+		serialObj.sensor_readouts.update( telemetry.derived_channels( serialObj.controller, 
+		                                                              serialObj.sensor_readouts ) )
+		serialObj.valve_states    = telemetry.extract_valve_state( valve_byte )
+	return serialObj
+## telreq_stream ##
+
+
 ####################################################################################
 #                                                                                  #
 # COMMAND:                                                                         #
@@ -383,11 +493,9 @@ def pfpurge( Args, serialObj, show_output = True ):
 	################################################################################
 	print( "Initiating Pre-Hotfire Purge Sequence ... " )
 
-	# Send opcode
-	serialObj.sendByte( opcode )
-
-	# Wait for and parse acknowledge signal
-	response = serialObj.readByte()
+	# Send opcode and wait for the response
+	response = transactions.transact( serialObj, opcode, response_size = 1,
+	                                   name = "pfpurge" )
 	if ( response == ack_byte ):
 		print( "Pre-Hotfire purge sequence sucessfully initiated" )
 		serialObj.set_engine_state( "Pre-Fire Purge State" )
@@ -437,11 +545,9 @@ def fillchill( Args, serialObj, show_output = True ):
 	################################################################################
 	print( "Initiating Fill and Chill Sequence ... " )
 
-	# Send opcode
-	serialObj.sendByte( opcode )
-
-	# Wait for and parse acknowledge signal
-	response = serialObj.readByte()
+	# Send opcode and wait for the response
+	response = transactions.transact( serialObj, opcode, response_size = 1,
+	                                   name = "fillchill" )
 	if ( response == ack_byte ):
 		print( "Fill and Chill sequence sucessfully initiated" )
 		serialObj.set_engine_state( "Fill and Chill State" )
@@ -491,11 +597,9 @@ def standby( Args, serialObj, show_output = True ):
 	################################################################################
 	print( "Initiating Standby State ... " )
 
-	# Send opcode
-	serialObj.sendByte( opcode )
-
-	# Wait for and parse acknowledge signal
-	response = serialObj.readByte()
+	# Send opcode and wait for the response
+	response = transactions.transact( serialObj, opcode, response_size = 1,
+	                                   name = "standby" )
 	if ( response == ack_byte ):
 		print( "Standby sequence sucessfully initiated" )
 		serialObj.set_engine_state( "Standby State" )
@@ -545,11 +649,9 @@ def hotfire( Args, serialObj, show_output = True ):
 	################################################################################
 	print( "Initiating Hotfire ... " )
 
-	# Send opcode
-	serialObj.sendByte( opcode )
-
-	# Wait for and parse acknowledge signal
-	response = serialObj.readByte()
+	# Send opcode and wait for the response
+	response = transactions.transact( serialObj, opcode, response_size = 1,
+	                                   name = "hotfire" )
 	if ( response == ack_byte ):
 		print( "Ignition sequence sucessfully initiated" )
 		serialObj.set_engine_state( "Fire State" )
@@ -612,11 +714,9 @@ def hotfire_getstate( Args, serialObj, show_output = True ):
 	# Command Implementation                                                       #
 	################################################################################
 
-	# Send opcode 
-	serialObj.sendByte( opcode )
-
-	# Get response from engine controller
-	response = serialObj.readByte()
+	# Send opcode and wait for the response
+	response = transactions.transact( serialObj, opcode, response_size = 1,
+	                                   name = "getstate" )
 	if ( response == no_ack_byte ):
 		print( "Error: Could not reach engine controller" )
 		return serialObj
@@ -675,11 +775,10 @@ def stop_hotfire( Args, serialObj, show_output = True ):
 	################################################################################
 	print( "Halting Hotfire ... " )
 
-	# Send opcode
-	serialObj.sendByte( opcode )
-
-	# Wait for and parse acknowledge signal
-	response = serialObj.readByte()
+	# Send opcode ahead of other traffic and wait for the response
+	response = transactions.transact_priority( serialObj, opcode, response_size = 1,
+	                                            name          = "stophotfire",
+	                                            keypress_time = serialObj.command_time )
 	if ( response == ack_byte ):
 		print( "Hotfire sucessfully terminated" )
 	elif ( response == no_ack_byte ):
@@ -728,11 +827,10 @@ def stop_purge( Args, serialObj, show_output = True ):
 	################################################################################
 	print( "Stopping Purge ... " )
 
-	# Send opcode
-	serialObj.sendByte( opcode )
-
-	# Wait for and parse acknowledge signal
-	response = serialObj.readByte()
+	# Send opcode ahead of other traffic and wait for the response
+	response = transactions.transact_priority( serialObj, opcode, response_size = 1,
+	                                            name          = "stoppurge",
+	                                            keypress_time = serialObj.command_time )
 	if ( response == ack_byte ):
 		print( "Purge sucessfully terminated" )
 		serialObj.set_engine_state( "Disarm State" )
@@ -782,11 +880,9 @@ def kbottle_close( Args, serialObj, show_output = True ):
 	################################################################################
 	print( "Sending K-Bottle Close Command ... " )
 
-	# Send opcode
-	serialObj.sendByte( opcode )
-
-	# Wait for and parse acknowledge signal
-	response = serialObj.readByte()
+	# Send opcode and wait for the response
+	response = transactions.transact( serialObj, opcode, response_size = 1,
+	                                   name = "kbottleclose" )
 	if ( response == ack_byte ):
 		print( "Sucessful" )
 		serialObj.set_engine_state( "Post-Fire State" )
@@ -840,11 +936,9 @@ def tankstat( Args, serialObj, show_output = True ):
 	################################################################################
 	print( "Checking Tank Pressures ... " )
 
-	# Send opcode
-	serialObj.sendByte( opcode )
-
-	# Wait for and parse acknowledge signal
-	response = serialObj.readByte()
+	# Send opcode and wait for the response
+	response = transactions.transact( serialObj, opcode, response_size = 1,
+	                                   name = "tankstat" )
 	if ( response == no_ack_byte ):
 		print( "Unsuccessful. Could not reach engine controller" )
 	elif ( response == tank_unsafe_code ):
@@ -895,11 +989,9 @@ def lox_purge( Args, serialObj, show_output = True ):
 	################################################################################
 	print( "Initiating LOX Tank Purge ... " )
 
-	# Send opcode
-	serialObj.sendByte( opcode )
-
-	# Wait for and parse acknowledge signal
-	response = serialObj.readByte()
+	# Send opcode and wait for the response
+	response = transactions.transact( serialObj, opcode, response_size = 1,
+	                                   name = "loxpurge" )
 	if ( response == ack_byte ):
 		print( "Sucessful" )
 	elif ( response == no_ack_byte ):
@@ -948,11 +1040,9 @@ def manual( Args, serialObj, show_output = True ):
 	################################################################################
 	print( "Entering manual mode ... " )
 
-	# Send opcode
-	serialObj.sendByte( opcode )
-
-	# Wait for and parse acknowledge signal
-	response = serialObj.readByte()
+	# Send opcode and wait for the response
+	response = transactions.transact( serialObj, opcode, response_size = 1,
+	                                   name = "manual" )
 	if ( response == ack_byte ):
 		print( "Sucessful. Now in manual mode" )
 		serialObj.set_engine_state( "Manual State" )
@@ -21,15 +21,18 @@ import sys
 import os
 import time
 import datetime
+import numpy                    as np
 from   matplotlib import pyplot as plt
 
 # Project imports
 from   config      import *
 from   hw_commands import byte_array_to_int
 from   hw_commands import byte_array_to_float
-from   hw_commands import get_sensor_frames
-from   hw_commands import sensor_extract_data_filter
 import commands
+import decode_cache
+import flight_data
+import jobs
+import run_catalog
 import sensor_conv
 
 ####################################################################################
@@ -47,6 +50,64 @@ supported_boards = [
                    "Flight Computer (A0002 Rev 2.0)" 
                    ]
 
+# Version of the dual deploy frame decoder, bump when decoded output changes
+dual_deploy_decoder_version = 2
+
+# Dual deploy flash data region, 40960 Flight Computer Lite frames
+dual_deploy_num_frames  = 40960
+dual_deploy_frame_dtype = np.dtype( [ ( "time", "<u4" ), 
+                                      ( "pres", "<f4" ), 
+                                      ( "temp", "<f4" ) ] )
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         dual_deploy_num_logged_frames                                            #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the number of frames logged before the first erased (all 0xFF)   #
+#         frame in a dual deploy flash data region                                 #
+#                                                                                  #
+####################################################################################
+def dual_deploy_num_logged_frames( raw_bytes ):
+    frame_size  = dual_deploy_frame_dtype.itemsize
+    num_frames  = len( raw_bytes ) // frame_size
+    frame_bytes = np.frombuffer( raw_bytes, dtype = np.uint8, 
+                                 count = num_frames*frame_size ).reshape( num_frames, frame_size )
+    erased      = np.all( frame_bytes == 0xFF, axis = 1 )
+    if ( not np.any( erased ) ):
+        return num_frames
+    return int( np.argmax( erased ) )
+## dual_deploy_num_logged_frames ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         dual_deploy_decode_frames                                                #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Decodes Flight Computer Lite frames into an array of time (s),           #
+#         pressure (kPa) and temperature (C) rows                                  #
+#                                                                                  #
+####################################################################################
+def dual_deploy_decode_frames( raw_bytes ):
+    num_frames    = len( raw_bytes ) // dual_deploy_frame_dtype.itemsize
+    frames        = np.frombuffer( raw_bytes, dtype = dual_deploy_frame_dtype, 
+                                   count = num_frames )
+    sensor_frames = np.empty( ( num_frames, 3 ), dtype = np.float64 )
+    sensor_frames[:, 0] = frames["time"]/1000.0
+    sensor_frames[:, 1] = sensor_conv.baro_press( frames["pres"].astype( np.float64 ) )
+    sensor_frames[:, 2] = sensor_conv.baro_temp ( frames["temp"].astype( np.float64 ) )
+    return sensor_frames
+## dual_deploy_decode_frames ##
+
 
 ####################################################################################
 # Commands                                                                         #
@@ -267,25 +328,38 @@ def dual_deploy( Args, serialObj ):
         ground_press       = byte_array_to_float( serialObj.readBytes( 4 ) )
         ground_press      /= 1000
 
-        # Receive the flight data
-        rx_blocks = []
-        for i in range( 40960 ):
-            if ( i%100 == 0 ):
-                print( "Reading block " + str( i ) )
-            rx_frame_block = serialObj.readBytes( 12 )
-            rx_blocks.append( rx_frame_block )
-        
-        # Format the flight data
-        sensor_frames          = get_sensor_frames( "Flight Computer Lite (A0007 Rev 1.0)", 
-                                                     rx_blocks )
-        sensor_frames_filtered = sensor_extract_data_filter( sensor_frames )
+        # Receive the flight data in one bulk read
+        print( "Reading flight data..." )
+        frame_size   = dual_deploy_frame_dtype.itemsize
+        flight_bytes = serialObj.readBlock( dual_deploy_num_frames*frame_size )
+        if ( jobs.stop_requested( serialObj ) ):
+            print( "Dual deploy extract stopped after " + str( len( flight_bytes ) ) + 
+                   " bytes" )
+            return serialObj
+        elif ( len( flight_bytes ) == 0 ):
+            print( "Error: No flight data received" )
+            return serialObj
+        elif ( len( flight_bytes ) < dual_deploy_num_frames*frame_size ):
+            print( "Error: Flight data transfer timed out after " + 
+                   str( len( flight_bytes ) ) + " bytes" )
+
+        # Trim the erased frames and decode the logged flight data
+        num_frames    = dual_deploy_num_logged_frames( flight_bytes )
+        sensor_frames = decode_cache.cached_decode(
+                                         flight_bytes[:num_frames*frame_size],
+                                         serialObj.controller                ,
+                                         serialObj.firmware                  ,
+                                         dual_deploy_decoder_version         ,
+                                         dual_deploy_decode_frames           ,
+                                         frame_size
+                                                  )
+        print( str( num_frames ) + " frames logged" )
 
         # Croeate the output directory
         run_date = datetime.date.today()
-        run_date = run_date.strftime("%m-%d-%Y")
-        if ( not ( os.path.exists( "output/dual-deploy" ) ) ):
-            os.mkdir( "output/dual-deploy" )
-        base_output_dir = "output/dual-deploy/" + run_date
+        if ( not ( os.path.exists( dual_deploy_output_dir ) ) ):
+            os.mkdir( dual_deploy_output_dir )
+        base_output_dir = dual_deploy_output_dir + "/" + run_date.strftime("%m-%d-%Y")
         if ( not ( os.path.exists( base_output_dir ) ) ):
             os.mkdir( base_output_dir )
         test_num = 0
@@ -305,12 +379,28 @@ def dual_deploy( Args, serialObj ):
             file.write( "Landing Time      : " + str( land_time          ) + " ms \n" )
 
         # Export the flight data
+        np.save( output_dir + "/data.npy", sensor_frames )
         with open( output_dir + "/data.txt", 'w' ) as file:
-            for sensor_frame in sensor_frames_filtered:
-                for val in sensor_frame:
-                    file.write( str( val ) )
-                    file.write( '\t')
-                file.write( '\n' )    
+            np.savetxt( file, 
+                        sensor_frames, 
+                        fmt       = "%.15g", 
+                        delimiter = '\t'   , 
+                        newline   = '\t\n' )
+
+        # Record the run in the catalog
+        run_catalog.catalog_add_run( {
+                                     "run_date"          : run_date.isoformat(),
+                                     "run_num"           : test_num          ,
+                                     "main_alt"          : main_alt          ,
+                                     "drogue_delay"      : drogue_delay      ,
+                                     "ground_press"      : ground_press      ,
+                                     "main_deploy_time"  : main_deploy_time  ,
+                                     "drogue_deploy_time": drogue_deploy_time,
+                                     "land_time"         : land_time         ,
+                                     "header_file"       : output_dir + "/header.txt",
+                                     "data_file"         : output_dir + "/data.txt"  ,
+                                     "frames_file"       : output_dir + "/data.npy"
+                                     } )
         return serialObj
         # dual-deploy extract #
 
@@ -319,72 +409,30 @@ def dual_deploy( Args, serialObj ):
     ################################################################################
     elif ( subcommand == 'plot' ):
 
-        # Find most recent date of data extraction 
-        base_data_dirs             = os.listdir( "output/dual-deploy" )
-        base_data_dirs_recent      = []
-        base_data_dirs_most_recent = []
-        max_month = 1
-        for base_data_dir in base_data_dirs:
-            month = base_data_dir[0:2]
-            month = int( month )
-            if ( month >= max_month ):
-                max_month = month
-        for base_data_dir in base_data_dirs:
-            month = base_data_dir[0:2]
-            month = int( month )
-            if ( month == max_month ):
-                base_data_dirs_recent.append( base_data_dir )
-        max_day = 0
-        for base_data_dir in base_data_dirs_recent:
-            day = base_data_dir[3:5]
-            day = int( day )
-            if ( day > max_day ):
-                max_day = day
-        for base_data_dir in base_data_dirs_recent:
-            day = base_data_dir[3:5]
-            day = int( day )
-            if ( day == max_day ):
-                base_data_dirs_most_recent.append( base_data_dir )
-        base_data_dir = base_data_dirs_most_recent[-1]
-        base_data_dir = "output/dual-deploy/" + base_data_dir
-
-        # Find most recent data
-        data_num = 0
-        while ( os.path.exists( base_data_dir + "/data" + str( data_num ) ) ):
-            data_num += 1
-        data_dir = base_data_dir + "/data" + str( data_num - 1 )
-        header_filename = data_dir + "/header.txt"
-        data_filename   = data_dir + "/data.txt"
+        # Look up the most recent run, cataloging runs extracted before the 
+        # catalog existed if none are recorded
+        run = run_catalog.catalog_latest_run()
+        if ( run is None ):
+            run_catalog.catalog_import_runs()
+            run = run_catalog.catalog_latest_run()
+        if ( run is None ):
+            print( "Error: No dual deploy runs have been extracted" )
+            return serialObj
 
         # Extract the header data
-        with open( header_filename, "r" ) as file:
-            header_lines = file.readlines()
-            header_lines_split = []
-            for line in header_lines:
-                header_lines_split.append( line.split() )
-        main_deploy_alt    = float( header_lines_split[0][3] )
-        drogue_delay       = float( header_lines_split[1][3] )
-        ground_press       = float( header_lines_split[2][3] )
-        main_deploy_time   = float( header_lines_split[3][4] )/1000.0
-        drogue_deploy_time = float( header_lines_split[4][3] )/1000.0
-        landing_time       = float( header_lines_split[5][3] )/1000.0
+        main_deploy_alt    = run["main_alt"    ]
+        drogue_delay       = run["drogue_delay"]
+        main_deploy_time   = run["main_deploy_time"  ]/1000.0
+        drogue_deploy_time = run["drogue_deploy_time"]/1000.0
+        landing_time       = run["land_time"         ]/1000.0
 
         # Extract the flight data
-        sensor_time     = []
-        sensor_pressure = []
-        sensor_temp     = []
-        with open( data_filename, "r" ) as file:
-            data_lines = file.readlines()
-            for line in data_lines:
-                data_line_split = line.split()
-                sensor_time.append    ( float( data_line_split[0] ) )
-                sensor_pressure.append( float( data_line_split[1] ) )
-                sensor_temp.append    ( float( data_line_split[2] ) )
-                
-        # Calculate Altitude
-        sensor_altitude = []
-        for press in sensor_pressure:
-            sensor_altitude.append( sensor_conv.pressure_to_alt( press, ground_press ) )
+        flight, _       = flight_data.load_flight( os.path.dirname( run["header_file"] ),
+                                                   format = "dual-deploy" )
+        sensor_time     = flight["time"]
+        sensor_pressure = flight["pres"]
+        sensor_temp     = flight["temp"]
+        sensor_altitude = flight["alt" ]
         
         # Plot Pressure data
         plt.figure()
@@ -0,0 +1,544 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# flight_data.py -- Loaders and display downsamplers for extracted flight data     #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import os
+import json
+import hashlib
+import collections
+import numpy  as np
+import pandas as pd
+
+# Project imports
+import appa
+import telemetry
+import sensor_conv
+from   config      import *
+from   controller  import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Number of rows parsed at a time when loading extract text files
+load_chunk_rows = 100000
+
+# Maximum number of points drawn per plotted line
+plot_max_points = 10000
+
+# Memoized load_flight results, keyed by source path and format
+loaded_flights     = collections.OrderedDict()
+loaded_flights_max = 8
+
+# Columns written before the sensor readouts of every extract text row
+extract_frame_labels = [ "save_bit", "acc_launch_flag", "time" ]
+
+# Flight computer board running the APPA firmware
+appa_controller = controller_names[4]
+
+# Dual deploy run data columns and units
+dual_deploy_labels = [ "time", "pres", "temp" ]
+dual_deploy_units  = { "time": "s", "pres": "kPa", "temp": "C", "alt": "ft" }
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         load_extract_text                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Loads a tab-delimited extract text file into a 2D float64 array,         #
+#         parsing load_chunk_rows rows at a time                                   #
+#                                                                                  #
+####################################################################################
+def load_extract_text( filename, chunk_rows = load_chunk_rows ):
+
+    # Rows end in a trailing tab, count the columns from the first row
+    with open( filename, "r" ) as file:
+        first_line = file.readline()
+    num_columns = len( first_line.rstrip( '\n' ).rstrip( '\t' ).split( '\t' ) )
+    if ( first_line.strip() == "" ):
+        return np.empty( ( 0, num_columns ), dtype = np.float64 )
+
+    chunks = pd.read_csv( filename,
+                          sep       = '\t'                   ,
+                          header    = None                   ,
+                          usecols   = range( num_columns )   ,
+                          dtype     = np.float64             ,
+                          chunksize = chunk_rows )
+    return np.concatenate( [ chunk.to_numpy() for chunk in chunks ] )
+## load_extract_text ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         load_extract                                                             #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Loads extract data as a NumPy array. Binary .npy extracts are memory     #
+#         mapped rather than read, text extracts are parsed in chunks              #
+#                                                                                  #
+####################################################################################
+def load_extract( filename ):
+    if ( filename.endswith( ".npy" ) ):
+        return np.load( filename, mmap_mode = 'r' )
+    return load_extract_text( filename )
+## load_extract ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         trim_erased_frames                                                       #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Drops the run of identical rows at the end of an extract, which is       #
+#         erased flash decoded to the same values                                  #
+#                                                                                  #
+####################################################################################
+def trim_erased_frames( data ):
+    if ( len( data ) < 2 ):
+        return data
+    rows_equal  = np.all( ( data[1:] == data[:-1] ) |
+                          ( np.isnan( data[1:] ) & np.isnan( data[:-1] ) ), axis = 1 )
+    rows_differ = np.flatnonzero( ~rows_equal )
+    if ( len( rows_differ ) == 0 ):
+        return data[:0]
+    if ( rows_differ[-1] == len( rows_equal ) - 1 ):
+        return data
+    return data[:rows_differ[-1] + 1]
+## trim_erased_frames ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         file_sha256                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the SHA-256 hex digest of a file's contents                      #
+#                                                                                  #
+####################################################################################
+def file_sha256( filename ):
+    file_hash = hashlib.sha256()
+    with open( filename, "rb" ) as file:
+        for block in iter( lambda: file.read( 1024*1024 ), b'' ):
+            file_hash.update( block )
+    return file_hash.hexdigest()
+## file_sha256 ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         load_extract_filtered                                                    #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Loads an extract with its erased frames trimmed. The first load writes   #
+#         the trimmed array to a binary sidecar beside the source, keyed by the    #
+#         source's size, mtime and hash, and later loads memory map the sidecar    #
+#                                                                                  #
+####################################################################################
+def load_extract_filtered( filename ):
+    sidecar_file = filename + ".filtered.npy"
+    key_file     = filename + ".filtered.json"
+    source_stat  = os.stat( filename )
+    source_key   = { "size"    : source_stat.st_size    ,
+                     "mtime_ns": source_stat.st_mtime_ns }
+
+    # Check the sidecar key, only hashing the source if its size or mtime changed
+    sidecar_key = None
+    if ( os.path.exists( sidecar_file ) and os.path.exists( key_file ) ):
+        with open( key_file, "r" ) as file:
+            sidecar_key = json.load( file )
+    if ( sidecar_key is not None ):
+        if ( ( sidecar_key["size"]     == source_key["size"]     ) and 
+             ( sidecar_key["mtime_ns"] == source_key["mtime_ns"] ) ):
+            return np.load( sidecar_file, mmap_mode = 'r' )
+        source_key["sha256"] = file_sha256( filename )
+        if ( sidecar_key["sha256"] == source_key["sha256"] ):
+            with open( key_file, "w" ) as file:
+                json.dump( source_key, file )
+            return np.load( sidecar_file, mmap_mode = 'r' )
+
+    # Parse the source and write the sidecar
+    data = trim_erased_frames( load_extract( filename ) )
+    if ( "sha256" not in source_key ):
+        source_key["sha256"] = file_sha256( filename )
+    try:
+        with open( sidecar_file + ".tmp", "wb" ) as file:
+            np.save( file, data )
+        os.replace( sidecar_file + ".tmp", sidecar_file )
+        with open( key_file, "w" ) as file:
+            json.dump( source_key, file )
+    except OSError:
+        print( "Warning: Could not write parsed data sidecar for " + filename )
+    return data
+## load_extract_filtered ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         downsample_minmax                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Reduces a line to at most max_points points by keeping the minimum and   #
+#         maximum of each bin in time order, so peaks stay visible                 #
+#                                                                                  #
+####################################################################################
+def downsample_minmax( x, y, max_points = plot_max_points ):
+    x = np.asarray( x )
+    y = np.asarray( y )
+    if ( len( y ) <= max_points ):
+        return x, y
+
+    bin_size  = int( np.ceil( len( y )/( max_points//2 ) ) )
+    num_bins  = int( np.ceil( len( y )/bin_size ) )
+    padded    = np.full( num_bins*bin_size, y[-1] )
+    padded[:len( y )] = y
+    bins      = padded.reshape( num_bins, bin_size )
+    bin_start = np.arange( num_bins )*bin_size
+    min_index = np.minimum( bin_start + np.argmin( bins, axis = 1 ), len( y ) - 1 )
+    max_index = np.minimum( bin_start + np.argmax( bins, axis = 1 ), len( y ) - 1 )
+    indices   = np.sort( np.stack( ( min_index, max_index ), axis = 1 ), axis = 1 ).ravel()
+    return x[indices], y[indices]
+## downsample_minmax ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         downsample_lttb                                                          #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Reduces a line to max_points points with the largest-triangle-three-     #
+#         buckets algorithm, which preserves the visual shape of the line          #
+#                                                                                  #
+####################################################################################
+def downsample_lttb( x, y, max_points = plot_max_points ):
+    x = np.asarray( x, dtype = np.float64 )
+    y = np.asarray( y, dtype = np.float64 )
+    if ( ( len( y ) <= max_points ) or ( max_points < 3 ) ):
+        return x, y
+
+    # First and last points are kept, the rest are split into buckets
+    edges   = np.linspace( 1, len( y ) - 1, max_points - 1 ).astype( int )
+    indices = np.empty( max_points, dtype = int )
+    indices[0]  = 0
+    indices[-1] = len( y ) - 1
+    for i in range( max_points - 2 ):
+        start, stop = edges[i], edges[i + 1]
+
+        # Average of the next bucket, or the last point
+        if ( i < max_points - 3 ):
+            next_x = x[stop:edges[i + 2]].mean()
+            next_y = y[stop:edges[i + 2]].mean()
+        else:
+            next_x = x[-1]
+            next_y = y[-1]
+
+        # Keep the point forming the largest triangle with the previous point
+        prev_x = x[indices[i]]
+        prev_y = y[indices[i]]
+        areas  = np.abs( ( prev_x - next_x )*( y[start:stop] - prev_y ) -
+                         ( prev_x - x[start:stop] )*( next_y - prev_y ) )
+        indices[i + 1] = start + np.argmax( areas )
+    return x[indices], y[indices]
+## downsample_lttb ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         extract_labels                                                           #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the column labels of a board's extract text rows                 #
+#                                                                                  #
+####################################################################################
+def extract_labels( controller, firmware ):
+    labels = list( extract_frame_labels )
+    labels.extend( sensor_sizes.get( controller, controller_sensors[controller] ) )
+    if ( firmware == "Active Roll" ):
+        labels.append( "feedback" )
+    return labels
+## extract_labels ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         infer_controller                                                         #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Infers the board of an extract file from the sensor_data_filenames      #
+#         naming, returns None if the file name matches no board                   #
+#                                                                                  #
+####################################################################################
+def infer_controller( txt_file ):
+    filename   = os.path.basename( txt_file )
+    controller = None
+    stem_len   = 0
+    for name, data_filename in sensor_data_filenames.items():
+        stem = os.path.splitext( os.path.basename( data_filename ) )[0]
+        if ( filename.startswith( stem ) and ( len( stem ) > stem_len ) ):
+            controller = name
+            stem_len   = len( stem )
+    return controller
+## infer_controller ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         infer_firmware                                                           #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Infers the firmware layout of a controller's extract file from the       #
+#         number of columns in its first row. Returns "Active Roll" for the        #
+#         layout with the feedback column, otherwise None for the default layout   #
+#                                                                                  #
+####################################################################################
+def infer_firmware( txt_file, controller ):
+    with open( txt_file, "r" ) as file:
+        first_row = file.readline()
+    num_columns = len( [ field for field in first_row.split() if field != "" ] )
+    if ( num_columns == len( extract_labels( controller, "Active Roll" ) ) ):
+        return "Active Roll"
+    return None
+## infer_firmware ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         columns_to_records                                                       #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Views a 2D float64 array as a record array with one named field per      #
+#         column, unnamed extra columns are called col<N>                          #
+#                                                                                  #
+####################################################################################
+def columns_to_records( data, labels ):
+    data   = np.ascontiguousarray( data, dtype = np.float64 )
+    labels = list( labels[:data.shape[1]] )
+    labels.extend( "col" + str( i ) for i in range( len( labels ), data.shape[1] ) )
+    dtype  = np.dtype( [ ( label, np.float64 ) for label in labels ] )
+    return data.view( dtype ).reshape( len( data ) ).view( np.recarray )
+## columns_to_records ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         flight_format                                                            #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Detects the SDEC output format of a path: "dual-deploy" run folders,     #
+#         "appa-csv" and "appa-npy" APPA extracts, "npy" binary arrays, and        #
+#         "extract-text" flash extract text files                                  #
+#                                                                                  #
+####################################################################################
+def flight_format( path ):
+    if ( os.path.isdir( path ) ):
+        if ( os.path.exists( os.path.join( path, "header.txt" ) ) ):
+            return "dual-deploy"
+        return None
+    if ( path.endswith( ".csv" ) ):
+        with open( path, "r" ) as file:
+            header = file.readline().strip().split( "," )
+        if ( header[:3] == list( appa.appa_frame_header_dtypes ) ):
+            return "appa-csv"
+        return None
+    if ( path.endswith( ".npy" ) ):
+        data = np.load( path, mmap_mode = 'r' )
+        if ( ( data.dtype.names is not None ) and 
+             ( "fc_state" in data.dtype.names ) ):
+            return "appa-npy"
+        return "npy"
+    if ( path.endswith( ".txt" ) ):
+        return "extract-text"
+    return None
+## flight_format ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         load_appa_metadata                                                       #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the units, presets and flight index of an APPA extract, read     #
+#         from the preset and index files written beside it                        #
+#                                                                                  #
+####################################################################################
+def load_appa_metadata( path, names ):
+    units = { name: sensor_units[appa_controller].get( name ) for name in names }
+    units["time"] = "s"
+    metadata = { "controller": appa_controller, "firmware": "APPA", "units": units }
+
+    output_dir   = os.path.dirname( path )
+    preset_file  = os.path.join( output_dir, "appa_preset_data.txt" )
+    index_file   = os.path.splitext( path )[0] + "_index.npz"
+    if ( os.path.exists( preset_file ) ):
+        with open( preset_file, "r" ) as file:
+            metadata["presets"] = [ line.rstrip( "\n" ) for line in file ]
+    if ( os.path.exists( index_file ) ):
+        metadata["flight_index"] = appa.appa_load_flight_index( index_file )
+    return metadata
+## load_appa_metadata ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         load_dual_deploy_header                                                  #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Parses a dual deploy header.txt into values and units keyed by the       #
+#         snake_case header name, e.g. "ground_pressure"                           #
+#                                                                                  #
+####################################################################################
+def load_dual_deploy_header( header_file ):
+    values = {}
+    units  = {}
+    with open( header_file, "r" ) as file:
+        for line in file:
+            if ( ":" not in line ):
+                continue
+            name, value = line.split( ":", 1 )
+            name        = "_".join( name.lower().split() )
+            value       = value.split()
+            values[name] = float( value[0] )
+            units[name]  = value[1] if ( len( value ) > 1 ) else None
+    return values, units
+## load_dual_deploy_header ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         load_flight                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Loads any SDEC flight data output as a record array with named columns,  #
+#         and a metadata dictionary holding the format, source, board, column      #
+#         units and any format-specific header data. Loads are memoized until the  #
+#         source changes, and the returned arrays are read-only                    #
+#                                                                                  #
+####################################################################################
+def load_flight( path, format = None ):
+    if ( format is None ):
+        format = flight_format( path )
+    if ( format is None ):
+        print( "Error: Unrecognized flight data format: " + path )
+        return None, None
+
+    # Memoize on the source path and its modification time
+    source     = path
+    if ( format == "dual-deploy" ):
+        source = os.path.join( path, "header.txt" )
+    source_stat = os.stat( source )
+    memo_key    = ( os.path.abspath( path ), format )
+    memo_stamp  = ( source_stat.st_size, source_stat.st_mtime_ns )
+    if ( ( memo_key in loaded_flights ) and 
+         ( loaded_flights[memo_key][0] == memo_stamp ) ):
+        loaded_flights.move_to_end( memo_key )
+        return loaded_flights[memo_key][1]
+
+    metadata = { "format": format, "source": path, "controller": None, 
+                 "firmware": None, "units": {} }
+    if ( format == "extract-text" ):
+        controller = infer_controller( path )
+        data       = load_extract_filtered( path )
+        labels     = []
+        if ( controller is not None ):
+            labels = extract_labels( controller, None )
+            if ( data.shape[1] == len( labels ) + 1 ):
+                labels.append( "feedback" )
+                metadata["firmware"] = "Active Roll"
+            metadata["controller"] = controller
+            metadata["units"]      = dict( sensor_units.get( controller, {} ) )
+            metadata["units"]["time"] = "s"
+
+            # Derived channels become ordinary columns
+            derived = telemetry.derived_channels( controller, 
+                                                  dict( zip( labels, data.T ) ) )
+            if ( len( derived ) > 0 ):
+                data    = np.column_stack( [ data ] + list( derived.values() ) )
+                labels += list( derived )
+        flight = columns_to_records( data, labels )
+    elif ( format == "appa-csv" ):
+        frames_file = os.path.splitext( path )[0] + ".npy"
+        if ( os.path.exists( frames_file ) and 
+             ( os.stat( frames_file ).st_mtime_ns >= source_stat.st_mtime_ns ) ):
+            flight = np.load( frames_file, mmap_mode = 'r' ).view( np.recarray )
+        else:
+            flight = pd.read_csv( path ).to_records( index = False )
+        metadata.update( load_appa_metadata( path, flight.dtype.names ) )
+    elif ( format == "appa-npy" ):
+        flight = np.load( path, mmap_mode = 'r' ).view( np.recarray )
+        metadata.update( load_appa_metadata( path, flight.dtype.names ) )
+    elif ( format == "dual-deploy" ):
+        frames_file = os.path.join( path, "data.npy" )
+        if ( os.path.exists( frames_file ) ):
+            data = np.load( frames_file )
+        else:
+            data = load_extract_text( os.path.join( path, "data.txt" ) )
+        metadata["controller"] = controller_names[5]
+        metadata["firmware"]   = "Dual Deploy"
+        metadata["units"]      = dict( dual_deploy_units )
+        metadata["header"], metadata["header_units"] = load_dual_deploy_header( source )
+
+        # Altitude above ground for the whole pressure column at once
+        labels = list( dual_deploy_labels )
+        if ( "ground_pressure" in metadata["header"] ):
+            altitude = sensor_conv.pressures_to_alt( data[:, labels.index( "pres" )],
+                                                     metadata["header"]["ground_pressure"] )
+            data     = np.column_stack( [ data, altitude ] )
+            labels.append( "alt" )
+        flight = columns_to_records( data, labels )
+    elif ( format == "npy" ):
+        data = np.load( path, mmap_mode = 'r' )
+        if ( data.dtype.names is None ):
+            flight = columns_to_records( data.reshape( len( data ), -1 ), [] )
+        else:
+            flight = data.view( np.recarray )
+    else:
+        print( "Error: Unsupported flight data format: " + format )
+        return None, None
+
+    if ( flight.flags.writeable ):
+        flight.flags.writeable = False
+    loaded_flights[memo_key] = ( memo_stamp, ( flight, metadata ) )
+    if ( len( loaded_flights ) > loaded_flights_max ):
+        loaded_flights.popitem( last = False )
+    return flight, metadata
+## load_flight ##
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
@@ -29,6 +29,13 @@ import struct
 import sensor_conv
 import commands
 import appa
+import decode_cache
+import flight_data
+import jobs
+import recorder
+import publisher
+import telemetry
+import transactions
 from   config      import *
 from   controller  import *
 from sensor_plot import *
@@ -43,6 +50,9 @@ if ( sdr_debug ):
 else:
     default_timeout = 1   # 1 second timeout
 
+# Version of the flash frame decoder, bump when decoded output changes
+sensor_frame_decoder_version = 1
+
 
 ####################################################################################
 # Shared Procedures                                                                #
@@ -194,6 +204,23 @@ def get_sensor_readouts( controller, sensors, sensor_bytes ):
 ## get_sensor_readouts ##
 
 
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         get_sensor_frame_size                                                    #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#        Size in bytes of a frame of sensor data in a controller's flash           #
+#                                                                                  #
+####################################################################################
+def get_sensor_frame_size( serialObj ):
+    frame_size = sensor_frame_sizes[serialObj.controller]
+    if serialObj.controller in firmware_id_supported_boards and serialObj.firmware == "Active Roll":
+        frame_size += 4
+    return frame_size
+## get_sensor_frame_size ##
+
+
 ####################################################################################
 #                                                                                  #
 # PROCEDURE:                                                                       #
@@ -206,10 +233,7 @@ def get_sensor_readouts( controller, sensors, sensor_bytes ):
 def get_sensor_frame_bytes( serialObj ):
 
     # Determine the size of the frame
-    frame_size = sensor_frame_sizes[serialObj.controller]
-
-    if serialObj.controller in firmware_id_supported_boards and serialObj.firmware == "Active Roll":
-        frame_size += 4
+    frame_size = get_sensor_frame_size( serialObj )
 
     # Get bytes
     rx_bytes = serialObj.readBytes( frame_size )
@@ -217,6 +241,43 @@ def get_sensor_frame_bytes( serialObj ):
 ## get_sensor_frame_bytes ##
 
 
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         join_frame_blocks                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#        Joins blocks from get_sensor_frame_bytes into one flash image. A block    #
+#        cut short by a timeout is zero padded to block_size, so the blocks after  #
+#        it keep their place in the image                                          #
+#                                                                                  #
+####################################################################################
+def join_frame_blocks( rx_byte_blocks, block_size ):
+    blocks     = [ b''.join( block ) for block in rx_byte_blocks ]
+    num_short  = sum( 1 for block in blocks if ( len( block ) < block_size ) )
+    if ( num_short > 0 ):
+        print( "Warning: " + str( num_short ) + " flash blocks were cut short and " +
+               "zero padded" )
+    return b''.join( block.ljust( block_size, b'\x00' ) for block in blocks )
+## join_frame_blocks ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         split_frame_bytes                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Splits a contiguous byte string into frames of single bytes, in the same #
+#         format returned by get_sensor_frame_bytes                                #
+#                                                                                  #
+####################################################################################
+def split_frame_bytes( raw_bytes, frame_size ):
+    return [ [ raw_bytes[i:i+1] for i in range( start, start + frame_size ) ]
+             for start in range( 0, len( raw_bytes ) - frame_size + 1, frame_size ) ]
+## split_frame_bytes ##
+
+
 ####################################################################################
 #                                                                                  #
 # PROCEDURE:                                                                       #
@@ -365,55 +426,6 @@ def format_sensor_readout( controller, sensor, readout ):
     return output
 ## format_sensor_readout ##
 
-####################################################################################
-#                                                                                  #
-# PROCEDURE:                                                                       #
-#         sensor_extract_data_filter                                               #
-#                                                                                  #
-# DESCRIPTION:                                                                     #
-#       Finds the end of valid data extracted from flash extract and return a list #
-#       containing only good data                                                  #
-#                                                                                  #
-####################################################################################
-def sensor_extract_data_filter( data ):
-
-    # Indices of beginning and end of good data 
-    start_index = 0
-    end_index   = len( data ) - 1
-
-    # Search exit condition
-    exit = False
-
-    # Search index
-    search_index = 0
-    
-    # Begin binary search
-    while( not exit ):
-        # Set search index
-        search_index = ( (end_index - start_index)//2 ) + start_index
-
-        # Check if two consecutive rows are identically equal
-        rows_equal = ( data[search_index] == data[search_index+1] )
-
-        # Check for exit condition
-        if   (   search_index       == start_index ):
-            if ( rows_equal ):
-                return None
-            else:
-                return data[0:search_index-1]
-        elif ( ( search_index + 1 ) == end_index   ):
-            if ( rows_equal ):
-                return data[0:start_index-1]
-            else:
-                return data[0:end_index-1]
-        else: # No exit condfition
-            # Update search range
-            if ( rows_equal ):
-                end_index = search_index
-            else:
-                start_index = search_index
-## sensor_extract_data_filter ## 
-
 
 ####################################################################################
 # Commands                                                                         #
@@ -495,6 +507,16 @@ def sensor( Args, serialObj, show_readouts = True ):
     sensor_bytes_list = []
     sensor_int_list   = []
 
+    # Telemetry session to record sensor poll readouts to, only when given
+    poll_log_name = None
+    if ( "--log" in Args ):
+        log_index = Args.index( "--log" )
+        if ( ( log_index + 1 >= len( Args ) ) or ( Args[0] != "poll" ) ):
+            print( "Error: Usage: sensor poll -n [SENSOR NUMS] --log [SESSION NAME]" )
+            return serialObj
+        poll_log_name = Args[log_index + 1]
+        Args          = Args[:log_index] + Args[log_index + 2:]
+
     ################################################################################
     # Basic Inputs Parsing                                                         #
     ################################################################################
@@ -601,6 +623,9 @@ def sensor( Args, serialObj, show_readouts = True ):
                                                        sensor_numbers      ,
                                                        sensor_bytes_list
                                                        )
+        serialObj.sensor_readouts.update( telemetry.derived_channels( 
+                                                       serialObj.controller, 
+                                                       serialObj.sensor_readouts ) )
 
         # Display Sensor readouts
         if ( show_readouts ):
@@ -639,6 +664,7 @@ def sensor( Args, serialObj, show_readouts = True ):
 
         # Receive and display sensor readouts 
         timeout_ctr = 0
+        stopped     = False
 
         try:
             # Initialize graph
@@ -659,7 +685,8 @@ def sensor( Args, serialObj, show_readouts = True ):
             serialObj.sendByte( sensor_poll_cmds['RESUME'])
 
             print("Ctrl+C to exit");
-            while ( timeout_ctr <= sensor_poll_timeout ):
+            while ( ( timeout_ctr <= sensor_poll_timeout ) and 
+                    ( not jobs.stop_requested( serialObj ) ) ):
                 serialObj.sendByte( sensor_poll_cmds['REQUEST'] )
                 sensor_bytes_list = serialObj.readBytes( sensor_poll_frame_size ) 
                 sensor_readouts   = get_sensor_readouts(
@@ -692,16 +719,19 @@ def sensor( Args, serialObj, show_readouts = True ):
                 serialObj.sendByte( sensor_poll_cmds['RESUME'] )
 
 
-                # Pause for readibility
+                # Pause for readibility, a stop ends the pause early
                 serialObj.sendByte( sensor_poll_cmds['WAIT'] )
-                time.sleep(0.05)
+                if ( jobs.job_sleep( serialObj, 0.05 ) ):
+                    break
                 serialObj.sendByte( sensor_poll_cmds['RESUME'])
                 timeout_ctr += 1
         except KeyboardInterrupt:
+            stopped = True
+        if ( stopped or jobs.stop_requested( serialObj ) ):
             # Stop transmission
             print("\nPoll exited!")    
-            serialObj.sendByte( sensor_poll_cmds['STOP'] )
-            plt.ioff()
+            transactions.transact_priority( serialObj, sensor_poll_cmds['STOP'],
+                                            name = "poll stop" )
         plt.ioff()
         return serialObj
 
@@ -729,41 +759,85 @@ def sensor( Args, serialObj, show_readouts = True ):
         # Canard Add-on feature: Logging data during poll
         filename = "canard_" + str(datetime.now()) + ".txt"
         file = open("canard/" + filename, "w")
-        
+
+        # Record the poll as a telemetry session if --log was given
+        poll_layout   = telemetry.telemetry_layout( serialObj.controller, user_sensor_nums )
+        poll_metadata = { "controller": serialObj.controller, 
+                          "firmware"  : serialObj.firmware  , 
+                          "source"    : "sensor poll"       ,
+                          "session"   : serialObj.name      }
+        poll_recorder = None
+        if ( poll_log_name is not None ):
+            poll_recorder = recorder.telemetry_recorder( 
+                                os.path.join( telemetry_record_dir, poll_log_name ),
+                                poll_layout["record_dtype"],
+                                poll_metadata )
+        poll_stream   = publisher.publish_open( poll_layout["record_dtype"], poll_metadata )
+
+        # APPA firmware frames are decoded straight into a columnar buffer
+        if ( serialObj.firmware == "APPA" ):
+            appa_frames = appa.appa_frame_buffer( 
+                                      appa.appa_poll_decoder( user_sensor_nums, 
+                                                              serialObj.controller ) )
 
         # Receive and display sensor readouts 
         timeout_ctr = 0
+        stopped     = False
         try:    
             print("Ctrl+C to exit");
-            while ( timeout_ctr <= sensor_poll_timeout ):
+            while ( ( timeout_ctr <= sensor_poll_timeout ) and 
+                    ( not jobs.stop_requested( serialObj ) ) ):
                 serialObj.sendByte( sensor_poll_cmds['REQUEST'] )
                 sensor_bytes_list = serialObj.readBytes( sensor_poll_frame_size ) 
-                sensor_readouts   = get_sensor_readouts(
+                host_time         = time.time()
+                if ( serialObj.firmware == "APPA" ):
+                    appa_frame = appa_frames.append( b''.join( sensor_bytes_list ) )
+                    sensor_readouts = zip( user_sensor_nums, appa_frame.item( 0 ) )
+                else:
+                    sensor_readouts = get_sensor_readouts(
                                                         serialObj.controller, 
                                                         user_sensor_nums    ,
                                                         sensor_bytes_list
-                                                    )
-                for sensor in sensor_readouts:
+                                                    ).items()
+                sensor_readouts = list( sensor_readouts )
+                if ( ( poll_recorder is not None ) or ( publisher.server is not None ) ):
+                    poll_record = telemetry.telemetry_pack_record( 
+                                         poll_layout, 
+                                         host_time, 
+                                         [ readout for _, readout in sensor_readouts ], 
+                                         0 )
+                    if ( poll_recorder is not None ):
+                        poll_recorder.write( poll_record, host_time )
+                    publisher.publish_records( poll_stream, poll_record )
+                for sensor, readout in sensor_readouts:
                     readout_formated = format_sensor_readout(
                                                             serialObj.controller, 
                                                             sensor              ,
-                                                            sensor_readouts[sensor] 
+                                                            readout 
                                                             )
                     print( readout_formated + '\t', end='' )
                     file.write(readout_formated + '\t')
                 file.write("\n")
                 print()
-                # Pause for readibility
+                # Pause for readibility, a stop ends the pause early
                 serialObj.sendByte( sensor_poll_cmds['WAIT'] )
-                time.sleep(0.2)
+                if ( jobs.job_sleep( serialObj, 0.2 ) ):
+                    break
                 serialObj.sendByte( sensor_poll_cmds['RESUME'])
                 timeout_ctr += 1
         except KeyboardInterrupt:
-            # Stop transmission
-            print("\nPoll exited!")    
-            serialObj.sendByte( sensor_poll_cmds['STOP'] )
-
-        file.close()
+            stopped = True
+        finally:
+            if ( stopped or jobs.stop_requested( serialObj ) ):
+                # Stop transmission
+                print("\nPoll exited!")    
+                transactions.transact_priority( serialObj, sensor_poll_cmds['STOP'],
+                                                name = "poll stop" )
+
+            file.close()
+            if ( poll_recorder is not None ):
+                poll_recorder.close()
+            publisher.publish_close( poll_stream )
 
         return serialObj
 
@@ -791,36 +865,18 @@ def sensor( Args, serialObj, show_readouts = True ):
         # Data Filename 
         filename = sensor_data_filenames[serialObj.controller]
 
-        # Import Data
-        with open( filename, "r" ) as file:
-            sensor_data_lines = file.readlines()
-        sensor_data_str = []
-        for line in sensor_data_lines:
-            sensor_data_str.append( line.split('\t') )
+        # Import Data, erased flash data is filtered out and the parsed data is 
+        # reused while the file is unchanged
+        flight, _ = flight_data.load_flight( filename, format = "extract-text" )
 
-        # Convert to floating point format
-        sensor_data = []
-        for frame in sensor_data_str:
-            sensor_frame = []
-            for val in frame:
-                if ( val != '\n' ):
-                    sensor_frame.append( float( val ) )
-            sensor_data.append( sensor_frame )
-        
-        # Filter out garbage flash data
-        sensor_data_filtered = sensor_extract_data_filter( sensor_data )
-        sensor_data_filtered = np.array( sensor_data_filtered )
-
-        # Select data to plot
+        # Select data to plot, downsampled for display
         sensor_labels = []
+        time_data     = flight["time"]/60.0 # minutes
         for sensor in user_sensor_nums:
-            sensor_index = sensor_indices[serialObj.controller][sensor]
             sensor_label = ( sensor + " (" + 
-                             sensor_units[serialObj.controller][sensor] + ")" )
+                             str( sensor_units[serialObj.controller][sensor] ) + ")" )
             sensor_labels.append( sensor_label )
-            time_data = sensor_data_filtered[:,0]/60.0 # minutes
-            plt.plot( time_data, 
-                      sensor_data_filtered[:,sensor_index] )
+            plt.plot( *flight_data.downsample_minmax( time_data, flight[sensor] ) )
 
         # Plot parameters
         plt.title( "Data: " + serialObj.controller )
@@ -1364,6 +1420,9 @@ def flash(Args, serialObj):
         # Flash contains 4096 blocks of data
         rx_byte_blocks = []
         for i in range( extract_num_frames ):
+            if ( jobs.stop_requested( serialObj ) ):
+                print( "Flash extract stopped after " + str(i) + " blocks" )
+                return serialObj
             if ( i%100 == 0 ):
                 print( "Reading block " + str(i) + "..."  )
             rx_sensor_frame_block = get_sensor_frame_bytes( serialObj )
@@ -1404,18 +1463,33 @@ def flash(Args, serialObj):
         
         print( "Presets parsed and written!" )
 
-        # Convert the data from bytes to measurement readouts
-        sensor_frames = get_sensor_frames( serialObj.controller, serialObj.firmware, rx_byte_blocks )
+        # Convert the data from bytes to measurement readouts, re-decoding only 
+        # the chunks of flash that changed since a previous extract
+        frame_size    = get_sensor_frame_size( serialObj )
+        flash_bytes   = join_frame_blocks( rx_byte_blocks, frame_size )
+        sensor_frames = decode_cache.cached_decode(
+                                 flash_bytes                 ,
+                                 serialObj.controller        ,
+                                 serialObj.firmware          ,
+                                 sensor_frame_decoder_version,
+                                 lambda raw_bytes: np.array( get_sensor_frames( 
+                                                                 serialObj.controller, 
+                                                                 serialObj.firmware  , 
+                                                                 split_frame_bytes( raw_bytes, frame_size ) ), 
+                                                             dtype = np.float64 ),
+                                 frame_size
+                                                  )
 
         print( "Flash frames parsed!" )
 
         # Export the data to txt files
+        # Start from first non-preset frame instead of index 0
         with open( sensor_data_filenames[serialObj.controller], 'w' ) as file:
-            for sensor_frame in sensor_frames[num_preset_frames:]: # Start from first non-preset frame instead of index 0
-                for val in sensor_frame:
-                    file.write( str( val ) )
-                    file.write( '\t')
-                file.write( '\n' )    
+            np.savetxt( file, 
+                        sensor_frames[num_preset_frames:], 
+                        fmt       = "%.15g", 
+                        delimiter = '\t'   , 
+                        newline   = '\t\n' )
 
         print( "Flash frames written!" )
 
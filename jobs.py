@@ -0,0 +1,414 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# jobs.py -- Background jobs for long-running terminal commands                    #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import time
+import threading
+
+# Project imports
+from   config      import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Commands that run as background jobs by default, as ( command, first argument )
+background_commands = [
+                      ( "flash"      , "extract"  ),
+                      ( "sensor"     , "poll"     ),
+                      ( "dual-deploy", "extract"  ),
+                      ( "telreq"     , "--stream" )
+                      ]
+
+# Commands that never hold the serial port, as ( command, first argument ), where
+# a first argument of None matches any arguments. Sequences reach the port only
+# through transactions
+port_free_commands = [
+                     ( "exit"        , None     ),
+                     ( "help"        , None     ),
+                     ( "clear"       , None     ),
+                     ( "jobs"        , None     ),
+                     ( "fg"          , None     ),
+                     ( "kill"        , None     ),
+                     ( "iostat"      , None     ),
+                     ( "sequence"    , None     ),
+                     ( "session"     , None     ),
+                     ( "publish"     , None     ),
+                     ( "parse-output", None     ),
+                     ( "sensor"      , "plot"   ),
+                     ( "sensor"      , "list"   ),
+                     ( "sensor"      , "help"   ),
+                     ( "dual-deploy" , "plot"   ),
+                     ( "dual-deploy" , "help"   )
+                     ]
+
+# Commands that never run as background jobs, as ( command, first argument ). A
+# sequence needs the I/O worker to take the port, which a job would hold, and its
+# abort is Ctrl+C at the foreground prompt
+foreground_commands = [
+                      ( "sequence"   , "run"      )
+                      ]
+
+# Safety commands, which stop background jobs and skip waiting for the port
+preempt_commands = [ "abort", "stophotfire", "stoppurge" ]
+
+# Running and finished jobs, keyed by job number
+job_list   = {}
+job_number = 0
+
+# Job running on the calling thread
+current_job = threading.local()
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         command_matches                                                          #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Checks a command and its arguments against a list of ( command, first    #
+#         argument ) pairs                                                         #
+#                                                                                  #
+####################################################################################
+def command_matches( command, args, command_pairs ):
+    for pair_command, pair_arg in command_pairs:
+        if ( ( command == pair_command ) and
+             ( ( pair_arg is None ) or ( pair_arg in args[:1] ) ) ):
+            return True
+    return False
+## command_matches ##
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         job                                                                      #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         A terminal command running on its own thread. The job holds the serial   #
+#         port for its whole run, and tracks the bytes it has received. Commands   #
+#         check stop_requested in their loops to stop cleanly                      #
+#                                                                                  #
+####################################################################################
+class job( threading.Thread ):
+    def __init__( self, number, command_func, command, args, serialObj ):
+        threading.Thread.__init__( self, daemon = True )
+        self.number       = number
+        self.command_func = command_func
+        self.command_line = " ".join( [ command ] + args )
+        if ( serialObj.name != default_session_name ):
+            self.command_line = "@" + serialObj.name + " " + self.command_line
+        self.args         = args
+        self.serialObj    = serialObj
+        self.start_time   = None
+        self.stop_time    = None
+        self.start_rx     = serialObj.rx_byte_count
+        self.status       = "Waiting"
+        self.stop_event   = threading.Event()
+
+    def run( self ):
+        current_job.job = self
+        with self.serialObj.port_lock:
+            self.status     = "Running"
+            self.start_time = time.perf_counter()
+            self.start_rx   = self.serialObj.rx_byte_count
+            try:
+                self.command_func( self.args, self.serialObj )
+                self.status = "Killed" if ( self.stop_event.is_set() ) else "Done"
+            except Exception as error:
+                print( "\n[" + str( self.number ) + "] Error: " + str( error ) )
+                self.status = "Failed"
+            if ( self.stop_event.is_set() ):
+                self.serialObj.flushCancelledRead()
+            self.stop_time = time.perf_counter()
+
+    # Ask the job to stop as Ctrl+C would, cutting short the read or wait it is
+    # blocked on
+    def stop( self ):
+        if ( self.is_alive() ):
+            self.stop_event.set()
+            self.serialObj.cancelRead()
+            self.serialObj.port_lock.wake()
+
+    # Elapsed time, bytes received and receive rate
+    def progress( self ):
+        if ( self.start_time is None ):
+            return 0.0, 0, 0.0
+        stop_time = self.stop_time if ( self.stop_time is not None ) else time.perf_counter()
+        elapsed   = stop_time - self.start_time
+        rx_bytes  = self.serialObj.rx_byte_count - self.start_rx
+        return elapsed, rx_bytes, rx_bytes/max( elapsed, 1e-9 )
+## class job ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         stop_requested                                                           #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Checks if the command running on the calling thread should stop, because #
+#         its job was asked to stop or a priority transaction is waiting for the   #
+#         port. A preempted job stops, as it would for a safety command typed at   #
+#         the prompt. Commands run outside a job are also stopped by Ctrl+C        #
+#                                                                                  #
+####################################################################################
+def stop_requested( serialObj ):
+    running_job = getattr( current_job, "job", None )
+    if ( serialObj.port_lock.preempted() ):
+        if ( running_job is not None ):
+            running_job.stop_event.set()
+        return True
+    return ( running_job is not None ) and running_job.stop_event.is_set()
+## stop_requested ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         job_sleep                                                                #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Pauses a command holding the serial port for delay seconds, returning    #
+#         early if it should stop, so a safety command never waits out the pause.  #
+#         Returns stop_requested                                                   #
+#                                                                                  #
+####################################################################################
+def job_sleep( serialObj, delay ):
+    running_job = getattr( current_job, "job", None )
+    stop_event  = running_job.stop_event if ( running_job is not None ) else None
+    if ( delay > 0 ):
+        serialObj.port_lock.wait_preempted( 
+                      delay, None if ( stop_event is None ) else stop_event.is_set )
+    return stop_requested( serialObj )
+## job_sleep ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         job_start                                                                #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Launches a command as a background job                                   #
+#                                                                                  #
+####################################################################################
+def job_start( command_func, command, args, serialObj ):
+    global job_number
+    job_number += 1
+    new_job     = job( job_number, command_func, command, args, serialObj )
+    job_list[job_number] = new_job
+    new_job.start()
+    print( "[" + str( job_number ) + "] " + new_job.command_line )
+    return new_job
+## job_start ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         job_wait                                                                 #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Waits for a job to finish, Ctrl+C stops the job                          #
+#                                                                                  #
+####################################################################################
+def job_wait( waited_job ):
+    while ( waited_job.is_alive() ):
+        try:
+            waited_job.join( 0.1 )
+        except KeyboardInterrupt:
+            waited_job.stop()
+## job_wait ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         job_stop_latest                                                          #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Stops the most recently started running job of a session, as Ctrl+C at   #
+#         the prompt. Returns the job, or None if the session has no running job   #
+#                                                                                  #
+####################################################################################
+def job_stop_latest( serialObj ):
+    running = [ number for number, running_job in job_list.items()
+                if ( running_job.is_alive() and ( running_job.serialObj is serialObj ) ) ]
+    if ( len( running ) == 0 ):
+        return None
+    stopped_job = job_list[max( running )]
+    print( "[" + str( stopped_job.number ) + "] Stopping " + stopped_job.command_line )
+    stopped_job.stop()
+    return stopped_job
+## job_stop_latest ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         run_command                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Runs a terminal command, in the background if it is long-running or the  #
+#         command line ends in "&". Commands using the serial port wait for the    #
+#         port rather than interleaving with a background job                      #
+#                                                                                  #
+####################################################################################
+def run_command( command_func, command, args, serialObj ):
+    background = command_matches( command, args, background_commands )
+    if ( ( len( args ) > 0 ) and ( args[-1] == "&" ) ):
+        args       = args[:-1]
+        background = True
+
+    if ( background and command_matches( command, args, foreground_commands ) ):
+        print( "Error: " + command + " cannot run as a background job" )
+        return serialObj
+    if ( background ):
+        job_start( command_func, command, args, serialObj )
+        return serialObj
+
+    if ( command_matches( command, args, port_free_commands ) ):
+        return command_func( args, serialObj )
+
+    # Safety commands stop the board's background jobs and go out on the priority
+    # path, which takes the port over as soon as the stopping jobs release it
+    if ( command in preempt_commands ):
+        for running_job in job_list.values():
+            if ( running_job.serialObj is serialObj ):
+                running_job.stop()
+        return command_func( args, serialObj )
+
+    if ( not serialObj.port_lock.acquire( blocking = False ) ):
+        running = [ str( number ) for number, running_job in job_list.items()
+                    if ( running_job.is_alive() and
+                         ( running_job.serialObj is serialObj ) ) ]
+        print( "Waiting for the serial port, in use by job " + ", ".join( running ) +
+               " (Ctrl+C to cancel)" )
+        try:
+            serialObj.port_lock.acquire()
+        except KeyboardInterrupt:
+            print( "Cancelled" )
+            return serialObj
+    try:
+        return command_func( args, serialObj )
+    finally:
+        serialObj.port_lock.release()
+## run_command ##
+
+
+####################################################################################
+# Commands                                                                         #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# COMMAND:                                                                         #
+#         jobs                                                                     #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Lists background jobs with their progress and throughput                 #
+#                                                                                  #
+####################################################################################
+def jobs( Args, serialObj ):
+    if ( len( job_list ) == 0 ):
+        print( "No jobs" )
+    for number, listed_job in job_list.items():
+        elapsed, rx_bytes, rx_rate = listed_job.progress()
+        print( "[" + str( number ) + "] " + listed_job.status.ljust( 8 ) +
+               "{:8.1f} s {:10d} B {:10.1f} B/s  ".format( elapsed, rx_bytes, rx_rate ) +
+               listed_job.command_line )
+
+    # Only list finished jobs once
+    for number in [ number for number, listed_job in job_list.items()
+                    if not listed_job.is_alive() ]:
+        del job_list[number]
+    return serialObj
+## jobs ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         get_job                                                                  #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the job numbered by a fg/kill argument, or the most recent job   #
+#                                                                                  #
+####################################################################################
+def get_job( Args ):
+    if ( len( Args ) == 0 ):
+        if ( len( job_list ) == 0 ):
+            print( "Error: No jobs" )
+            return None
+        return job_list[max( job_list )]
+    number = Args[0].lstrip( "%" )
+    if ( ( not number.isdigit() ) or ( int( number ) not in job_list ) ):
+        print( "Error: No job " + Args[0] )
+        return None
+    return job_list[int( number )]
+## get_job ##
+
+
+####################################################################################
+#                                                                                  #
+# COMMAND:                                                                         #
+#         fg                                                                       #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Waits in the foreground for a job to finish, Ctrl+C stops the job        #
+#                                                                                  #
+####################################################################################
+def fg( Args, serialObj ):
+    fg_job = get_job( Args )
+    if ( fg_job is not None ):
+        print( fg_job.command_line )
+        job_wait( fg_job )
+        print( "[" + str( fg_job.number ) + "] " + fg_job.status )
+    return serialObj
+## fg ##
+
+
+####################################################################################
+#                                                                                  #
+# COMMAND:                                                                         #
+#         kill                                                                     #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Stops a job as Ctrl+C would                                              #
+#                                                                                  #
+####################################################################################
+def kill( Args, serialObj ):
+    killed_job = get_job( Args )
+    if ( killed_job is not None ):
+        killed_job.stop()
+        killed_job.join( 5 )
+        print( "[" + str( killed_job.number ) + "] " + killed_job.status )
+    return serialObj
+## kill ##
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
@@ -0,0 +1,276 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# limits.py -- Telemetry limit checking and alarms                                 #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+####################################################################################
+# A limits file is a CSV with one rule per row:                                    #
+#                                                                                  #
+#   sensor,min,max,rate,hysteresis,response                                        #
+#   pt0,,850,200,10,abort                                                          #
+#                                                                                  #
+# min/max bound the readout, rate bounds its rate of change in units per second,   #
+# and an alarm clears only once the readout is back inside min/max by hysteresis.  #
+# Empty fields are unchecked. response is alarm (default) or abort. Rules are      #
+# compiled into arrays and every block of samples is checked against all rules     #
+# at once. Streamed frames are checked one at a time as they arrive, so an alarm   #
+# or abort is raised on the frame that crosses a limit. Whole blocks are for       #
+# recorded or replayed telemetry                                                   #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import csv
+import time
+import numpy as np
+
+# Project imports
+import telemetry
+import engineController
+from   config      import *
+from   controller  import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Rule responses
+limit_responses = [ "alarm", "abort" ]
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         load_limits                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Reads a limits file, returns a list of rules or None after printing an   #
+#         error if the file is invalid or names a channel not in channels          #
+#                                                                                  #
+####################################################################################
+def load_limits( filename, channels ):
+    rules = []
+    try:
+        with open( filename, "r", newline = "" ) as file:
+            rows = list( csv.DictReader( file ) )
+    except OSError as error:
+        print( "Error: Could not read limits file: " + str( error ) )
+        return None
+
+    for row_num, row in enumerate( rows ):
+        row_name = "Limits row " + str( row_num + 1 ) + ": "
+        sensor   = ( row.get( "sensor" ) or "" ).strip()
+        if ( sensor not in channels ):
+            print( "Error: " + row_name + "Unrecognized sensor " + sensor +
+                   ". Valid sensors include: " + ", ".join( channels ) )
+            return None
+        rule = { "sensor"  : sensor,
+                 "response": ( row.get( "response" ) or "alarm" ).strip() }
+        if ( rule["response"] not in limit_responses ):
+            print( "Error: " + row_name + "response must be one of " +
+                   ", ".join( limit_responses ) )
+            return None
+        for field, default in [ ( "min", -np.inf ), ( "max", np.inf ),
+                                ( "rate", np.inf ), ( "hysteresis", 0.0 ) ]:
+            value = ( row.get( field ) or "" ).strip()
+            try:
+                rule[field] = float( value ) if ( value != "" ) else default
+            except ValueError:
+                print( "Error: " + row_name + field + " must be a number" )
+                return None
+        rules.append( rule )
+
+    if ( len( rules ) == 0 ):
+        print( "Error: The limits file has no rules" )
+        return None
+    return rules
+## load_limits ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         load_limit_engine                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Loads a limits file for a board's telemetry, whose channels are its      #
+#         sensors in telemetry order followed by its derived channels. Returns     #
+#         None if the file is invalid                                              #
+#                                                                                  #
+####################################################################################
+def load_limit_engine( filename, controller ):
+    channels = ( list( telemetry.telemetry_layout( controller )["sensors"] ) +
+                 list( derived_sensors.get( controller, {} ) ) )
+    rules    = load_limits( filename, channels )
+    if ( rules is None ):
+        return None
+    return limit_engine( rules, channels )
+## load_limit_engine ##
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         limit_engine                                                             #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Checks blocks of samples against compiled rules, tracking which rules    #
+#         are in alarm across blocks                                               #
+#                                                                                  #
+####################################################################################
+class limit_engine:
+    def __init__( self, rules, channels ):
+        self.rules       = rules
+        self.channels    = list( channels )
+        self.columns     = np.array( [ self.channels.index( rule["sensor"] ) for rule in rules ] )
+        self.low         = np.array( [ rule["min"]        for rule in rules ] )
+        self.high        = np.array( [ rule["max"]        for rule in rules ] )
+        self.max_rate    = np.array( [ rule["rate"]       for rule in rules ] )
+        self.hysteresis  = np.array( [ rule["hysteresis"] for rule in rules ] )
+        self.abort       = np.array( [ rule["response"] == "abort" for rule in rules ] )
+        self.active      = np.zeros( len( rules ), dtype = bool )
+        self.last_values = None
+        self.last_time   = None
+
+    # Check a block of samples, times has one timestamp per row of block and block
+    # has one column per channel. Returns the ( rule number, "raised"/"cleared",
+    # sample time, readout ) of each alarm raised or cleared in the block
+    def check( self, times, block ):
+        times  = np.asarray( times, dtype = np.float64 )
+        values = np.asarray( block, dtype = np.float64 )[:, self.columns]
+        if ( self.last_values is None ):
+            self.last_values = values[0]
+            self.last_time   = times[0]
+
+        # Rate of change from the previous sample of each rule
+        prev_values = np.vstack( [ self.last_values, values[:-1] ] )
+        prev_times  = np.concatenate( [ [ self.last_time ], times[:-1] ] )
+        dt          = ( times - prev_times )[:, None]
+        with np.errstate( divide = 'ignore', invalid = 'ignore' ):
+            rates = np.where( dt > 0, np.abs( values - prev_values )/dt, 0.0 )
+        self.last_values = values[-1]
+        self.last_time   = times[-1]
+
+        # NaN readouts neither violate nor clear a rule
+        over   = ( ( values > self.high ) | ( values < self.low ) |
+                   ( rates > self.max_rate ) )
+        inside = ( ( values <= self.high - self.hysteresis ) &
+                   ( values >= self.low  + self.hysteresis ) &
+                   ( rates  <= self.max_rate ) )
+
+        # Active rules raise again only after clearing
+        num_samples = len( values )
+        sample_nums = np.arange( num_samples )[:, None]
+        first_clear = np.where( inside.any( axis = 0 ), inside.argmax( axis = 0 ), num_samples )
+        triggers    = over & ( sample_nums >= np.where( self.active, first_clear, 0 ) )
+        raised      = triggers.any( axis = 0 )
+        raise_nums  = triggers.argmax( axis = 0 )
+
+        # Alarm state after the block, from the last violation or clear of each rule
+        last_over   = np.where( over.any( axis = 0 ),
+                                num_samples - 1 - over[::-1].argmax( axis = 0 ), -1 )
+        last_clear  = np.where( inside.any( axis = 0 ),
+                                num_samples - 1 - inside[::-1].argmax( axis = 0 ), -1 )
+        active      = np.where( ( last_over >= 0 ) | ( last_clear >= 0 ),
+                                last_over > last_clear, self.active )
+        cleared     = ( self.active | raised ) & ( ~active )
+        clear_nums  = ( inside & ( sample_nums > last_over ) ).argmax( axis = 0 )
+        self.active = active
+
+        events = []
+        for rule_num in np.flatnonzero( raised ):
+            sample_num = raise_nums[rule_num]
+            events.append( ( rule_num, "raised", times[sample_num],
+                             values[sample_num, rule_num] ) )
+        for rule_num in np.flatnonzero( cleared ):
+            sample_num = clear_nums[rule_num]
+            events.append( ( rule_num, "cleared", times[sample_num],
+                             values[sample_num, rule_num] ) )
+        return events
+
+    # Describes the limit a readout violates
+    def describe( self, rule_num, readout ):
+        rule = self.rules[rule_num]
+        if ( readout > rule["max"] ):
+            return "above max " + str( rule["max"] )
+        elif ( readout < rule["min"] ):
+            return "below min " + str( rule["min"] )
+        return "rate above " + str( rule["rate"] ) + "/s"
+## class limit_engine ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         limit_check                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Checks a block of samples, printing alarms with their sample times, and  #
+#         sends an abort on the priority path if a rule with the abort response is #
+#         raised. Returns True if an abort was sent                                #
+#                                                                                  #
+####################################################################################
+def limit_check( engine, serialObj, times, block ):
+    events = engine.check( times, block )
+    if ( len( events ) == 0 ):
+        return False
+
+    abort = False
+    print()
+    for rule_num, event, sample_time, readout in events:
+        rule     = engine.rules[rule_num]
+        time_str = ( time.strftime( "%H:%M:%S", time.localtime( sample_time ) ) +
+                     "{:.3f}".format( sample_time % 1 )[1:] )
+        if ( event == "raised" ):
+            print( "ALARM " + time_str + ": " + rule["sensor"] + " = {:.3f} ".format( readout ) +
+                   engine.describe( rule_num, readout ) )
+            abort = abort or engine.abort[rule_num]
+        else:
+            print( "Cleared " + time_str + ": " + rule["sensor"] +
+                   " = {:.3f}".format( readout ) )
+
+    if ( abort ):
+        engineController.send_abort( serialObj, "limit abort" )
+    return abort
+## limit_check ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         limit_check_frame                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Checks one decoded telemetry frame, readouts in telemetry layout order,  #
+#         against an engine from load_limit_engine, derived channels included.     #
+#         Returns True if an abort was sent                                        #
+#                                                                                  #
+####################################################################################
+def limit_check_frame( engine, serialObj, host_time, layout, readouts ):
+    frame = dict( zip( layout["sensors"], readouts ) )
+    frame.update( telemetry.derived_channels( layout["controller"], frame ) )
+    return limit_check( engine, serialObj, [ host_time ],
+                        [ [ frame[channel] for channel in engine.channels ] ] )
+## limit_check_frame ##
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
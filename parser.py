@@ -1,65 +1,204 @@
 # SPDX-License-Identifier: BSD-3-Clause
 # Copyright (c) 2025 Sun Devil Rocketry
 
-import matplotlib.pyplot
+####################################################################################
+#                                                                                  #
+# parser.py -- Converts flash extract txt output to CSV                            #
+#                                                                                  #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import os
+import sys
+import glob
+import time
+import types
+import concurrent.futures
 import pandas as pd
-import matplotlib
-from controller import controller_sensors, controller_names, firmware_ids
-
-            
-
-data = []
-
-
-length = len(data)
-
-def converter(txt_File, output_File):
-    hardware = ""
-    for i in range(0, len(controller_names)):
-        print(str(i + 1) + ". " + controller_names[i])
-    number = input("Which Hardware would you like to select? Enter a number. \n")
-    
-    firmware_names = list(firmware_ids.values())
-    for i in range(0, len(firmware_names)):
-        print(str(i + 1) + ". " + firmware_names[i])
-    firmware_num = int(input("Which Firmware would you like to select? Enter a number. \n"))
-    
-    hardware = controller_names[int(number) - 1]
-    firmware = firmware_names[firmware_num - 1]
-
-    print(f"Selected Hardware: {hardware}")
-    print(f"Selected firmware: {firmware}")
-
-    labels = [
-            "save_bit",
-            "acc_launch_flag",
-            # "accel_x_offset",
-            # "accel_y_offset",
-            # "accel_z_offset",
-            # "gyro_x_offset",
-            # "gyro_y_offset",
-            # "gyro_z_offset",
-            # "pres_offset",
-            # "pres_temp_offset",
-            # "rp_servo1",
-            # "rp_servo2",
-            "time",
-    ]
-    for value in controller_sensors[hardware]:
-        labels.append(value)
-    if firmware_num - 1 == 4: # Checking if firmware = 4, the index of Active Roll 
-        labels.append("feedback")
-
-    with open(txt_File,'r') as file:
-
-        for line in file:
-            number = line.split('\t')
-            data.append(number[:-1])   
-
-    df = pd.DataFrame.from_records(data, columns=labels)
-    df.to_csv(output_File,index=False)
-    print("Done! Number of columns: " + str(len(labels)))
-#converter('output\flight_comp_rev2_sensor_data_cool.txt', 'output\feb0425.csv')
+
+# Project imports
+import commands
+import flight_data
+import telemetry
+from controller import controller_names, firmware_ids
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Number of rows converted at a time, bounds memory use for any file size
+converter_chunk_rows = 50000
+
+# Default output file
+default_output_file = "output/parsedCSV.csv"
+
+# parse-output options
+parse_output_inputs = {
+                      '--controller': 'Board name, or number from the list below',
+                      '--firmware'  : 'Firmware name, or number from the list below',
+                      '--in'        : 'Flash extract txt file to convert',
+                      '--out'       : 'CSV file to write, defaults to ' + default_output_file,
+                      '--all'       : 'Convert every extract file in a directory, defaults to output',
+                      '--help'      : 'Display parse-output usage info'
+                      }
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+# 		converter                                                                  #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+# 		Converts a tab-delimited flash extract txt file to CSV, reading and        #
+#       writing converter_chunk_rows rows at a time with numeric columns, and      #
+#       appending the board's derived channels                                     #
+#                                                                                  #
+####################################################################################
+def converter( txt_file, output_file, controller, firmware,
+               chunk_rows = converter_chunk_rows, show_output = True ):
+    labels      = flight_data.extract_labels( controller, firmware )
+    num_rows    = 0
+    num_columns = len( labels )
+
+    # Extract rows end in a trailing tab, only the labeled columns are read
+    chunks = pd.read_csv( txt_file,
+                          sep       = '\t'                   ,
+                          header    = None                   ,
+                          usecols   = range( len( labels ) ) ,
+                          chunksize = chunk_rows )
+    with open( output_file, 'w', newline = '' ) as file:
+        for chunk in chunks:
+            chunk.columns = labels
+            for channel, values in telemetry.derived_channels( controller, chunk ).items():
+                chunk[channel] = values
+            num_columns = len( chunk.columns )
+            chunk.to_csv( file, index = False, header = ( num_rows == 0 ) )
+            num_rows += len( chunk )
+    if ( show_output ):
+        print( "Done! Number of columns: " + str( num_columns ) +
+               ", number of rows: " + str( num_rows ) )
+    return num_rows
+## converter ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+# 		batch_convert_file                                                         #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+# 		Converts one file of a batch, returns the number of rows converted and the #
+#       conversion time, or None and the error message if the conversion failed    #
+#                                                                                  #
+####################################################################################
+def batch_convert_file( txt_file, output_file, controller, firmware ):
+    start_time = time.perf_counter()
+    try:
+        num_rows = converter( txt_file, output_file, controller, firmware, 
+                              show_output = False )
+    except Exception as error:
+        return None, str( error )
+    return num_rows, time.perf_counter() - start_time
+## batch_convert_file ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+# 		batch_converter                                                            #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+# 		Converts every *_sensor_data*.txt extract file under a directory to a CSV  #
+#       file beside it, in parallel across the machine's cores, and reports the    #
+#       throughput of each file and any failures. The board and firmware of each   #
+#       file are inferred unless given                                             #
+#                                                                                  #
+####################################################################################
+def batch_converter( directory, controller = None, firmware = None ):
+    txt_files = sorted( glob.glob( os.path.join( directory, "**", "*_sensor_data*.txt" ),
+                                   recursive = True ) )
+    if ( len( txt_files ) == 0 ):
+        print( "No extract files found in " + directory )
+        return
+
+    failures = []
+    jobs     = {}
+    with concurrent.futures.ProcessPoolExecutor( max_workers = os.cpu_count() ) as executor:
+        for txt_file in txt_files:
+            file_controller = controller
+            if ( file_controller is None ):
+                file_controller = flight_data.infer_controller( txt_file )
+            if ( file_controller is None ):
+                failures.append( ( txt_file, "Could not infer the board from the file name" ) )
+                continue
+            file_firmware = firmware
+            if ( file_firmware is None ):
+                try:
+                    file_firmware = flight_data.infer_firmware( txt_file, file_controller )
+                except OSError as error:
+                    failures.append( ( txt_file, str( error ) ) )
+                    continue
+            output_file = os.path.splitext( txt_file )[0] + ".csv"
+            job         = executor.submit( batch_convert_file, 
+                                           txt_file          , 
+                                           output_file       , 
+                                           file_controller   , 
+                                           file_firmware )
+            jobs[job]   = txt_file
+
+        for job in concurrent.futures.as_completed( jobs ):
+            txt_file         = jobs[job]
+            num_rows, result = job.result()
+            if ( num_rows is None ):
+                failures.append( ( txt_file, result ) )
+                continue
+            file_mb = os.path.getsize( txt_file )/1e6
+            print( txt_file + ": " + str( num_rows ) + " rows, " + 
+                   "{:.1f} MB in {:.2f} s ({:.1f} MB/s)".format( 
+                       file_mb, result, file_mb/max( result, 1e-9 ) ) )
+
+    print( "Converted " + str( len( txt_files ) - len( failures ) ) + " of " + 
+           str( len( txt_files ) ) + " files" )
+    for txt_file, error in failures:
+        print( "Failed: " + txt_file + ": " + error )
+## batch_converter ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+# 		select_name                                                                #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+# 		Resolves a name given either as a name or as its 1-based list number,      #
+#       returns None if it matches neither                                         #
+#                                                                                  #
+####################################################################################
+def select_name( selection, names ):
+    if ( selection in names ):
+        return selection
+    if ( selection.isdigit() and ( 1 <= int( selection ) <= len( names ) ) ):
+        return names[int( selection ) - 1]
+    return None
+## select_name ##
+
+
+####################################################################################
+# Commands                                                                         #
+####################################################################################
 
 
 ####################################################################################
@@ -68,22 +207,98 @@ def converter(txt_File, output_File):
 # 		parse-output                                                               #
 #                                                                                  #
 # DESCRIPTION:                                                                     #
-# 		Reads CSV data from txt file                                               #
+# 		Converts a flash extract txt file to CSV                                   #
 #                                                                                  #
 ####################################################################################
 def parse_output( Args, serialObj, show_output = True ):
-     filename = input("Enter file path: ")
-     if (filename == ""):
-        print("Please specify file path: ")
-     try:
-         f = open(filename, 'r')
-     except OSError:
-         try:
-            filename = "output/" + filename
-            f = open(filename, 'r')
-         except OSError:
-            print("Could not read file: ")
-            return
-     reader = "output/parsedCSV.csv"
-     converter(filename, reader)
-## parse_output ##
\ No newline at end of file
+
+    # Group option values, which may contain spaces (board names)
+    options = {}
+    option  = None
+    for arg in Args:
+        if ( arg.startswith( '--' ) ):
+            if ( arg not in parse_output_inputs ):
+                print( 'Error: Unrecognized option. Valid options include: ' )
+                for valid_option in parse_output_inputs:
+                    print( '\t' + valid_option + '\t' + parse_output_inputs[valid_option] )
+                print()
+                return serialObj
+            option          = arg
+            options[option] = []
+        elif ( option is None ):
+            print( "Error: Unexpected input: " + arg )
+            return serialObj
+        else:
+            options[option].append( arg )
+    options = { option: " ".join( values ) for option, values in options.items() }
+
+    if ( '--help' in options ):
+        commands.display_help_info( "parse-output" )
+        return serialObj
+
+    # Default to the connected board, batch conversions infer the board from 
+    # each file name and the firmware from each file's columns instead
+    firmware_names   = list( firmware_ids.values() )
+    controller_input = options.get( '--controller', serialObj.controller )
+    firmware_input   = options.get( '--firmware'  , serialObj.firmware   )
+    controller       = None
+    firmware         = None
+    if ( '--all' in options ):
+        controller_input = options.get( '--controller' )
+        firmware_input   = options.get( '--firmware'   )
+    if ( controller_input is not None ):
+        controller = select_name( controller_input, controller_names )
+    if ( firmware_input is not None ):
+        firmware = select_name( firmware_input, firmware_names )
+    if ( ( controller is None ) and 
+         ( ( '--all' not in options ) or ( controller_input is not None ) ) ):
+        print( "Error: Specify a board with --controller. Valid boards include: " )
+        for i, name in enumerate( controller_names ):
+            print( '\t' + str( i + 1 ) + ". " + name )
+        return serialObj
+    if ( ( firmware_input is not None ) and ( firmware is None ) ):
+        print( "Error: Unrecognized firmware. Valid firmware include: " )
+        for i, name in enumerate( firmware_names ):
+            print( '\t' + str( i + 1 ) + ". " + name )
+        return serialObj
+
+    if ( '--all' in options ):
+        batch_converter( options['--all'] or "output", controller, firmware )
+        return serialObj
+
+    if ( '--in' not in options ):
+        print( "Error: Specify a flash extract file with --in" )
+        return serialObj
+    output_file = options.get( '--out', default_output_file )
+
+    print( f"Selected Hardware: {controller}" )
+    print( f"Selected firmware: {firmware}" )
+
+    # Look in the output directory if the file isn't found
+    txt_file = options['--in']
+    try:
+        open( txt_file, 'r' ).close()
+    except OSError:
+        try:
+            txt_file = "output/" + txt_file
+            open( txt_file, 'r' ).close()
+        except OSError:
+            print( "Could not read file: " + options['--in'] )
+            return serialObj
+
+    converter( txt_file, output_file, controller, firmware )
+    return serialObj
+## parse_output ##
+
+
+####################################################################################
+# Script Entry Point                                                               #
+####################################################################################
+if __name__ == '__main__':
+    parse_output( sys.argv[1:], types.SimpleNamespace( controller = None, 
+                                                       firmware   = None ) )
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
@@ -0,0 +1,432 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# publisher.py -- Local telemetry server for viewers in other processes            #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+####################################################################################
+# Decoded telemetry (telreq --stream, sensor poll, sequence telemetry) is          #
+# published over a localhost TCP socket while the publish server runs. Each        #
+# message is a header of message type, stream number and payload length followed   #
+# by the payload:                                                                  #
+#                                                                                  #
+#   stream_open   : JSON with the stream's record dtype and recording metadata     #
+#   stream_records: one or more records in the stream's record dtype, the same     #
+#                   fixed-size records written to telemetry sessions               #
+#   stream_close  : empty                                                          #
+#                                                                                  #
+# A new subscriber is first sent stream_open for every open stream. Every          #
+# subscriber has a bounded queue, when a slow subscriber's queue is full its       #
+# oldest records are dropped, so acquisition never waits on a viewer               #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import sys
+import json
+import time
+import socket
+import struct
+import asyncio
+import threading
+import collections
+import numpy as np
+
+# Project imports
+import commands
+import transport
+from   config      import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Message header, message type, stream number and payload length
+message_header = struct.Struct( "<BHI" )
+
+# Message types
+stream_open    = 1
+stream_records = 2
+stream_close   = 3
+
+# Open streams, stream number to the payload of its stream_open message
+stream_list    = {}
+stream_number  = 0
+stream_lock    = threading.Lock()
+
+# Running server, None if telemetry is not being published. Starting and stopping
+# the server hold server_lock, so only one server ever runs
+server         = None
+server_lock    = threading.Lock()
+
+# Longest wait for subscribers to take their queued messages when the server
+# stops, slower subscribers are disconnected
+server_stop_timeout = 1.0 # s
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         pack_message                                                             #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns a message with its header                                        #
+#                                                                                  #
+####################################################################################
+def pack_message( message_type, stream, payload = b'' ):
+    return message_header.pack( message_type, stream, len( payload ) ) + payload
+## pack_message ##
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         subscriber                                                               #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Messages waiting to be sent to one subscriber. Record messages wait in   #
+#         a deque of at most telemetry_server_queue_max, which drops the oldest    #
+#         when full. Stream open and close messages wait in their own deque and    #
+#         are never dropped, each message is numbered so both are sent in the      #
+#         order they were queued. A stream is opened at most once                  #
+#                                                                                  #
+####################################################################################
+class subscriber:
+    def __init__( self, writer ):
+        self.writer      = writer
+        self.address     = writer.get_extra_info( "peername" )
+        self.messages    = collections.deque()
+        self.records     = collections.deque( maxlen = telemetry_server_queue_max )
+        self.streams     = set()
+        self.num_queued  = 0
+        self.num_sent    = 0
+        self.num_dropped = 0
+        self.ready       = asyncio.Event()
+
+    def put( self, message_type, stream, message ):
+        if ( message_type == stream_records ):
+            if ( len( self.records ) == self.records.maxlen ):
+                self.num_dropped += 1
+            self.records.append( ( self.num_queued, message ) )
+        else:
+            if ( message_type == stream_open ):
+                if ( stream in self.streams ):
+                    return
+                self.streams.add( stream )
+            else:
+                self.streams.discard( stream )
+            self.messages.append( ( self.num_queued, message ) )
+        self.num_queued += 1
+        self.ready.set()
+
+    # Ends the subscription once the queued messages are sent
+    def close( self ):
+        self.messages.append( ( self.num_queued, None ) )
+        self.num_queued += 1
+        self.ready.set()
+
+    # Number of messages waiting to be sent
+    def queued( self ):
+        return len( self.messages ) + len( self.records )
+
+    async def get( self ):
+        while ( self.queued() == 0 ):
+            self.ready.clear()
+            await self.ready.wait()
+        if ( ( len( self.records ) > 0 ) and 
+             ( ( len( self.messages ) == 0 ) or ( self.records[0][0] < self.messages[0][0] ) ) ):
+            return self.records.popleft()[1]
+        return self.messages.popleft()[1]
+## class subscriber ##
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         telemetry_server                                                         #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Accepts subscribers on the transport loop and copies published messages  #
+#         to each subscriber's queue. Stopping waits at most server_stop_timeout   #
+#         for subscribers to finish                                                #
+#                                                                                  #
+####################################################################################
+class telemetry_server:
+    def __init__( self, port ):
+        self.port        = port
+        self.subscribers = []
+        self.tasks       = set()
+        self.server      = None
+
+    async def start( self ):
+        self.server = await asyncio.start_server( self.serve, "127.0.0.1", self.port )
+
+    async def stop( self ):
+        self.server.close()
+        for listed in self.subscribers:
+            listed.close()
+
+        # Subscribers which do not take their messages in time are cut off
+        if ( len( self.tasks ) > 0 ):
+            _, pending = await asyncio.wait( list( self.tasks ), timeout = server_stop_timeout )
+            for task in pending:
+                task.cancel()
+            if ( len( pending ) > 0 ):
+                await asyncio.wait( pending )
+        try:
+            await asyncio.wait_for( self.server.wait_closed(), server_stop_timeout )
+        except asyncio.TimeoutError:
+            pass
+
+    async def serve( self, reader, writer ):
+        listed = subscriber( writer )
+        with stream_lock:
+            for stream, payload in stream_list.items():
+                listed.put( stream_open, stream, pack_message( stream_open, stream, payload ) )
+            self.subscribers.append( listed )
+        self.tasks.add( asyncio.current_task() )
+        try:
+            while ( True ):
+                message = await listed.get()
+                if ( message is None ):
+                    break
+                writer.write( message )
+                await writer.drain()
+                listed.num_sent += 1
+        except ( ConnectionError, asyncio.CancelledError ):
+            # Drop what the subscriber has not read rather than wait to send it
+            writer.transport.abort()
+        finally:
+            self.subscribers.remove( listed )
+            self.tasks.discard( asyncio.current_task() )
+            writer.close()
+
+    # Runs on the transport loop
+    def fanout( self, message_type, stream, message ):
+        for listed in self.subscribers:
+            listed.put( message_type, stream, message )
+
+    # Queue a message to every subscriber, from any thread without waiting
+    def publish( self, message_type, stream, message ):
+        transport.get_transport_loop().call_soon_threadsafe( self.fanout, message_type,
+                                                             stream, message )
+## class telemetry_server ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         publish_open                                                             #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Opens a published stream of records in record_dtype, described by        #
+#         metadata, and returns its stream number                                  #
+#                                                                                  #
+####################################################################################
+def publish_open( record_dtype, metadata ):
+    global stream_number
+    payload = json.dumps( { "record_dtype": np.dtype( record_dtype ).descr,
+                            "metadata"    : metadata } ).encode()
+    with stream_lock:
+        stream_number         = ( stream_number % 0xFFFF ) + 1
+        stream                = stream_number
+        stream_list[stream]   = payload
+        if ( server is not None ):
+            server.publish( stream_open, stream, 
+                            pack_message( stream_open, stream, payload ) )
+    return stream
+## publish_open ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         publish_records                                                          #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Publishes packed records on a stream, does nothing if the server is not  #
+#         running                                                                  #
+#                                                                                  #
+####################################################################################
+def publish_records( stream, record_bytes ):
+    running = server
+    if ( running is not None ):
+        running.publish( stream_records, stream, 
+                         pack_message( stream_records, stream, record_bytes ) )
+## publish_records ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         publish_close                                                            #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Closes a published stream                                                #
+#                                                                                  #
+####################################################################################
+def publish_close( stream ):
+    with stream_lock:
+        stream_list.pop( stream, None )
+        if ( server is not None ):
+            server.publish( stream_close, stream, pack_message( stream_close, stream ) )
+## publish_close ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         subscribe                                                                #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Connects to a publish server, for viewers in other processes. Yields     #
+#         ( message type, stream description, records ), where records is an       #
+#         array in the stream's record dtype for stream_records and None otherwise #
+#                                                                                  #
+####################################################################################
+def subscribe( port = telemetry_server_port, host = "127.0.0.1" ):
+    streams = {}
+    with socket.create_connection( ( host, port ) ) as sock:
+        sock_file = sock.makefile( "rb" )
+        while ( True ):
+            header = sock_file.read( message_header.size )
+            if ( len( header ) < message_header.size ):
+                return
+            message_type, stream, length = message_header.unpack( header )
+            payload = sock_file.read( length )
+            if ( message_type == stream_open ):
+                description = json.loads( payload )
+                description["record_dtype"] = np.dtype( [ tuple( field ) for field in
+                                                          description["record_dtype"] ] )
+                streams[stream] = description
+                yield message_type, description, None
+            elif ( message_type == stream_records ):
+                description = streams[stream]
+                yield message_type, description, np.frombuffer( payload,
+                                                                description["record_dtype"] )
+            elif ( message_type == stream_close ):
+                yield message_type, streams.pop( stream ), None
+## subscribe ##
+
+
+####################################################################################
+# Commands                                                                         #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# COMMAND:                                                                         #
+#         publish                                                                  #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Starts, stops and shows the status of the telemetry publish server       #
+#                                                                                  #
+####################################################################################
+def publish( Args, serialObj ):
+    global server
+
+    if ( ( len( Args ) == 0 ) or ( Args[0] == "help" ) ):
+        commands.display_help_info( "publish" )
+        return serialObj
+    subcommand = Args[0]
+
+    # Start publishing
+    if ( subcommand == "start" ):
+        port = telemetry_server_port
+        if ( len( Args ) > 1 ):
+            try:
+                port = int( Args[1] )
+            except ValueError:
+                print( "Error: Invalid port " + Args[1] )
+                return serialObj
+        with server_lock:
+            if ( server is not None ):
+                print( "Error: Telemetry is already published on port " + str( server.port ) )
+                return serialObj
+            new_server = telemetry_server( port )
+            try:
+                transport.run( new_server.start() )
+            except OSError as error:
+                print( "Error: Could not start the publish server: " + str( error ) )
+                return serialObj
+            with stream_lock:
+                server = new_server
+        print( "Publishing telemetry on 127.0.0.1:" + str( port ) )
+        return serialObj
+
+    # Stop publishing
+    elif ( subcommand == "stop" ):
+        with server_lock:
+            if ( server is None ):
+                print( "Error: Telemetry is not being published" )
+                return serialObj
+            with stream_lock:
+                stopped = server
+                server  = None
+            transport.run( stopped.stop() )
+        print( "Stopped publishing telemetry" )
+        return serialObj
+
+    # List subscribers
+    elif ( subcommand == "status" ):
+        if ( server is None ):
+            print( "Telemetry is not being published" )
+            return serialObj
+        print( "Publishing telemetry on 127.0.0.1:" + str( server.port ) + ", " +
+               str( len( stream_list ) ) + " open streams" )
+        for listed in list( server.subscribers ):
+            print( "  {:24s}{:10d} sent{:10d} dropped{:6d} queued".format(
+                   listed.address[0] + ":" + str( listed.address[1] ), listed.num_sent, listed.num_dropped,
+                   listed.queued() ) )
+        return serialObj
+
+    print( "Error: Unrecognized subcommand " + subcommand + ". Run \"publish help\"" )
+    return serialObj
+## publish ##
+
+
+####################################################################################
+# Viewer Entry Point, shows the latest record of each stream a few times a second: #
+# python publisher.py [PORT]                                                       #
+####################################################################################
+if __name__ == '__main__':
+    port         = int( sys.argv[1] ) if ( len( sys.argv ) > 1 ) else telemetry_server_port
+    display_time = 0.0
+    latest       = {}
+    for message_type, description, records in subscribe( port ):
+        name = description["metadata"].get( "session", "" ) + " " + \
+               description["metadata"].get( "source", "" )
+        if ( message_type == stream_open ):
+            print( "Opened " + name )
+        elif ( message_type == stream_close ):
+            print( "Closed " + name )
+            latest.pop( name, None )
+        else:
+            latest[name] = records[-1]
+        if ( time.monotonic() - display_time >= 0.25 ):
+            display_time = time.monotonic()
+            for name, record in latest.items():
+                print( name + ": " + "  ".join( field + "=" + str( record[field] )
+                                                for field in record.dtype.names ) )
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
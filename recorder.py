@@ -0,0 +1,224 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# recorder.py -- Rotating, indexed binary recorder for telemetry sessions          #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+####################################################################################
+# A session is a directory holding session.json, which describes the record        #
+# dtype and lists the segments, and segment files segment_NNNN.bin of fixed-size   #
+# records. Every index_stride records, a ( host_time, record number ) entry is     #
+# appended to the segment's segment_NNNN.idx, so seeking reads only the sparse     #
+# index and one stride of records. Both files are flushed once per stride, records #
+# first, so a session being recorded can be read up to its last full stride       #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import os
+import json
+import time
+import bisect
+import numpy as np
+
+# Project imports
+from   config      import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Sparse index entry, host time of a record and its record number in the segment
+index_dtype = np.dtype( [ ( "host_time", "<f8" ), ( "record", "<u8" ) ] )
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         telemetry_recorder                                                       #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Appends fixed-size records to a session, rotating to a new segment file  #
+#         by size or age. Memory use does not grow with the session length         #
+#                                                                                  #
+####################################################################################
+class telemetry_recorder:
+    def __init__( self, session_dir, record_dtype, metadata = None,
+                  max_bytes    = telemetry_segment_max_bytes  ,
+                  max_seconds  = telemetry_segment_max_seconds,
+                  index_stride = telemetry_index_stride ):
+        self.session_dir  = session_dir
+        self.record_dtype = np.dtype( record_dtype )
+        self.max_records  = max( 1, max_bytes // self.record_dtype.itemsize )
+        self.max_seconds  = max_seconds
+        self.index_stride = index_stride
+        self.session      = {
+                            "record_dtype": self.record_dtype.descr,
+                            "index_stride": index_stride          ,
+                            "metadata"    : metadata or {}        ,
+                            "segments"    : []
+                            }
+        self.segment_file = None
+        self.index_file   = None
+        os.makedirs( session_dir, exist_ok = True )
+
+    # Start a new segment, listing it in session.json
+    def rotate( self, host_time ):
+        self.close()
+        segment_name = "segment_{:04d}".format( len( self.session["segments"] ) )
+        self.session["segments"].append( { "name"      : segment_name,
+                                           "start_time": host_time } )
+        self.segment_file   = open( os.path.join( self.session_dir, segment_name + ".bin" ), "wb" )
+        self.index_file     = open( os.path.join( self.session_dir, segment_name + ".idx" ), "wb" )
+        self.segment_start  = time.monotonic()
+        self.num_records    = 0
+        self.write_session()
+
+    def write_session( self ):
+        session_file = os.path.join( self.session_dir, "session.json" )
+        with open( session_file + ".tmp", "w" ) as file:
+            json.dump( self.session, file )
+        os.replace( session_file + ".tmp", session_file )
+
+    # Append one packed record, stamped with host_time
+    def write( self, record_bytes, host_time ):
+        if ( ( self.segment_file is None ) or
+             ( self.num_records >= self.max_records ) or
+             ( time.monotonic() - self.segment_start >= self.max_seconds ) ):
+            self.rotate( host_time )
+        if ( self.num_records % self.index_stride == 0 ):
+            # Flush the last stride, records first so the index entries on disk
+            # never point past them
+            self.segment_file.flush()
+            self.index_file.flush()
+            self.index_file.write( np.array( ( host_time, self.num_records ),
+                                             dtype = index_dtype ).tobytes() )
+        self.segment_file.write( record_bytes )
+        self.num_records += 1
+
+    def close( self ):
+        if ( self.segment_file is not None ):
+            self.segment_file.close()
+            self.index_file.close()
+            self.segment_file = None
+            self.index_file   = None
+## class telemetry_recorder ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         session_open                                                             #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Reads a recorded session's description, with its record dtype compiled   #
+#                                                                                  #
+####################################################################################
+def session_open( session_dir ):
+    with open( os.path.join( session_dir, "session.json" ), "r" ) as file:
+        session = json.load( file )
+    session["record_dtype"] = np.dtype( [ tuple( field ) for field in session["record_dtype"] ] )
+    session["session_dir"]  = session_dir
+    return session
+## session_open ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         session_segment                                                          #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Memory maps the records and sparse index of a session segment            #
+#                                                                                  #
+####################################################################################
+def session_segment( session, segment_num ):
+    segment_path = os.path.join( session["session_dir"],
+                                 session["segments"][segment_num]["name"] )
+    if ( os.path.getsize( segment_path + ".bin" ) < session["record_dtype"].itemsize ):
+        return np.empty( 0, dtype = session["record_dtype"] ), np.empty( 0, dtype = index_dtype )
+    num_records = os.path.getsize( segment_path + ".bin" )//session["record_dtype"].itemsize
+    records     = np.memmap( segment_path + ".bin", dtype = session["record_dtype"],
+                             mode = 'r', shape = ( num_records, ) )
+    index       = np.fromfile( segment_path + ".idx", dtype = index_dtype )
+    return records, index
+## session_segment ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         session_seek                                                             #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the segment number and record number of the first record at or   #
+#         after host_time, reading only the segment list, one sparse index and one #
+#         stride of records                                                        #
+#                                                                                  #
+####################################################################################
+def session_seek( session, host_time ):
+    start_times = [ segment["start_time"] for segment in session["segments"] ]
+    segment_num = max( 0, bisect.bisect_right( start_times, host_time ) - 1 )
+    while ( segment_num < len( start_times ) ):
+        records, index = session_segment( session, segment_num )
+        if ( ( len( records ) > 0 ) and ( records[-1]["host_time"] >= host_time ) ):
+            entry = max( 0, np.searchsorted( index["host_time"], host_time, side = 'right' ) - 1 )
+            start = int( index["record"][entry] ) if ( len( index ) > 0 ) else 0
+            stop  = min( start + session["index_stride"], len( records ) )
+            return segment_num, start + int( np.searchsorted( records["host_time"][start:stop],
+                                                              host_time ) )
+        segment_num += 1
+    return len( start_times ), 0
+## session_seek ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         session_replay                                                           #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Yields blocks of records between start_time and stop_time (host time),   #
+#         seeking to the start without scanning earlier records                    #
+#                                                                                  #
+####################################################################################
+def session_replay( session, start_time = None, stop_time = None, block_records = 4096 ):
+    if ( start_time is None ):
+        segment_num, record_num = 0, 0
+    else:
+        segment_num, record_num = session_seek( session, start_time )
+    while ( segment_num < len( session["segments"] ) ):
+        records, _ = session_segment( session, segment_num )
+        while ( record_num < len( records ) ):
+            block = records[record_num:record_num + block_records]
+            if ( ( stop_time is not None ) and ( block["host_time"][-1] > stop_time ) ):
+                block = block[:np.searchsorted( block["host_time"], stop_time, side = 'right' )]
+                if ( len( block ) > 0 ):
+                    yield block
+                return
+            yield block
+            record_num += block_records
+        segment_num += 1
+        record_num   = 0
+## session_replay ##
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
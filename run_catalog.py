@@ -0,0 +1,202 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# run_catalog.py -- SQLite catalog of extracted dual deploy runs                   #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import os
+import datetime
+import sqlite3
+
+# Project imports
+from   config      import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Catalog columns, in table order
+catalog_columns = [
+                  "run_date"          , # YYYY-MM-DD
+                  "run_num"           ,
+                  "main_alt"          , # ft
+                  "drogue_delay"      , # s
+                  "ground_press"      , # kPa
+                  "main_deploy_time"  , # ms
+                  "drogue_deploy_time", # ms
+                  "land_time"         , # ms
+                  "header_file"       ,
+                  "data_file"         ,
+                  "frames_file"
+                  ]
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         catalog_connect                                                          #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Opens the dual deploy run catalog, creating it if it does not exist      #
+#                                                                                  #
+####################################################################################
+def catalog_connect( filename = dual_deploy_catalog_file ):
+    os.makedirs( os.path.dirname( filename ), exist_ok = True )
+    catalog = sqlite3.connect( filename )
+    catalog.row_factory = sqlite3.Row
+    catalog.execute( """CREATE TABLE IF NOT EXISTS runs (
+                            run_date           TEXT    NOT NULL,
+                            run_num            INTEGER NOT NULL,
+                            main_alt           REAL,
+                            drogue_delay       REAL,
+                            ground_press       REAL,
+                            main_deploy_time   REAL,
+                            drogue_deploy_time REAL,
+                            land_time          REAL,
+                            header_file        TEXT,
+                            data_file          TEXT,
+                            frames_file        TEXT,
+                            PRIMARY KEY ( run_date, run_num ) )""" )
+    catalog.execute( "CREATE INDEX IF NOT EXISTS runs_main_alt ON runs ( main_alt )" )
+    return catalog
+## catalog_connect ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         catalog_add_run                                                          #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Records an extracted run, given a dictionary keyed by catalog_columns    #
+#                                                                                  #
+####################################################################################
+def catalog_add_run( run, filename = dual_deploy_catalog_file ):
+    catalog = catalog_connect( filename )
+    with catalog:
+        catalog.execute( "INSERT OR REPLACE INTO runs VALUES ( " +
+                         ", ".join( "?"*len( catalog_columns ) ) + " )",
+                         [ run.get( column ) for column in catalog_columns ] )
+    catalog.close()
+## catalog_add_run ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         catalog_find_runs                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the runs matching every given column value, e.g.                 #
+#         catalog_find_runs( run_date = "2026-10-19" ), oldest run first           #
+#                                                                                  #
+####################################################################################
+def catalog_find_runs( filename = dual_deploy_catalog_file, **filters ):
+    for column in filters:
+        if ( column not in catalog_columns ):
+            print( "Error: Unrecognized catalog column: " + column )
+            return []
+    query = "SELECT * FROM runs"
+    if ( len( filters ) > 0 ):
+        query += " WHERE " + " AND ".join( column + " = ?" for column in filters )
+    query += " ORDER BY run_date, run_num"
+
+    catalog = catalog_connect( filename )
+    runs    = [ dict( row ) for row in catalog.execute( query, list( filters.values() ) ) ]
+    catalog.close()
+    return runs
+## catalog_find_runs ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         catalog_latest_run                                                       #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the most recently extracted run, or None if the catalog is empty #
+#                                                                                  #
+####################################################################################
+def catalog_latest_run( filename = dual_deploy_catalog_file ):
+    catalog = catalog_connect( filename )
+    row     = catalog.execute( "SELECT * FROM runs ORDER BY run_date DESC, " +
+                               "run_num DESC LIMIT 1" ).fetchone()
+    catalog.close()
+    if ( row is None ):
+        return None
+    return dict( row )
+## catalog_latest_run ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         catalog_import_runs                                                      #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Adds runs extracted before the catalog existed by scanning the           #
+#         MM-DD-YYYY/dataN output directories, returns the number of runs added    #
+#                                                                                  #
+####################################################################################
+def catalog_import_runs( output_dir = dual_deploy_output_dir,
+                         filename   = dual_deploy_catalog_file ):
+    if ( not os.path.exists( output_dir ) ):
+        return 0
+
+    catalog  = catalog_connect( filename )
+    num_runs = 0
+    for date_dir in os.listdir( output_dir ):
+        try:
+            run_date = datetime.datetime.strptime( date_dir, "%m-%d-%Y" ).date()
+        except ValueError:
+            continue
+        for data_dir in os.listdir( os.path.join( output_dir, date_dir ) ):
+            run_dir     = os.path.join( output_dir, date_dir, data_dir )
+            header_file = os.path.join( run_dir, "header.txt" )
+            if ( ( not data_dir.startswith( "data" ) ) or
+                 ( not data_dir[4:].isdigit()      ) or
+                 ( not os.path.exists( header_file ) ) ):
+                continue
+
+            # Header lines are "<name> : <value> <units>"
+            with open( header_file, "r" ) as file:
+                header_values = [ float( line.split( ":" )[1].split()[0] )
+                                  for line in file.readlines() ]
+            frames_file = os.path.join( run_dir, "data.npy" )
+            if ( not os.path.exists( frames_file ) ):
+                frames_file = None
+            with catalog:
+                cursor = catalog.execute( "INSERT OR IGNORE INTO runs VALUES ( " +
+                                          ", ".join( "?"*len( catalog_columns ) ) + " )",
+                                          [ run_date.isoformat(), int( data_dir[4:] ) ] +
+                                          header_values[0:6] +
+                                          [ header_file,
+                                            os.path.join( run_dir, "data.txt" ),
+                                            frames_file ] )
+            num_runs += cursor.rowcount
+    catalog.close()
+    return num_runs
+## catalog_import_runs ##
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
@@ -41,6 +41,12 @@ import canard_fc        # active roll application commands
 from   config import *  # global settings
 import parser
 import appa
+import jobs
+import transactions
+import transport
+import sequence
+import sessions
+import publisher
 
 
 ####################################################################################
@@ -82,7 +88,14 @@ command_list = {
                  "save-preset": canard_fc.save_preset            ,
                  "parse-output": parser.parse_output             ,
                  "servo"      : flightComputer.servo             ,
-                 "preset"     : appa.preset
+                 "preset"     : appa.preset                      ,
+                 "jobs"       : jobs.jobs                        ,
+                 "fg"         : jobs.fg                          ,
+                 "kill"       : jobs.kill                        ,
+                 "iostat"     : transactions.iostat              ,
+                 "sequence"   : sequence.sequence                ,
+                 "session"    : sessions.session                 ,
+                 "publish"    : publisher.publish
                 }
 
 
@@ -98,6 +111,7 @@ command_list = {
 ####################################################################################
 class terminalData:
     def __init__( self ):
+        self.name                = default_session_name
         self.baudrate            = None
         self.comport             = None
         self.timeout             = None
@@ -109,6 +123,12 @@ class terminalData:
         self.sensor_readouts     = {}
         self.engine_state        = None
         self.valve_states        = {}
+        self.port_lock           = transactions.serial_port_lock()
+        self.rx_byte_count       = 0
+        self.tx_byte_count       = 0
+        self.io_worker           = transactions.io_worker( self )
+        self.transport           = transport.serial_transport( self )
+        self.command_time        = None
 
     # Initialize Serial Port
     def initComport(self, baudrate, comport, timeout):
@@ -172,6 +192,7 @@ class terminalData:
                    +"serial port connection")
         else:
             self.serialObj.write(byte)
+            self.tx_byte_count += len( byte )
 
     # Write an array of bytes to the serial port 
     def sendBytes(self, byte_array):
@@ -180,6 +201,7 @@ class terminalData:
                    +"serial port connection")
         else:
             self.serialObj.write( byte_array )
+            self.tx_byte_count += len( byte_array )
 
     # Read a single Byte from the serial port
     def readByte(self):
@@ -187,7 +209,9 @@ class terminalData:
             print("Error: Could not read byte from serial port. No active" \
                    +"serial port connection")
         else:
-             return self.serialObj.read()
+             rx_byte = self.serialObj.read()
+             self.rx_byte_count += len( rx_byte )
+             return rx_byte
 
     # Read multiple bytes from the serial port
     def readBytes( self, num_bytes ):
@@ -198,8 +222,44 @@ class terminalData:
             rx_bytes = []
             for i in range( num_bytes ):
                 rx_bytes.append( self.serialObj.read() )
+                self.rx_byte_count += len( rx_bytes[-1] )
             return rx_bytes 
 
+    # Read a block of bytes from the serial port in bulk, returns a bytes 
+    # object which is shorter than num_bytes if the port timed out, or b''
+    # if the port is closed
+    def readBlock( self, num_bytes ):
+        if (not self.serialObj.is_open):
+            print("Error: Could not read bytes from serial port. No active" \
+                   +"serial port connection")
+            return b''
+        else:
+            rx_bytes = bytearray()
+            while ( len( rx_bytes ) < num_bytes ):
+                rx_chunk = self.serialObj.read( num_bytes - len( rx_bytes ) )
+                if ( len( rx_chunk ) == 0 ):
+                    break
+                rx_bytes += rx_chunk
+                self.rx_byte_count += len( rx_chunk )
+            return bytes( rx_bytes )
+
+    # Cut short a read waiting on another thread, the read returns the bytes
+    # received so far
+    def cancelRead( self ):
+        if ( self.serialObj.is_open and hasattr( self.serialObj, "cancel_read" ) ):
+            self.serialObj.cancel_read()
+
+    # Discard stale input and a cancel which arrived after the cancelled read
+    # returned, so neither cuts short the next command's reads
+    def flushCancelledRead( self ):
+        if ( not self.serialObj.is_open ):
+            return
+        self.serialObj.reset_input_buffer()
+        timeout                = self.serialObj.timeout
+        self.serialObj.timeout = 0
+        self.serialObj.read( 1 )
+        self.serialObj.timeout = timeout
+
 	# Set the SDR controller to enable board-specific commands
     def set_SDR_controller(self, controller_name, firmware_name = None ):
         self.controller = controller_name
@@ -259,30 +319,48 @@ def parseInput(userin):
 ####################################################################################
 if __name__ == '__main__':
     
-    # Initialize Serial Port Object
-    terminalSerObj = terminalData()
-
-    # Look for possible connections
-    avail_ports = serial.tools.list_ports.comports()
-    for port_num, port in enumerate( avail_ports ):
-        if ( 'CP2102' in port.description ):
-            # Connect
-            port_num = port.device
-            connect_args  = [ '-p', port_num]
-            commands.connect( connect_args, terminalSerObj )
+    # Initialize Serial Port Object, the default session
+    sessions.session_class = terminalData
+    terminalSerObj = sessions.session_add( default_session_name, terminalData() )
+
+    # Look for possible connections, probing all board ports at once
+    sessions.session_discover()
             
     # Display command prompt
     while(True):
-        # Command prompt
-        userin         = input("SDR>> ")
-
-        # Parse command
-        userin_clean   = parseInput(userin)
-        userCommand    = userin_clean[0]
-        userArgs       = userin_clean[1:]
-
-        # Execute Command
-        terminalSerObj = command_list[userCommand](userArgs, terminalSerObj)
+        # Command prompt, Ctrl+C stops the active session's latest job instead
+        # of exiting
+        try:
+            userin     = input( sessions.session_prompt() )
+        except KeyboardInterrupt:
+            print()
+            jobs.job_stop_latest( sessions.session_get() )
+            continue
+
+        # Route @NAME commands to their session
+        terminalSerObj, userin = sessions.session_route( userin )
+        if ( terminalSerObj is None ):
+            continue
+
+        try:
+            # Parse command
+            userin_clean   = parseInput(userin)
+            userCommand    = userin_clean[0]
+            userArgs       = userin_clean[1:]
+
+            # Time the command from entry, abort latency is measured from here
+            terminalSerObj.command_time = time.perf_counter()
+
+            # Execute Command, long-running commands run as background jobs
+            terminalSerObj = jobs.run_command( command_list[userCommand], 
+                                               userCommand                , 
+                                               userArgs                   , 
+                                               terminalSerObj )
+        except KeyboardInterrupt:
+            print()
+            continue
+        if ( terminalSerObj.name in sessions.session_list ):
+            sessions.session_list[terminalSerObj.name] = terminalSerObj
 ## parseInput ##
 
 
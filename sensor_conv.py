@@ -18,11 +18,24 @@
 
 # Standard imports 
 import math
+import numpy as np
 
 # Project imports
 from config import *
 
 
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Barometric altitude constants
+baro_ps          = 101.3  # kPa
+baro_z_star      = 8404.0 # m
+baro_gamma       = 1.4
+baro_gamma_const = ( baro_gamma - 1.0 )/( baro_gamma )
+baro_alt_const   = baro_z_star*( baro_gamma )/( baro_gamma - 1.0 ) # m
+
+
 ####################################################################################
 # Procedures                                                                       #
 ####################################################################################
@@ -328,25 +341,48 @@ def encoder_int_to_deg( encoder_out ):
 #                                                                                  #
 # DESCRIPTION:                                                                     #
 #     Converts pressure readouts in kPa to altitude using the ground pressure and  #
-#     altitude pressure                                                            #
+#     altitude pressure. Accepts a single readout or an array of readouts          #
 #                                                                                  #
 ####################################################################################
 def pressure_to_alt( pressure, ground_pressure ):
-	# Constants
-	ps     = 101.3 # kPa
-	z_star = 8404.0 # m
-	gamma  = 1.4 
-
-	# Calculations
-	gamma_const1 = ( gamma - 1.0 )/( gamma )
-	gamma_const2 = ( gamma )/( gamma - 1.0 )
-	alt          = z_star*gamma_const2*( 1 - ( ( pressure/ps )**( gamma_const1 ) ) )
-	ground_alt   = z_star*gamma_const2*( 1 - ( ( ground_pressure/ps)**( gamma_const1 ) ) )
-	alt_agl      = alt - ground_alt
+	return pressures_to_alt( pressure, ground_pressure )
+## pressure_to_alt ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+# 	   pressures_to_alt                                                            #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#     Converts a column of pressure readouts in kPa to altitude above ground in    #
+#     feet in one pass, evaluating the ground altitude once per flight             #
+#                                                                                  #
+####################################################################################
+def pressures_to_alt( pressures, ground_pressure ):
+	pressures  = np.asarray( pressures, dtype = np.float64 )
+	ground_alt = baro_alt_const*( 1 - ( ( ground_pressure/baro_ps )**( baro_gamma_const ) ) )
+	alt        = baro_alt_const*( 1 - ( ( pressures/baro_ps )**( baro_gamma_const ) ) )
 
 	# Convert to feet
-	return alt_agl*3.28084
-## pressure_to_alt ##
+	return ( alt - ground_alt )*3.28084
+## pressures_to_alt ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+# 	   ox_pressures_to_flow                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#     Converts an array of differential pressure readouts in psi to flow rates for #
+#     liquid oxygen in kg/s, in one pass                                           #
+#                                                                                  #
+####################################################################################
+def ox_pressures_to_flow( dps ):
+	dps = np.asarray( dps, dtype = np.float64 )*6894.76 # psi to Pa conversion
+	return np.sign( dps )*math.sqrt(1143/998)*0.001088*np.sqrt( np.abs( dps ) ) + 0.00121
+## ox_pressures_to_flow ##
 
 
 ####################################################################################
@@ -360,14 +396,26 @@ def pressure_to_alt( pressure, ground_pressure ):
 #                                                                                  #
 ####################################################################################
 def ox_pressure_to_flow( dp ):
-	dp *= 6894.76 # psi to Pa conversion
-	if ( dp > 0 ):
-		return (  (math.sqrt(1143/998)*0.001088*math.sqrt(dp ) ) + 0.00121 ) 
-	else:
-		return ( -(math.sqrt(1143/998)*0.001088*math.sqrt(-dp) ) + 0.00121 ) 
+	return float( ox_pressures_to_flow( dp ) )
 ## ox_pressure_to_flow ##
 
 
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+# 	   fuel_pressures_to_flow                                                      #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#     Converts an array of differential pressure readouts in psi to flow rates for #
+#     RP1 in kg/s, in one pass                                                     #
+#                                                                                  #
+####################################################################################
+def fuel_pressures_to_flow( dps ):
+	dps = np.asarray( dps, dtype = np.float64 )*6894.76 # psi to Pa conversion
+	return np.sign( dps )*math.sqrt(780/998)*0.003431*np.sqrt( np.abs( dps ) ) - 0.0545
+## fuel_pressures_to_flow ##
+
+
 ####################################################################################
 #                                                                                  #
 # PROCEDURE:                                                                       #
@@ -379,11 +427,7 @@ def ox_pressure_to_flow( dp ):
 #                                                                                  #
 ####################################################################################
 def fuel_pressure_to_flow( dp ):
-	dp *= 6894.76 # psi to Pa conversion
-	if ( dp > 0 ):
-		return (  (math.sqrt(780/998)*0.003431*math.sqrt(dp ) ) - 0.0545 ) 
-	else:
-		return ( -(math.sqrt(780/998)*0.003431*math.sqrt(-dp) ) - 0.0545 ) 
+	return float( fuel_pressures_to_flow( dp ) )
 ## fuel_pressure_to_flow ##
 
 
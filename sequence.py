@@ -0,0 +1,468 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# sequence.py -- Timed engine controller command sequences                         #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+####################################################################################
+# A sequence file is JSON listing the steps of a test, each a command sent at a    #
+# time in seconds from the start of the sequence, with optional guards on the      #
+# latest telemetry:                                                                #
+#                                                                                  #
+#   { "telemetry_rate": 20, "abort_on_failure": true,                              #
+#     "steps": [ { "at":  0.0, "command": "pfpurge" },                             #
+#                { "at": 45.0, "command": "hotfire",                               #
+#                  "guards": [ { "sensor": "pt2", "below": 600 } ] } ] }           #
+#                                                                                  #
+# An optional "limits" file (see limits.py) is checked on every telemetry frame    #
+# while the sequence runs, and stops the sequence if a rule aborts                 #
+#                                                                                  #
+# Steps run on the monotonic clock, sleeping until shortly before each step and    #
+# spinning for the rest. Telemetry is requested in the background through the      #
+# transaction layer and pauses just before each step. A request still in flight    #
+# is waited on and cut short if it would delay the step, so the command goes out   #
+# on an idle port                                                                  #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import os
+import csv
+import json
+import time
+import threading
+import concurrent.futures
+
+# Project imports
+import commands
+import engineController
+import limits
+import publisher
+import recorder
+import telemetry
+import transactions
+from   config      import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Sequence commands, their opcodes and the engine state they enter when acknowledged
+sequence_commands = {
+                    "pfpurge"     : ( b'\x91', "Pre-Fire Purge State" ),
+                    "fillchill"   : ( b'\x92', "Fill and Chill State" ),
+                    "standby"     : ( b'\x93', "Standby State"        ),
+                    "hotfire"     : ( b'\x94', "Fire State"           ),
+                    "stoppurge"   : ( b'\x97', "Disarm State"         ),
+                    "stophotfire" : ( b'\x9A', None                   ),
+                    "loxpurge"    : ( b'\x9B', None                   ),
+                    "kbottleclose": ( b'\x9C', "Post-Fire State"      )
+                    }
+
+# Engine controller opcodes and acknowledge byte
+telreq_opcode = b'\x96'
+ack_byte      = b'\x95'
+
+# Size of the telemetry dump, sensor data and valve state
+telreq_dump_size = 41
+
+# Scheduler timing
+sequence_spin_time     = 0.002 # s, busy-wait before each step
+sequence_quiet_time    = 0.020 # s, no telemetry requests before each step
+sequence_guard_max_age = 0.5   # s, oldest telemetry a guard accepts
+
+# Default telemetry request rate
+sequence_telemetry_rate = 10 # Hz
+
+# Guard comparisons
+sequence_guard_tests = {
+                       "below": lambda readout, limit: readout < limit,
+                       "above": lambda readout, limit: readout > limit
+                       }
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         wait_until                                                               #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Waits until a time.perf_counter() time, sleeping until shortly before it #
+#         and spinning for the rest                                                #
+#                                                                                  #
+####################################################################################
+def wait_until( target_time ):
+    delay = target_time - time.perf_counter() - sequence_spin_time
+    if ( delay > 0 ):
+        time.sleep( delay )
+    while ( time.perf_counter() < target_time ):
+        pass
+## wait_until ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         load_sequence                                                            #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Reads and checks a sequence file, returns None after printing an error   #
+#         if it is invalid                                                         #
+#                                                                                  #
+####################################################################################
+def load_sequence( filename, sensors ):
+    try:
+        with open( filename, "r" ) as file:
+            sequence = json.load( file )
+    except ( OSError, ValueError ) as error:
+        print( "Error: Could not read sequence file: " + str( error ) )
+        return None
+
+    sequence.setdefault( "telemetry_rate"  , sequence_telemetry_rate )
+    sequence.setdefault( "abort_on_failure", True                    )
+    if ( ( not isinstance( sequence.get( "steps" ), list ) ) or
+         ( len( sequence["steps"] ) == 0 ) ):
+        print( "Error: The sequence has no steps" )
+        return None
+    if ( sequence["telemetry_rate"] <= 0 ):
+        print( "Error: telemetry_rate must be positive" )
+        return None
+
+    last_time = 0.0
+    for step_num, step in enumerate( sequence["steps"] ):
+        step_name = "Step " + str( step_num + 1 ) + ": "
+        if ( step.get( "command" ) not in sequence_commands ):
+            print( "Error: " + step_name + "Unrecognized command " + str( step.get( "command" ) ) +
+                   ". Valid commands include: " + ", ".join( sequence_commands ) )
+            return None
+        if ( ( not isinstance( step.get( "at" ), ( int, float ) ) ) or
+             ( step["at"] < last_time ) ):
+            print( "Error: " + step_name + "\"at\" must be a time in seconds, no earlier " +
+                   "than the previous step" )
+            return None
+        last_time = step["at"]
+        step.setdefault( "guards", [] )
+        for guard in step["guards"]:
+            tests = [ test for test in sequence_guard_tests if ( test in guard ) ]
+            if ( ( guard.get( "sensor" ) not in sensors ) or ( len( tests ) != 1 ) ):
+                print( "Error: " + step_name + "Guards need a sensor (" + ", ".join( sensors ) +
+                       ") and one of " + ", ".join( sequence_guard_tests ) )
+                return None
+    return sequence
+## load_sequence ##
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         telemetry_monitor                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Requests telemetry at a fixed rate while a sequence runs, keeping the    #
+#         latest readouts for guards, optionally checking limits, recording and    #
+#         publishing every frame. No requests are made while paused                #
+#                                                                                  #
+####################################################################################
+class telemetry_monitor( threading.Thread ):
+    def __init__( self, serialObj, layout, rate, log_file = None, engine = None,
+                  stream = None ):
+        threading.Thread.__init__( self, daemon = True )
+        self.serialObj   = serialObj
+        self.layout      = layout
+        self.period      = 1.0/rate
+        self.log_file    = log_file
+        self.engine      = engine
+        self.stream      = stream
+        self.limit_abort = False
+        self.readouts   = None
+        self.frame_time = None
+        self.num_frames = 0
+        self.num_missed = 0
+        self.hold       = False
+        self.hold_lock  = threading.Lock()
+        self.future     = None
+        self.stop_event = threading.Event()
+
+    def run( self ):
+        next_time = time.perf_counter()
+        while ( not self.stop_event.wait( max( 0.0, next_time - time.perf_counter() ) ) ):
+            next_time = max( next_time + self.period, time.perf_counter() )
+            with self.hold_lock:
+                if ( self.hold ):
+                    continue
+                self.future = transactions.submit( self.serialObj, telreq_opcode,
+                                                   response_size = telreq_dump_size + 1,
+                                                   timeout       = self.period,
+                                                   name          = "sequence telreq" )
+            try:
+                response = self.future.result()
+            except ( IOError, concurrent.futures.CancelledError ):
+                response = b''
+            if ( ( len( response ) < telreq_dump_size + 1 ) or
+                 ( response[:1] != ack_byte ) ):
+                self.num_missed += 1
+                continue
+            readouts        = telemetry.telemetry_decode( self.layout, response[1:] )
+            host_time       = time.time()
+            self.readouts   = dict( zip( self.layout["sensors"], readouts ) )
+            self.frame_time = time.perf_counter()
+            self.num_frames += 1
+            if ( ( self.engine is not None ) and
+                 limits.limit_check_frame( self.engine, self.serialObj, host_time,
+                                           self.layout, readouts ) ):
+                self.limit_abort = True
+            record = telemetry.telemetry_pack_record( self.layout, host_time, readouts,
+                                                      response[-1] )
+            if ( self.log_file is not None ):
+                self.log_file.write( record, host_time )
+            if ( self.stream is not None ):
+                publisher.publish_records( self.stream, record )
+
+    # Stop requesting telemetry, waiting until deadline (perf_counter time) for
+    # the request in flight and cutting it short after that
+    def pause( self, deadline ):
+        with self.hold_lock:
+            self.hold = True
+            future    = self.future
+        if ( ( future is not None ) and ( not future.cancel() ) ):
+            concurrent.futures.wait( [ future ], max( 0.0, deadline - time.perf_counter() ) )
+            if ( not future.done() ):
+                self.serialObj.io_worker.cancel_inflight()
+                concurrent.futures.wait( [ future ] )
+
+    def resume( self ):
+        self.hold = False
+
+    def stop( self ):
+        self.stop_event.set()
+        self.join()
+## class telemetry_monitor ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         check_guards                                                             #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Checks a step's guards against the latest telemetry, returns a failure   #
+#         message or None if every guard passes                                    #
+#                                                                                  #
+####################################################################################
+def check_guards( step, monitor ):
+    if ( len( step["guards"] ) == 0 ):
+        return None
+    if ( ( monitor.frame_time is None ) or
+         ( time.perf_counter() - monitor.frame_time > sequence_guard_max_age ) ):
+        return "No recent telemetry to check guards"
+    for guard in step["guards"]:
+        readout = monitor.readouts[guard["sensor"]]
+        for test, test_func in sequence_guard_tests.items():
+            if ( ( test in guard ) and ( not test_func( readout, guard[test] ) ) ):
+                return ( "Guard failed: " + guard["sensor"] + " = {:.3f}, ".format( readout ) +
+                         "required " + test + " " + str( guard[test] ) )
+    return None
+## check_guards ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         sequence_abort                                                           #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Sends the hotfire abort command on the priority path                     #
+#                                                                                  #
+####################################################################################
+def sequence_abort( serialObj ):
+    engineController.send_abort( serialObj, "sequence abort" )
+## sequence_abort ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         run_sequence                                                             #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Runs a loaded sequence, streaming telemetry alongside it, and logs each  #
+#         step's scheduled, send and acknowledge times in seconds from the start   #
+#         of the sequence to steps.csv in log_dir. Ctrl+C stops the sequence      #
+#         and, once a command has been sent, aborts the hotfire                    #
+#                                                                                  #
+####################################################################################
+def run_sequence( serialObj, sequence, layout, log_dir, engine = None ):
+    os.makedirs( log_dir, exist_ok = True )
+    metadata = { "controller": serialObj.controller,
+                 "source"    : "sequence"          ,
+                 "session"   : serialObj.name      }
+    log_file = recorder.telemetry_recorder( os.path.join( log_dir, "telemetry" ),
+                                            layout["record_dtype"], metadata )
+    stream   = publisher.publish_open( layout["record_dtype"], metadata )
+    monitor  = telemetry_monitor( serialObj, layout, sequence["telemetry_rate"], log_file,
+                                  engine, stream )
+    rows     = []
+    failure  = None
+    sent     = False
+    stopped  = False
+
+    # The prompt is busy while the sequence runs, Ctrl+C is how the user aborts
+    print( "Running sequence, Ctrl+C to abort" )
+    monitor.start()
+    start_time = time.perf_counter() + sequence_quiet_time
+    try:
+        for step_num, step in enumerate( sequence["steps"] ):
+            opcode, engine_state = sequence_commands[step["command"]]
+            target_time          = start_time + step["at"]
+
+            # Quiet the port and check guards just before the step
+            wait_until( target_time - sequence_quiet_time )
+            monitor.pause( target_time - sequence_spin_time )
+            failure = check_guards( step, monitor )
+            if ( failure is not None ):
+                break
+
+            wait_until( target_time )
+            if ( monitor.limit_abort ):
+                break
+            txn = transactions.transaction( opcode, response_size = 1,
+                                            timeout = serialObj.timeout or 1.0,
+                                            name    = "sequence " + step["command"] )
+
+            # The command may reach the board even if its ack never comes back,
+            # so a failure from here on aborts
+            serialObj.io_worker.submit( [ txn ] )
+            sent = True
+            try:
+                response = txn.future.result()
+            except IOError as error:
+                failure = str( error )
+                break
+            monitor.resume()
+
+            rows.append( [ step_num + 1, step["command"], step["at"],
+                           txn.start_time - start_time, txn.done_time - start_time,
+                           response.hex() ] )
+            print( "{:8.3f} s  {:12s} sent {:+.3f} ms, ack {:.3f} ms".format(
+                   step["at"], step["command"],
+                   1e3*( txn.start_time - target_time ),
+                   1e3*( txn.done_time - txn.start_time ) ) )
+            if ( response != ack_byte ):
+                failure = step["command"] + " was not acknowledged"
+                break
+            if ( engine_state is not None ):
+                serialObj.set_engine_state( engine_state )
+    except KeyboardInterrupt:
+        failure = "Sequence stopped by user"
+        stopped = True
+    finally:
+        monitor.stop()
+        log_file.close()
+        publisher.publish_close( stream )
+
+    if ( monitor.limit_abort ):
+        failure = "Limit abort"
+    if ( failure is not None ):
+        print( "Error: " + failure )
+        if ( sent and ( sequence["abort_on_failure"] or stopped ) and
+             ( not monitor.limit_abort ) ):
+            sequence_abort( serialObj )
+
+    with open( os.path.join( log_dir, "steps.csv" ), "w", newline = "" ) as file:
+        writer = csv.writer( file )
+        writer.writerow( [ "step", "command", "scheduled", "send", "ack", "response" ] )
+        writer.writerows( rows )
+
+    if ( len( rows ) > 0 ):
+        send_errors = [ abs( row[3] - row[2] ) for row in rows ]
+        print( "Send timing error: mean {:.3f} ms, max {:.3f} ms".format(
+               1e3*sum( send_errors )/len( send_errors ), 1e3*max( send_errors ) ) )
+    print( "Telemetry: " + str( monitor.num_frames ) + " frames, " +
+           str( monitor.num_missed ) + " missed" )
+    print( "Sequence log written to " + log_dir )
+    return failure is None
+## run_sequence ##
+
+
+####################################################################################
+# Commands                                                                         #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# COMMAND:                                                                         #
+#         sequence                                                                 #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Runs a timed command sequence from a file on the engine controller       #
+#                                                                                  #
+####################################################################################
+def sequence( Args, serialObj ):
+    supported_boards = [ "Liquid Engine Controller (L0002 Rev 4.0)",
+                         "Liquid Engine Controller (L0002 Rev 5.0)" ]
+
+    if ( ( len( Args ) == 0 ) or ( Args[0] == "help" ) ):
+        commands.display_help_info( "sequence" )
+        return serialObj
+    if ( ( Args[0] not in [ "run", "check" ] ) or ( len( Args ) != 2 ) ):
+        print( "Error: Usage: sequence [run|check] FILE" )
+        return serialObj
+    if ( serialObj.controller not in supported_boards ):
+        print( "Error: The sequence command requires a valid "  +
+               "serial connection to an engine controller "     +
+               "device. Run the \"connect\" command to "        +
+               "establish a valid connection." )
+        return serialObj
+
+    layout = telemetry.telemetry_layout( serialObj.controller )
+    loaded = load_sequence( Args[1], layout["sensors"] )
+    if ( loaded is None ):
+        return serialObj
+    engine = None
+    if ( "limits" in loaded ):
+        engine = limits.load_limit_engine( loaded["limits"], serialObj.controller )
+        if ( engine is None ):
+            return serialObj
+    for step in loaded["steps"]:
+        guards = [ guard["sensor"] + " " + test + " " + str( guard[test] )
+                   for guard in step["guards"] for test in sequence_guard_tests
+                   if ( test in guard ) ]
+        print( "{:8.3f} s  {:12s}".format( step["at"], step["command"] ) +
+               ( "  if " + ", ".join( guards ) if ( len( guards ) > 0 ) else "" ) )
+    if ( Args[0] == "check" ):
+        return serialObj
+
+    # Sequence transactions go through the I/O worker, which needs the port free
+    if ( not serialObj.port_lock.acquire( blocking = False ) ):
+        print( "Error: The serial port is in use by a job" )
+        return serialObj
+    serialObj.port_lock.release()
+
+    log_dir = os.path.join( sequence_log_dir,
+                            os.path.splitext( os.path.basename( Args[1] ) )[0] + "_" +
+                            time.strftime( "%Y%m%d_%H%M%S" ) )
+    run_sequence( serialObj, loaded, layout, log_dir, engine )
+    return serialObj
+## sequence ##
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
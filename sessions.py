@@ -0,0 +1,324 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# sessions.py -- Named connections to several boards from one terminal             #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+####################################################################################
+# Each session is a terminalData with its own serial port, port lock, I/O worker   #
+# and controller/firmware identity, so commands and background jobs on one board   #
+# never wait on another. A command line starting with @NAME runs on session NAME,  #
+# any other command line runs on the active session. Telemetry from every session  #
+# is stamped with the same host clock, so recordings of several boards can be      #
+# merged into one timeline                                                         #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import os
+import csv
+import heapq
+
+# Project imports
+import commands
+import recorder
+import discovery
+from   config      import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Open sessions keyed by name, and the session commands run on by default
+session_list   = {}
+active_session = default_session_name
+
+# Class of new sessions, set by sdec.py to terminalData
+session_class  = None
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         session_add                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Adds a session under name, creating a new terminalData if serialObj is   #
+#         not given, and returns it                                                #
+#                                                                                  #
+####################################################################################
+def session_add( name, serialObj = None ):
+    if ( serialObj is None ):
+        serialObj = session_class()
+    serialObj.name     = name
+    session_list[name] = serialObj
+    return serialObj
+## session_add ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         session_get                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the active session                                               #
+#                                                                                  #
+####################################################################################
+def session_get():
+    return session_list[active_session]
+## session_get ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         session_route                                                            #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Splits an @NAME prefix off a command line, returning the session to run  #
+#         the rest of the line on, or None after printing an error if there is no  #
+#         session NAME                                                             #
+#                                                                                  #
+####################################################################################
+def session_route( userin ):
+    userin = userin.strip()
+    if ( not userin.startswith( "@" ) ):
+        return session_get(), userin
+    name, _, userin = userin[1:].partition( " " )
+    if ( name not in session_list ):
+        print( "Error: No session named " + name + ". Sessions: " +
+               ", ".join( session_list ) )
+        return None, userin
+    if ( userin.strip() == "" ):
+        print( "Error: No command given for session " + name )
+        return None, userin
+    return session_list[name], userin.strip()
+## session_route ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         session_prompt                                                           #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the command prompt, naming the active session if it is not the   #
+#         default session                                                          #
+#                                                                                  #
+####################################################################################
+def session_prompt():
+    if ( active_session == default_session_name ):
+        return "SDR>> "
+    return "SDR@" + active_session + ">> "
+## session_prompt ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         session_discover                                                         #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Probes the board ports not open in a session concurrently and opens a    #
+#         session for each board found. The first board connects to the default    #
+#         session if it has no connection, the others to sessions named after      #
+#         their ports                                                              #
+#                                                                                  #
+####################################################################################
+def session_discover():
+    open_ports = [ listed.comport for listed in session_list.values() if listed.is_active() ]
+    port_names = [ port_name for port_name in discovery.candidate_ports()
+                   if ( port_name not in open_ports ) ]
+    found      = discovery.discover( port_names, session_class, commands.default_timeout )
+    for port_name, serialObj in found.items():
+        if ( not session_list[default_session_name].is_active() ):
+            name = default_session_name
+        else:
+            name = os.path.basename( port_name )
+            while ( name in session_list ):
+                name += "_"
+        session_add( name, serialObj )
+        print( "Connection established with " + discovery.describe_board( port_name, serialObj ) +
+               ( "" if ( name == default_session_name ) else " as session " + name ) )
+    return found
+## session_discover ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         session_merge                                                            #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Merges recorded telemetry sessions into one CSV in host time order. Each #
+#         row holds one record, in the columns of the session it came from         #
+#                                                                                  #
+####################################################################################
+def session_merge( output_filename, session_dirs ):
+    recordings = []
+    labels     = []
+    for session_dir in session_dirs:
+        try:
+            recording = recorder.session_open( session_dir )
+        except ( OSError, ValueError ) as error:
+            print( "Error: Could not open telemetry session " + session_dir + ": " +
+                   str( error ) )
+            return None
+        label = ( recording["metadata"].get( "session" ) or
+                  os.path.basename( os.path.normpath( session_dir ) ) )
+        while ( label in labels ):
+            label += "_"
+        recordings.append( recording )
+        labels.append( label )
+
+    # Each session's channels get their own columns, prefixed with its label
+    fields  = [ [ field for field in recording["record_dtype"].names if field != "host_time" ]
+                for recording in recordings ]
+    header  = [ "host_time", "session" ] + [ label + "." + field
+                                             for label, session_fields in zip( labels, fields )
+                                             for field in session_fields ]
+    offsets = [ 2 + sum( len( session_fields ) for session_fields in fields[:num] )
+                for num in range( len( fields ) ) ]
+
+    def records( session_num ):
+        for block in recorder.session_replay( recordings[session_num] ):
+            for record in block:
+                yield float( record["host_time"] ), session_num, record
+
+    num_records = 0
+    with open( output_filename, "w", newline = "" ) as file:
+        writer = csv.writer( file )
+        writer.writerow( header )
+        for host_time, session_num, record in heapq.merge(
+                *[ records( num ) for num in range( len( recordings ) ) ],
+                key = lambda item: ( item[0], item[1] ) ):
+            row = [ "" ]*len( header )
+            row[0] = "{:.6f}".format( host_time )
+            row[1] = labels[session_num]
+            for field_num, field in enumerate( fields[session_num] ):
+                row[offsets[session_num] + field_num] = record[field]
+            writer.writerow( row )
+            num_records += 1
+    return num_records
+## session_merge ##
+
+
+####################################################################################
+# Commands                                                                         #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# COMMAND:                                                                         #
+#         session                                                                  #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Opens, lists, selects and closes board sessions, and merges their        #
+#         telemetry recordings                                                     #
+#                                                                                  #
+####################################################################################
+def session( Args, serialObj ):
+    global active_session
+
+    if ( ( len( Args ) == 0 ) or ( Args[0] == "help" ) ):
+        commands.display_help_info( "session" )
+        return serialObj
+    subcommand = Args[0]
+
+    # List sessions
+    if ( subcommand == "list" ):
+        for name, listed in session_list.items():
+            print( ( "* " if ( name == active_session ) else "  " ) + name.ljust( 12 ) +
+                   str( listed.comport if listed.is_active() else "-" ).ljust( 16 ) +
+                   str( listed.controller or "-" ) +
+                   ( " (" + listed.firmware + ")" if listed.firmware else "" ) )
+        return serialObj
+
+    # Open a new session and make it active
+    elif ( subcommand == "new" ):
+        if ( len( Args ) != 2 ):
+            print( "Error: Usage: session new NAME" )
+            return serialObj
+        name = Args[1]
+        if ( name in session_list ):
+            print( "Error: Session " + name + " already exists" )
+            return serialObj
+        session_add( name )
+        active_session = name
+        print( "Opened session " + name + ", run \"connect -p PORT\" to connect a board" )
+        return serialObj
+
+    # Connect every board not yet in a session
+    elif ( subcommand == "scan" ):
+        if ( len( session_discover() ) == 0 ):
+            print( "No new boards found" )
+        return serialObj
+
+    # Make a session active
+    elif ( subcommand == "use" ):
+        if ( ( len( Args ) != 2 ) or ( Args[1] not in session_list ) ):
+            print( "Error: Usage: session use NAME, sessions: " + ", ".join( session_list ) )
+            return serialObj
+        active_session = Args[1]
+        return serialObj
+
+    # Disconnect and close a session
+    elif ( subcommand == "close" ):
+        if ( ( len( Args ) != 2 ) or ( Args[1] not in session_list ) ):
+            print( "Error: Usage: session close NAME, sessions: " + ", ".join( session_list ) )
+            return serialObj
+        name = Args[1]
+        if ( name == default_session_name ):
+            print( "Error: The default session cannot be closed" )
+            return serialObj
+        closed = session_list[name]
+        if ( not closed.port_lock.acquire( blocking = False ) ):
+            print( "Error: Session " + name + " has a running job" )
+            return serialObj
+        try:
+            if ( closed.is_active() ):
+                closed.closeComport()
+        finally:
+            closed.port_lock.release()
+        del session_list[name]
+        if ( active_session == name ):
+            active_session = default_session_name
+        print( "Closed session " + name )
+        return serialObj
+
+    # Merge telemetry recordings onto one timeline
+    elif ( subcommand == "merge" ):
+        if ( len( Args ) < 3 ):
+            print( "Error: Usage: session merge OUTPUT SESSION_DIR [SESSION_DIR ...]" )
+            return serialObj
+        num_records = session_merge( Args[1], Args[2:] )
+        if ( num_records is not None ):
+            print( "Merged " + str( num_records ) + " records into " + Args[1] )
+        return serialObj
+
+    print( "Error: Unrecognized subcommand " + subcommand + ". Run \"session help\"" )
+    return serialObj
+## session ##
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
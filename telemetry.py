@@ -0,0 +1,220 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# telemetry.py -- Precompiled decoding and logging of live telemetry frames        #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import math
+import types
+import struct
+import numpy as np
+
+# Project imports
+from   config      import *
+from   controller  import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Little-endian struct codes of the integer readout sizes
+telemetry_int_codes = { 1: "B", 2: "H", 4: "I" }
+
+# Compiled layouts, keyed by ( controller, tuple of sensor names )
+telemetry_layouts = {}
+
+# Bit numbers (1-based) of each valve in the telemetry valve state byte
+valve_nums = {
+             "oxPress"  : 1,
+             "fuelPress": 2,
+             "oxPurge"  : 5,
+             "fuelPurge": 6,
+             "oxVent"   : 3,
+             "fuelVent" : 4,
+             "oxMain"   : 7,
+             "fuelMain" : 8
+             }
+
+# Valve states with the valve's bit set/cleared
+valve_on_states = {
+                  "oxPress"  : "OPEN"  ,
+                  "fuelPress": "OPEN"  ,
+                  "oxPurge"  : "CLOSED",
+                  "fuelPurge": "CLOSED",
+                  "oxVent"   : "CLOSED",
+                  "fuelVent" : "CLOSED",
+                  "oxMain"   : "OPEN"  ,
+                  "fuelMain" : "OPEN"
+                  }
+
+valve_off_states = {
+                   "oxPress"  : "CLOSED",
+                   "fuelPress": "CLOSED",
+                   "oxPurge"  : "OPEN"  ,
+                   "fuelPurge": "OPEN"  ,
+                   "oxVent"   : "OPEN"  ,
+                   "fuelVent" : "OPEN"  ,
+                   "oxMain"   : "CLOSED",
+                   "fuelMain" : "CLOSED"
+                   }
+
+# Valve names in valve_state_lut tuple order
+valve_names = tuple( valve_nums )
+
+# Valve states of every valve state byte value, as tuples in valve_names order
+valve_state_lut = tuple( 
+                  tuple( valve_on_states[valve] 
+                         if ( state_int & ( 1 << ( valve_nums[valve] - 1 ) ) ) 
+                         else valve_off_states[valve]
+                         for valve in valve_names )
+                  for state_int in range( 256 ) 
+                  )
+
+# Read-only { valve: state } views of valve_state_lut, shared between callers
+valve_state_maps = tuple( types.MappingProxyType( dict( zip( valve_names, states ) ) )
+                          for states in valve_state_lut )
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         telemetry_layout                                                         #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Compiles, once per board and sensor list, the struct layout of a         #
+#         telemetry frame, its conversion functions and its log record format      #
+#                                                                                  #
+####################################################################################
+def telemetry_layout( controller, sensors = None ):
+    if ( sensors is None ):
+        sensors = list( controller_sensors[controller] )
+    key = ( controller, tuple( sensors ) )
+    if ( key in telemetry_layouts ):
+        return telemetry_layouts[key]
+
+    frame_format  = "<"
+    float_offsets = []
+    offset        = 0
+    for index, sensor in enumerate( sensors ):
+        size = sensor_sizes[controller][sensor]
+        if ( sensor_formats[controller][sensor] == float ):
+            frame_format += "f"
+            float_offsets.append( ( index, offset ) )
+        else:
+            frame_format += telemetry_int_codes[size]
+        offset += size
+
+    layout = {
+             "controller"   : controller,
+             "sensors"      : tuple( sensors ),
+             "frame"        : struct.Struct( frame_format ),
+             "conv_funcs"   : tuple( ( index, sensor_conv_funcs[controller][sensor] )
+                                     for index, sensor in enumerate( sensors )
+                                     if ( sensor_conv_funcs[controller][sensor] is not None ) ),
+             "float_offsets": tuple( float_offsets ),
+             "record"       : struct.Struct( "<d" + "d"*len( sensors ) + "B" ),
+             "record_dtype" : np.dtype( [ ( "host_time", "<f8" ) ] +
+                                        [ ( sensor, "<f8" ) for sensor in sensors ] +
+                                        [ ( "valves", "u1" ) ] )
+             }
+    telemetry_layouts[key] = layout
+    return layout
+## telemetry_layout ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         telemetry_decode                                                         #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Decodes one telemetry frame into a list of converted readouts in layout  #
+#         sensor order. Erased (0xFFFFFFFF) floats read as 0.0, as in              #
+#         hw_commands.byte_array_to_float                                          #
+#                                                                                  #
+####################################################################################
+def telemetry_decode( layout, frame_bytes ):
+    readouts = list( layout["frame"].unpack_from( frame_bytes ) )
+    for index, offset in layout["float_offsets"]:
+        if ( math.isnan( readouts[index] ) and
+             ( frame_bytes[offset:offset + 4] == b'\xFF\xFF\xFF\xFF' ) ):
+            readouts[index] = 0.0
+    for index, conv_func in layout["conv_funcs"]:
+        readouts[index] = conv_func( readouts[index] )
+    return readouts
+## telemetry_decode ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         derived_channels                                                         #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Computes a board's derived channels (derived_sensors) for a block of     #
+#         readouts, which may be a dict of readouts, a structured array or a       #
+#         DataFrame. Returns { channel: array }, one array operation per channel,  #
+#         skipping channels whose sensors are missing from the block               #
+#                                                                                  #
+####################################################################################
+def derived_channels( controller, block ):
+    names = block.dtype.names if ( hasattr( block, "dtype" ) ) else block.keys()
+    names = set( names )
+    return { channel: conv_func( np.subtract( block[upstream], block[downstream] ) )
+             for channel, ( _, conv_func, upstream, downstream )
+             in derived_sensors.get( controller, {} ).items()
+             if ( ( upstream in names ) and ( downstream in names ) ) }
+## derived_channels ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         extract_valve_state                                                      #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Looks up the state of each valve from a telemetry valve state byte,      #
+#         returns a read-only { valve: state } mapping                             #
+#                                                                                  #
+####################################################################################
+def extract_valve_state( valve_state_byte ):
+    return valve_state_maps[valve_state_byte[0]]
+## extract_valve_state ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         telemetry_pack_record                                                    #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Packs a host timestamp, decoded readouts and the valve state byte into   #
+#         a fixed-size binary log record                                           #
+#                                                                                  #
+####################################################################################
+def telemetry_pack_record( layout, host_time, readouts, valve_state ):
+    return layout["record"].pack( host_time, *readouts, valve_state )
+## telemetry_pack_record ##
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
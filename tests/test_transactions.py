@@ -0,0 +1,197 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# test_transactions.py -- Priority transactions against a board on a pseudo-       #
+#                         terminal                                                 #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import os
+import sys
+import time
+import threading
+
+# Installed modules
+import pytest
+import serial
+
+# Project imports
+sys.path.insert( 0, os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ) )
+import jobs
+import transactions
+import transport
+import engineController
+from   config      import *
+
+pty = pytest.importorskip( "pty" )
+
+
+####################################################################################
+# Fixtures                                                                         #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         pty_board                                                                #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Engine controller on the far side of a pseudo-terminal. Acks telemetry   #
+#         requests with a zeroed frame and aborts with an ack, and logs each       #
+#         opcode with its arrival time                                             #
+#                                                                                  #
+####################################################################################
+class pty_board( threading.Thread ):
+    def __init__( self ):
+        threading.Thread.__init__( self, daemon = True )
+        self.master, slave = pty.openpty()
+        self.port_name     = os.ttyname( slave )
+        self.opcodes       = []
+
+    def run( self ):
+        while ( True ):
+            try:
+                opcode = os.read( self.master, 1 )
+            except OSError:
+                return
+            self.opcodes.append( ( opcode, time.perf_counter() ) )
+            if ( opcode == b'\x96' ):
+                os.write( self.master, b'\x95' + bytes( 41 ) )
+            elif ( opcode == b'\x90' ):
+                os.write( self.master, b'\x95' )
+## class pty_board ##
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         pty_terminal                                                             #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         The parts of sdec.terminalData used by the engine controller commands,   #
+#         connected to a pty_board                                                 #
+#                                                                                  #
+####################################################################################
+class pty_terminal:
+    def __init__( self, port_name ):
+        self.name            = default_session_name
+        self.controller      = "Liquid Engine Controller (L0002 Rev 5.0)"
+        self.firmware        = None
+        self.timeout         = 1.0
+        self.serialObj       = serial.Serial( port_name, 921600, timeout = 1.0 )
+        self.sensor_readouts = {}
+        self.valve_states    = {}
+        self.engine_state    = None
+        self.command_time    = None
+        self.rx_byte_count   = 0
+        self.tx_byte_count   = 0
+        self.port_lock       = transactions.serial_port_lock()
+        self.io_worker       = transactions.io_worker( self )
+        self.transport       = transport.serial_transport( self )
+
+    def is_active( self ):
+        return self.serialObj.is_open
+
+    def sendByte( self, byte ):
+        self.serialObj.write( byte )
+        self.tx_byte_count += len( byte )
+
+    def readByte( self ):
+        rx_byte = self.serialObj.read()
+        self.rx_byte_count += len( rx_byte )
+        return rx_byte
+
+    def readBlock( self, num_bytes ):
+        rx_bytes = self.serialObj.read( num_bytes )
+        self.rx_byte_count += len( rx_bytes )
+        return rx_bytes
+
+    def cancelRead( self ):
+        self.serialObj.cancel_read()
+
+    def flushCancelledRead( self ):
+        self.serialObj.reset_input_buffer()
+
+    def set_engine_state( self, engine_state ):
+        self.engine_state = engine_state
+## class pty_terminal ##
+
+
+@pytest.fixture
+def board_terminal():
+    board = pty_board()
+    board.start()
+    terminal = pty_terminal( board.port_name )
+    yield board, terminal
+    terminal.serialObj.close()
+    os.close( board.master )
+
+
+####################################################################################
+# Tests                                                                            #
+####################################################################################
+
+
+# An abort typed while a rate-limited telemetry stream job holds the port between
+# requests reaches the board, and no telemetry request follows it
+def test_abort_while_stream_job_holds_port( board_terminal ):
+    board, terminal = board_terminal
+    jobs.run_command( engineController.telreq, "telreq", [ "--stream", "--rate", "2" ],
+                      terminal )
+    time.sleep( 0.2 )
+    stream_job = jobs.job_list[max( jobs.job_list )]
+    assert terminal.port_lock.owner == stream_job.ident
+
+    terminal.command_time = time.perf_counter()
+    jobs.run_command( engineController.hotfire_abort, "abort", [], terminal )
+    abort_latency = time.perf_counter() - terminal.command_time
+    stream_job.join( 1.0 )
+
+    assert terminal.engine_state == "Abort State"
+    assert abort_latency < priority_latency_budget
+    assert not stream_job.is_alive()
+    opcodes = [ opcode for opcode, _ in board.opcodes ]
+    assert opcodes.count( b'\x90' ) == 1
+    assert b'\x96' not in opcodes[opcodes.index( b'\x90' ):]
+
+
+# A priority transaction cuts short the pause of a port holder which is not a job,
+# rather than waiting it out
+def test_priority_wakes_paused_holder( board_terminal ):
+    board, terminal = board_terminal
+    held   = threading.Event()
+    result = {}
+
+    def holder():
+        with terminal.port_lock:
+            held.set()
+            result["stopped"] = jobs.job_sleep( terminal, 5.0 )
+
+    holder_thread = threading.Thread( target = holder, daemon = True )
+    holder_thread.start()
+    held.wait( 1.0 )
+
+    start_time = time.perf_counter()
+    response   = transactions.transact_priority( terminal, b'\x90', response_size = 1,
+                                                 name = "abort" )
+    assert response == b'\x95'
+    assert time.perf_counter() - start_time < priority_latency_budget
+    holder_thread.join( 1.0 )
+    assert result["stopped"]
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
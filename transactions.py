@@ -0,0 +1,487 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# transactions.py -- Serialized request/response transactions over the serial port #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+####################################################################################
+# A transaction is an opcode, its payload and the number of response bytes         #
+# expected before a deadline. Transactions are queued to one I/O worker thread     #
+# per terminalData, which runs them in order, each holding the port lock so their  #
+# bytes never interleave with another command, and completes a future with the     #
+# response bytes. The worker thread only orders the transactions, each exchange    #
+# runs on the transport loop while the worker waits for it                         #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import time
+import queue
+import asyncio
+import threading
+import collections
+import concurrent.futures
+
+# Project imports
+import transport
+from   config      import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Most transactions run under one hold of the port lock
+transaction_batch_max = 16
+
+# Number of recent latencies kept per transaction name
+transaction_latency_window = 256
+
+# Interval at which a priority transaction still waiting for the port warns and
+# asks the holder again to give the port up
+priority_port_wait = 0.1
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         serial_port_lock                                                         #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Reentrant lock on a terminalData's serial port which records the thread  #
+#         holding it, so callers can check whether they already own the port. A    #
+#         priority acquire is served before any other waiter and flags the holder  #
+#         as preempted until it gives the port up                                  #
+#                                                                                  #
+####################################################################################
+class serial_port_lock:
+    def __init__( self ):
+        self.condition      = threading.Condition( threading.Lock() )
+        self.owner          = None
+        self.depth          = 0
+        self.num_preempting = 0
+
+    # Acquire the port, timeout in seconds or -1 to wait forever. Returns True if
+    # the port is held
+    def acquire( self, blocking = True, timeout = -1 ):
+        caller = threading.get_ident()
+        with self.condition:
+            if ( self.owner == caller ):
+                self.depth += 1
+                return True
+            if ( ( self.owner is not None ) or ( self.num_preempting > 0 ) ):
+                if ( not blocking ):
+                    return False
+                if ( not self.condition.wait_for( 
+                             lambda: ( self.owner is None ) and ( self.num_preempting == 0 ),
+                             None if ( timeout < 0 ) else timeout ) ):
+                    return False
+            self.owner = caller
+            self.depth = 1
+            return True
+
+    # Acquire the port ahead of other waiters, waiting at most timeout seconds.
+    # If another thread holds the port, give_way is called once the holder is
+    # flagged as preempted, to cut short what it is waiting on
+    def acquire_priority( self, timeout, give_way = None ):
+        caller = threading.get_ident()
+        with self.condition:
+            if ( self.owner == caller ):
+                self.depth += 1
+                return True
+            if ( self.owner is None ):
+                self.owner = caller
+                self.depth = 1
+                return True
+            self.num_preempting += 1
+            self.condition.notify_all()
+        try:
+            if ( give_way is not None ):
+                give_way()
+            with self.condition:
+                if ( not self.condition.wait_for( lambda: self.owner is None, timeout ) ):
+                    return False
+                self.owner = caller
+                self.depth = 1
+                return True
+        finally:
+            with self.condition:
+                self.num_preempting -= 1
+                self.condition.notify_all()
+
+    # True while a priority acquire waits for the port, the holder should give
+    # it up as soon as it can
+    def preempted( self ):
+        return self.num_preempting > 0
+
+    # Wait at most timeout seconds, returning early if the port is preempted or
+    # stopped() becomes true. Whoever makes stopped() true calls wake(). Returns
+    # True if the wait was cut short
+    def wait_preempted( self, timeout, stopped = None ):
+        with self.condition:
+            return self.condition.wait_for( 
+                       lambda: ( self.num_preempting > 0 ) or 
+                               ( ( stopped is not None ) and stopped() ),
+                       timeout )
+
+    # Wake threads in wait_preempted to recheck their stop condition
+    def wake( self ):
+        with self.condition:
+            self.condition.notify_all()
+
+    def release( self ):
+        with self.condition:
+            if ( self.owner != threading.get_ident() ):
+                raise RuntimeError( "Serial port released by a thread not holding it" )
+            self.depth -= 1
+            if ( self.depth == 0 ):
+                self.owner = None
+                self.condition.notify_all()
+
+    # True if the calling thread holds the port
+    def owned( self ):
+        return self.owner == threading.get_ident()
+
+    def __enter__( self ):
+        self.acquire()
+        return self
+
+    def __exit__( self, *exc_info ):
+        self.release()
+## class serial_port_lock ##
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         transaction                                                              #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         One request/response exchange. timeout is the response deadline in       #
+#         seconds after the request is written                                     #
+#                                                                                  #
+####################################################################################
+class transaction:
+    def __init__( self, opcode, payload = b'', response_size = 0, timeout = 1.0,
+                  name = None ):
+        self.request       = bytes( opcode ) + bytes( payload )
+        self.response_size = response_size
+        self.timeout       = timeout
+        self.name          = name if ( name is not None ) else "0x" + bytes( opcode ).hex().upper()
+        self.future        = concurrent.futures.Future()
+        self.submit_time   = time.perf_counter()
+        self.start_time    = None
+        self.done_time     = None
+## class transaction ##
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         io_worker                                                                #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Runs queued transactions in order on a single thread and keeps latency   #
+#         statistics per transaction name. After a short response the rest of it   #
+#         may still arrive, so the input is flushed then and again before the next #
+#         request is written                                                       #
+#                                                                                  #
+####################################################################################
+class io_worker( threading.Thread ):
+    def __init__( self, serialObj ):
+        threading.Thread.__init__( self, daemon = True )
+        self.serialObj  = serialObj
+        self.queue      = queue.Queue()
+        self.stats      = {}
+        self.stats_lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.inflight   = None
+        self.stale      = False
+
+    # Queue transactions, returning their futures. A thread holding the port runs
+    # its transactions immediately instead, since the worker cannot take the port
+    # until that thread releases it
+    def submit( self, transactions ):
+        if ( self.serialObj.port_lock.owned() ):
+            for txn in transactions:
+                self.execute( txn )
+            return [ txn.future for txn in transactions ]
+
+        with self.start_lock:
+            if ( not self.is_alive() ):
+                self.start()
+        for txn in transactions:
+            self.queue.put( txn )
+        return [ txn.future for txn in transactions ]
+
+    # Cancel queued transactions which have not started, returns the number cancelled
+    def cancel_pending( self ):
+        num_cancelled = 0
+        while ( True ):
+            try:
+                txn = self.queue.get_nowait()
+            except queue.Empty:
+                return num_cancelled
+            if ( txn.future.cancel() ):
+                num_cancelled += 1
+
+    # Cut short the exchange waiting on the transport loop, its transaction
+    # fails with an IOError
+    def cancel_inflight( self ):
+        inflight = self.inflight
+        if ( inflight is not None ):
+            inflight.cancel()
+
+    def run( self ):
+        while ( True ):
+            batch = [ self.queue.get() ]
+            while ( len( batch ) < transaction_batch_max ):
+                try:
+                    batch.append( self.queue.get_nowait() )
+                except queue.Empty:
+                    break
+            port_lock = self.serialObj.port_lock
+            with port_lock:
+                for txn in batch:
+                    # Give the port up to a waiting priority transaction, the
+                    # rest of the batch is stale once it runs
+                    if ( port_lock.preempted() ):
+                        if ( txn.future.set_running_or_notify_cancel() ):
+                            txn.future.set_exception( 
+                                IOError( txn.name + " preempted by a priority transaction" ) )
+                        continue
+                    self.execute( txn )
+
+    def execute( self, txn ):
+        if ( not txn.future.set_running_or_notify_cancel() ):
+            return
+        txn.start_time = time.perf_counter()
+        try:
+            response = self.exchange( txn )
+        except Exception as error:
+            txn.done_time = time.perf_counter()
+            self.record( txn, False )
+            self.flush_input()
+            txn.future.set_exception( error )
+            return
+        txn.done_time = time.perf_counter()
+        self.record( txn, len( response ) == txn.response_size )
+        if ( len( response ) < txn.response_size ):
+            self.flush_input()
+        txn.future.set_result( response )
+
+    # Drop input left by a short response, a late remainder is dropped before
+    # the next request
+    def flush_input( self ):
+        self.stale = True
+        if ( self.serialObj.is_active() ):
+            self.serialObj.serialObj.reset_input_buffer()
+
+    # Write the request and read the response until it is complete or the deadline
+    # passes on the shared transport loop, a short response means the deadline
+    # passed
+    def exchange( self, txn ):
+        if ( self.stale and self.serialObj.is_active() ):
+            self.serialObj.serialObj.reset_input_buffer()
+        self.stale     = False
+        port_transport = self.serialObj.transport
+        self.inflight  = asyncio.run_coroutine_threadsafe( 
+                                 port_transport.exchange( txn.request, txn.response_size,
+                                                          txn.timeout ),
+                                 transport.get_transport_loop() )
+        try:
+            return self.inflight.result()
+        except concurrent.futures.CancelledError:
+            raise IOError( txn.name + " cut short by a priority transaction" )
+        finally:
+            self.inflight = None
+
+    def record( self, txn, completed ):
+        with self.stats_lock:
+            if ( txn.name not in self.stats ):
+                self.stats[txn.name] = {
+                                       "count"    : 0,
+                                       "timeouts" : 0,
+                                       "wait"     : 0.0,
+                                       "latencies": collections.deque(
+                                                    maxlen = transaction_latency_window )
+                                       }
+            stats = self.stats[txn.name]
+            stats["count"] += 1
+            stats["wait"]  += txn.start_time - txn.submit_time
+            if ( not completed ):
+                stats["timeouts"] += 1
+            stats["latencies"].append( txn.done_time - txn.submit_time )
+## class io_worker ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         submit                                                                   #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Queues one transaction and returns its future, which resolves to the     #
+#         response bytes                                                           #
+#                                                                                  #
+####################################################################################
+def submit( serialObj, opcode, payload = b'', response_size = 0, timeout = None,
+            name = None ):
+    if ( timeout is None ):
+        timeout = serialObj.timeout or 1.0
+    txn = transaction( opcode, payload, response_size, timeout, name )
+    return serialObj.io_worker.submit( [ txn ] )[0]
+## submit ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         submit_batch                                                             #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Queues several transactions to run back to back, returns their futures   #
+#                                                                                  #
+####################################################################################
+def submit_batch( serialObj, transactions ):
+    return serialObj.io_worker.submit( transactions )
+## submit_batch ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         transact                                                                 #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Runs one transaction and waits for its response. Returns the response    #
+#         bytes, which are short if the deadline passed, or b'' after printing an  #
+#         error if the port is not open                                            #
+#                                                                                  #
+####################################################################################
+def transact( serialObj, opcode, payload = b'', response_size = 0, timeout = None,
+              name = None ):
+    future = submit( serialObj, opcode, payload, response_size, timeout, name )
+    try:
+        return future.result()
+    except IOError as error:
+        print( "Error: " + str( error ) )
+        return b''
+## transact ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         transact_priority                                                        #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Runs a safety transaction (abort, stop) ahead of all other traffic.      #
+#         Pending queued transactions are cancelled so nothing stale follows it,   #
+#         and the holder of the port is preempted, cutting short its read or wait. #
+#         A safety transaction is never dropped, the holder is waited on until it  #
+#         gives the port up and asked again every priority_port_wait. The input    #
+#         buffer is then flushed and the request is written on the calling thread. #
+#         The latency from keypress_time (default now) to the response is          #
+#         recorded and shown                                                       #
+#                                                                                  #
+####################################################################################
+def transact_priority( serialObj, opcode, payload = b'', response_size = 0,
+                       timeout = None, name = None, keypress_time = None ):
+    if ( timeout is None ):
+        timeout = serialObj.timeout or 1.0
+    txn = transaction( opcode, payload, response_size, timeout, name )
+    if ( keypress_time is not None ):
+        txn.submit_time = keypress_time
+    worker = serialObj.io_worker
+
+    num_cancelled = worker.cancel_pending()
+    if ( num_cancelled > 0 ):
+        print( "Cancelled " + str( num_cancelled ) + " pending transactions" )
+
+    # The holder of the port gives way, cut short the read it is waiting on
+    def give_way():
+        worker.cancel_inflight()
+        serialObj.cancelRead()
+
+    if ( not serialObj.port_lock.acquire_priority( priority_port_wait, give_way ) ):
+        print( "Warning: Serial port not released within {:.0f} ms, {} sent once it is".format(
+               1e3*priority_port_wait, txn.name ) )
+        while ( not serialObj.port_lock.acquire_priority( priority_port_wait, give_way ) ):
+            pass
+    try:
+        if ( serialObj.is_active() ):
+            serialObj.serialObj.reset_input_buffer()
+        worker.execute( txn )
+    finally:
+        serialObj.port_lock.release()
+
+    try:
+        response = txn.future.result()
+    except IOError as error:
+        print( "Error: " + str( error ) )
+        return b''
+    if ( response_size > 0 ):
+        latency = txn.done_time - txn.submit_time
+        print( txn.name + " latency: {:.1f} ms".format( 1e3*latency ) )
+        if ( latency > priority_latency_budget ):
+            print( "Warning: " + txn.name + " exceeded the {:.0f} ms latency budget".format(
+                   1e3*priority_latency_budget ) )
+    return response
+## transact_priority ##
+
+
+####################################################################################
+# Commands                                                                         #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# COMMAND:                                                                         #
+#         iostat                                                                   #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Displays the count, timeouts, queue wait and latency of each transaction #
+#                                                                                  #
+####################################################################################
+def iostat( Args, serialObj ):
+    worker = serialObj.io_worker
+    if ( len( worker.stats ) == 0 ):
+        print( "No transactions" )
+        return serialObj
+
+    print( "{:16s}{:>8s}{:>10s}{:>12s}{:>12s}{:>12s}{:>12s}".format(
+           "Transaction", "Count", "Timeouts", "Wait (ms)", "Mean (ms)", "p95 (ms)",
+           "Max (ms)" ) )
+    with worker.stats_lock:
+        for name, stats in sorted( worker.stats.items() ):
+            latencies = sorted( stats["latencies"] )
+            print( "{:16s}{:8d}{:10d}{:12.2f}{:12.2f}{:12.2f}{:12.2f}".format(
+                   name, stats["count"], stats["timeouts"],
+                   1e3*stats["wait"]/stats["count"]                  ,
+                   1e3*sum( latencies )/len( latencies )              ,
+                   1e3*latencies[int( 0.95*( len( latencies ) - 1 ) )],
+                   1e3*latencies[-1] ) )
+    return serialObj
+## iostat ##
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
@@ -0,0 +1,203 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# Copyright (c) 2025 Sun Devil Rocketry
+
+####################################################################################
+#                                                                                  #
+# transport.py -- asyncio serial port transport shared by all sessions             #
+#                                                                                  #
+# Date: 10/19/2026                                                                 #
+# Sun Devil Rocketry Avionics                                                      #
+#                                                                                  #
+####################################################################################
+
+####################################################################################
+# One event loop thread runs the transport coroutines of every session: the        #
+# exchanges of each session's I/O worker and the discovery probes. Their reads     #
+# wait on the port's file descriptor with the loop's selector, so every read has   #
+# a deadline and can be cancelled, and probing several boards takes one thread.    #
+# Ports without a file descriptor (Windows) are polled instead.                    #
+#                                                                                  #
+# Terminal commands and I/O workers are not coroutines, so run() is a blocking     #
+# facade: the calling thread waits while the loop does the I/O. Background jobs    #
+# still read with blocking pyserial calls on their own threads. Only the holder    #
+# of a session's port lock reads its port, which keeps the two kinds of reader     #
+# apart                                                                            #
+####################################################################################
+
+
+####################################################################################
+# Imports                                                                          #
+####################################################################################
+
+# Standard imports
+import asyncio
+import threading
+
+# Project imports
+from   config      import *
+
+
+####################################################################################
+# Global Variables                                                                 #
+####################################################################################
+
+# Shared event loop and the thread running it, started on first use
+transport_loop        = None
+transport_loop_thread = None
+transport_loop_lock   = threading.Lock()
+
+# Poll period of ports without a file descriptor
+transport_poll_period = 0.002 # s
+
+
+####################################################################################
+# Procedures                                                                       #
+####################################################################################
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         get_transport_loop                                                       #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Returns the shared event loop, starting its thread on first use          #
+#                                                                                  #
+####################################################################################
+def get_transport_loop():
+    global transport_loop, transport_loop_thread
+    with transport_loop_lock:
+        if ( transport_loop is None ):
+            transport_loop        = asyncio.new_event_loop()
+            transport_loop_thread = threading.Thread( target = transport_loop.run_forever,
+                                                      name   = "transport",
+                                                      daemon = True )
+            transport_loop_thread.start()
+    return transport_loop
+## get_transport_loop ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         run                                                                      #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Runs a coroutine on the shared loop and waits for its result. Ctrl+C     #
+#         cancels the coroutine                                                    #
+#                                                                                  #
+####################################################################################
+def run( coroutine ):
+    loop = get_transport_loop()
+    if ( threading.current_thread() is transport_loop_thread ):
+        coroutine.close()
+        raise RuntimeError( "transport.run called from the transport loop, await instead" )
+    future = asyncio.run_coroutine_threadsafe( coroutine, loop )
+    try:
+        return future.result()
+    except KeyboardInterrupt:
+        future.cancel()
+        raise
+## run ##
+
+
+####################################################################################
+#                                                                                  #
+# PROCEDURE:                                                                       #
+#         run_all                                                                  #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Runs several coroutines concurrently on the shared loop, for example one #
+#         per board, and returns their results in order. A coroutine which raises  #
+#         returns its exception instead                                            #
+#                                                                                  #
+####################################################################################
+def run_all( coroutines ):
+    async def gather():
+        return await asyncio.gather( *coroutines, return_exceptions = True )
+    return run( gather() )
+## run_all ##
+
+
+####################################################################################
+#                                                                                  #
+# OBJECT:                                                                          #
+#         serial_transport                                                         #
+#                                                                                  #
+# DESCRIPTION:                                                                     #
+#         Coroutine reads and writes on a terminalData's serial port. Byte counts  #
+#         are added to the terminalData's counts. Callers hold the port lock       #
+#                                                                                  #
+####################################################################################
+class serial_transport:
+    def __init__( self, serialObj ):
+        self.serialObj = serialObj
+
+    # File descriptor of the port, or None if the port must be polled
+    def fileno( self ):
+        try:
+            return self.serialObj.serialObj.fileno()
+        except ( AttributeError, OSError, NotImplementedError ):
+            return None
+
+    # Write bytes to the port. Requests are short, so the OS buffer takes them
+    # without blocking the loop
+    async def write( self, data ):
+        if ( not self.serialObj.is_active() ):
+            raise IOError( "No active serial port connection" )
+        self.serialObj.serialObj.write( data )
+        self.serialObj.tx_byte_count += len( data )
+
+    # Read num_bytes from the port. If timeout (seconds) passes first, returns the
+    # bytes received so far
+    async def read_exactly( self, num_bytes, timeout = None ):
+        if ( not self.serialObj.is_active() ):
+            raise IOError( "No active serial port connection" )
+        loop     = asyncio.get_running_loop()
+        deadline = ( loop.time() + timeout ) if ( timeout is not None ) else None
+        port     = self.serialObj.serialObj
+        fd       = self.fileno()
+        response = bytearray()
+        while ( len( response ) < num_bytes ):
+            num_waiting = port.in_waiting
+            if ( num_waiting > 0 ):
+                rx_chunk  = port.read( min( num_waiting, num_bytes - len( response ) ) )
+                response += rx_chunk
+                self.serialObj.rx_byte_count += len( rx_chunk )
+                continue
+
+            remaining = ( deadline - loop.time() ) if ( deadline is not None ) else None
+            if ( ( remaining is not None ) and ( remaining <= 0 ) ):
+                break
+            if ( fd is None ):
+                await asyncio.sleep( transport_poll_period if ( remaining is None ) else
+                                     min( transport_poll_period, remaining ) )
+                continue
+
+            # Wait for the port to become readable. The reader is only registered
+            # while this read runs, but it is the port lock held by the caller,
+            # not the loop, which keeps other threads from reading the port
+            readable = loop.create_future()
+            loop.add_reader( fd, lambda: readable.done() or readable.set_result( None ) )
+            try:
+                await asyncio.wait_for( readable, remaining )
+            except asyncio.TimeoutError:
+                break
+            finally:
+                loop.remove_reader( fd )
+
+            # Readable with nothing waiting means the device went away
+            if ( port.in_waiting == 0 ):
+                raise IOError( "Serial port closed by the device" )
+        return bytes( response )
+
+    # Write a request and read its response, the deadline starts after the write
+    async def exchange( self, request, response_size, timeout = None ):
+        await self.write( request )
+        return await self.read_exactly( response_size, timeout )
+## class serial_transport ##
+
+
+####################################################################################
+# END OF FILE                                                                      #
+####################################################################################
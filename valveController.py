@@ -22,6 +22,7 @@ import serial.tools.list_ports
 # Project Modules                                                                  #
 #################################################################################### 
 import commands
+import telemetry
 from   config   import *
 
 
@@ -74,67 +75,6 @@ solenoid_off_states = {
 					"fuelVent" : "OPEN" 
                      }
 
-# Numbers assigned to each valve 
-valve_nums = {
-			"oxPress"  : 1,
-			"fuelPress": 2,
-			"oxPurge"  : 5,
-			"fuelPurge": 6,
-			"oxVent"   : 3,
-			"fuelVent" : 4,
-			"oxMain"   : 7,
-			"fuelMain" : 8
-             }
-
-# Valve on/off states
-valve_on_states = {
-				"oxPress"  : "OPEN",
-				"fuelPress": "OPEN",
-				"oxPurge"  : "CLOSED",
-				"fuelPurge": "CLOSED",
-				"oxVent"   : "CLOSED",
-				"fuelVent" : "CLOSED",
-				"oxMain"   : "OPEN"  ,
-				"fuelMain" : "OPEN"
-                  }
-
-valve_off_states = {
-				"oxPress"  : "CLOSED",
-				"fuelPress": "CLOSED",
-				"oxPurge"  : "OPEN"  ,
-				"fuelPurge": "OPEN"  ,
-				"oxVent"   : "OPEN"  ,
-				"fuelVent" : "OPEN"  ,
-				"oxMain"   : "CLOSED",
-				"fuelMain" : "CLOSED"
-                   }
-
-
-####################################################################################
-# Shared Procedures                                                                #
-####################################################################################
-
-
-####################################################################################
-#                                                                                  #
-# PROCEDURE:                                                                       #
-#         extract_valve_state                                                      #
-#                                                                                  #
-# DESCRIPTION:                                                                     #
-#         extracts extracts the state of each valve from telemetry byte            #
-#                                                                                  #
-####################################################################################
-def extract_valve_state( valve_state_byte ):
-	valve_state_int = ord( valve_state_byte )
-	valve_states    = {}
-	for valve in valve_nums:
-		if ( valve_state_int & ( 1 << ( valve_nums[valve] - 1 ) ) ):
-			valve_states[valve] = valve_on_states[valve]
-		else:
-			valve_states[valve] = valve_off_states[valve]
-	return valve_states
-## extract_valve_state ## 
-
 
 ####################################################################################
 # Procedures                                                                       #
@@ -683,7 +623,7 @@ def valve( Args, serialObj ):
 
 		# Receive the byte from the controller
 		valve_state_byte = serialObj.readByte()
-		valve_states     = extract_valve_state( valve_state_byte )
+		valve_states     = telemetry.extract_valve_state( valve_state_byte )
 
 		# Print the results
 		print( "ox  : " + valve_states["oxMain"  ] )